@@ -0,0 +1,316 @@
+import math
+import re
+import threading
+from collections import Counter, OrderedDict, defaultdict, namedtuple
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+from sklearn.preprocessing import normalize
+from metrics import record_cache
+import config
+
+# Single-pass text analysis shared by the BM25 and TF-IDF legs. Every text is
+# lowercased and split on whitespace once; each distinct raw token is interned
+# to an integer term id (the BM25 vocabulary) and, the first time it is seen,
+# cut into TfidfVectorizer's words (token pattern, English stop words removed)
+# which are interned to word ids. A document's word sequence is then the
+# concatenation of its tokens' words: the token pattern never matches across
+# whitespace, so this equals running the regex over the whole text. TF-IDF
+# features are word ids and (word id, word id) bigrams, and the vocabulary,
+# max_features cut, idf and row normalization reproduce
+# TfidfVectorizer(max_features, ngram_range=(1, 2), stop_words='english')
+# exactly, so scores are bit-for-bit unchanged. Scoring code only ever sees
+# the integer ids and sparse rows in AnalyzedQuery.
+
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+
+# term_ids/term_counts: BM25 terms of the query (sorted ids, multiplicities);
+# unknown: raw tokens outside the vocabulary, in query order with repeats;
+# tfidf_cols/tfidf_values: the L2-normalized TF-IDF row.
+AnalyzedQuery = namedtuple('AnalyzedQuery', 'term_ids term_counts unknown tfidf_cols tfidf_values')
+
+def _readonly(array: np.ndarray) -> np.ndarray:
+    # Cached analyses are shared between requests
+    array.setflags(write=False)
+    return array
+
+class Analyzer:
+
+    def __init__(self, max_features: int = 1000, cache_size: int = None):
+        self.max_features = max_features
+        self.cache_size = config.ANALYZER_CACHE_SIZE if cache_size is None else cache_size
+        self.terms: Dict[str, int] = {}
+        self.term_words: List[Tuple[int, ...]] = []
+        self.words: Dict[str, int] = {}
+        self.word_names: List[str] = []
+        # Feature key (see _bigram_key) -> TF-IDF column
+        self.features: Dict[int, int] = {}
+        self.idf = np.zeros(0)
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Shipped to shard processes without the query cache
+        state = self.__dict__.copy()
+        del state['_cache'], state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def n_terms(self) -> int:
+        return len(self.terms)
+
+    @property
+    def n_features(self) -> int:
+        return len(self.idf)
+
+    def _bigram_key(self, first: int, second: int) -> int:
+        # Unigram keys are word ids, bigram keys follow them
+        return (first + 1) * len(self.word_names) + second
+
+    def _split_words(self, token: str, intern: bool) -> List[int]:
+        # Word ids of a raw token; without interning an unseen word is -1, so
+        # it still separates its neighbours when bigrams are formed.
+        ids = []
+        for word in TOKEN_PATTERN.findall(token):
+            if word in ENGLISH_STOP_WORDS:
+                continue
+            word_id = self.words.get(word)
+            if word_id is None:
+                if not intern:
+                    ids.append(-1)
+                    continue
+                word_id = self.words[word] = len(self.word_names)
+                self.word_names.append(word)
+            ids.append(word_id)
+        return ids
+
+    def _intern_terms(self, start: int):
+        # Words of the terms interned since `start`, in term id order, so
+        # word ids depend only on the term vocabulary (see from_vocabulary).
+        for term in list(self.terms)[start:]:
+            self.term_words.append(tuple(self._split_words(term, intern=True)))
+
+    def feature_names(self) -> List[str]:
+        # TF-IDF feature strings by column, as in TfidfVectorizer.vocabulary_
+        names = [None] * len(self.features)
+        n_words = len(self.word_names)
+        for key, column in self.features.items():
+            if key < n_words:
+                names[column] = self.word_names[key]
+            else:
+                first, second = divmod(key, n_words)
+                names[column] = f"{self.word_names[first - 1]} {self.word_names[second]}"
+        return names
+
+    def fit_transform(self, texts: Sequence[str]) -> Tuple[csr_matrix, np.ndarray, np.ndarray]:
+        # Builds the vocabularies from scratch. Returns the L2-normalized
+        # TF-IDF matrix and the corpus as term ids, document i being
+        # term_ids[offsets[i]:offsets[i + 1]].
+        self.terms, self.term_words, self.words, self.word_names = {}, [], {}, []
+        self._cache = OrderedDict()
+
+        # A miss assigns the next id; hits stay in C
+        terms = defaultdict()
+        terms.default_factory = terms.__len__
+        intern = terms.__getitem__
+        flat: List[int] = []
+        offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+        for i, text in enumerate(texts):
+            flat.extend(map(intern, text.lower().split()))
+            offsets[i + 1] = len(flat)
+        self.terms = dict(terms)
+        self._intern_terms(0)
+        term_ids = np.array(flat, dtype=np.int64)
+
+        self.idf, tfidf = self._fit_tfidf(term_ids, offsets)
+        return tfidf, term_ids, offsets
+
+    def _fit_tfidf(self, term_ids: np.ndarray, offsets: np.ndarray) -> Tuple[np.ndarray, csr_matrix]:
+        n_docs = len(offsets) - 1
+        n_words = len(self.word_names)
+
+        # Word sequence of every document: each term expands to its words
+        word_counts = np.array([len(words) for words in self.term_words], dtype=np.int64)
+        word_table = np.fromiter((w for words in self.term_words for w in words), dtype=np.int64,
+                                 count=int(word_counts.sum()))
+        word_starts = np.concatenate([[0], np.cumsum(word_counts)[:-1]]).astype(np.int64)
+        per_token = word_counts[term_ids]
+        first_word = np.cumsum(per_token) - per_token
+        words = word_table[np.repeat(word_starts[term_ids], per_token)
+                           + np.arange(per_token.sum()) - np.repeat(first_word, per_token)]
+        word_docs = np.repeat(np.repeat(np.arange(n_docs), np.diff(offsets)), per_token)
+
+        same_doc = np.flatnonzero(word_docs[1:] == word_docs[:-1])
+        bigrams = (words[same_doc] + 1) * n_words + words[same_doc + 1]
+
+        # Features in TfidfVectorizer's order: per document its unigrams,
+        # then its bigrams. The first-seen order of features decides the
+        # order of entries within each matrix row, and with it the rounding
+        # of the row norms and of every dot product against the row.
+        doc_words = np.bincount(word_docs, minlength=n_docs)
+        doc_bigrams = np.bincount(word_docs[same_doc], minlength=n_docs)
+        doc_start = np.cumsum(doc_words + doc_bigrams) - doc_words - doc_bigrams
+        word_slot = doc_start[word_docs] + np.arange(len(words)) - (np.cumsum(doc_words) - doc_words)[word_docs]
+        bigram_docs = word_docs[same_doc]
+        bigram_slot = (doc_start + doc_words)[bigram_docs] + np.arange(len(bigrams)) \
+            - (np.cumsum(doc_bigrams) - doc_bigrams)[bigram_docs]
+        keys = np.empty(len(words) + len(bigrams), dtype=np.int64)
+        keys[word_slot], keys[bigram_slot] = words, bigrams
+        docs = np.repeat(np.arange(n_docs), doc_words + doc_bigrams)
+
+        unique_keys, first_seen, features = np.unique(keys, return_index=True, return_inverse=True)
+        features = features.ravel()
+        if not len(unique_keys):
+            raise ValueError("empty vocabulary; perhaps the documents only contain stop words")
+
+        # Keep the max_features most frequent, with TfidfVectorizer's tie
+        # breaking: an (unstable) argsort over the features in name order.
+        names = [self.word_names[k] if k < n_words else
+                 f"{self.word_names[k // n_words - 1]} {self.word_names[k % n_words]}" for k in unique_keys.tolist()]
+        by_name = np.array(sorted(range(len(names)), key=names.__getitem__), dtype=np.int64)
+        name_rank = np.empty(len(names), dtype=np.int64)
+        name_rank[by_name] = np.arange(len(names))
+        keep = np.ones(len(names), dtype=bool)
+        if self.max_features is not None and len(names) > self.max_features:
+            tfs = np.bincount(name_rank[features], minlength=len(names)).astype(np.float64)
+            keep[:] = False
+            keep[by_name[(-tfs).argsort()[:self.max_features]]] = True
+
+        # Columns in name order
+        columns = np.full(len(names), -1, dtype=np.int64)
+        kept_by_name = by_name[keep[by_name]]
+        columns[kept_by_name] = np.arange(len(kept_by_name))
+        self.features = {int(k): int(c) for k, c in zip(unique_keys[kept_by_name], columns[kept_by_name])}
+
+        # Count matrix with each row's entries in first-seen feature order
+        by_seen = np.argsort(first_seen)
+        seen_rank = np.empty(len(names), dtype=np.int64)
+        seen_rank[by_seen] = np.arange(len(names))
+        kept = columns[features] >= 0
+        cells, counts = np.unique(docs[kept] * len(names) + seen_rank[features[kept]], return_counts=True)
+        rows, ranks = np.divmod(cells, len(names))
+        cols = columns[by_seen[ranks]].astype(np.int32)
+        indptr = np.zeros(n_docs + 1, dtype=np.int32)
+        indptr[1:] = np.cumsum(np.bincount(rows, minlength=n_docs))
+
+        df = np.bincount(cols, minlength=len(kept_by_name)).astype(np.float64)
+        df += 1.0
+        idf = np.full_like(df, n_docs + 1)
+        idf /= df
+        np.log(idf, out=idf)
+        idf += 1.0
+
+        data = counts.astype(np.float64) * idf[cols]
+        tfidf = csr_matrix((data, cols, indptr), shape=(n_docs, len(kept_by_name)))
+        return idf, normalize(tfidf, norm='l2', copy=False)
+
+    @classmethod
+    def from_vocabulary(
+        cls,
+        terms: List[str],
+        feature_names: List[str],
+        idf: np.ndarray,
+        max_features: int = 1000
+    ) -> 'Analyzer':
+        # Rebuilds a fitted analyzer from its term list (by id), TF-IDF feature
+        # names (by column) and idf, e.g. from a published shared index.
+        analyzer = cls(max_features)
+        analyzer.terms = {term: i for i, term in enumerate(terms)}
+        analyzer._intern_terms(0)
+        for column, name in enumerate(feature_names):
+            first, _, second = name.partition(" ")
+            if second:
+                key = analyzer._bigram_key(analyzer.words[first], analyzer.words[second])
+            else:
+                key = analyzer.words[first]
+            analyzer.features[key] = column
+        analyzer.idf = np.asarray(idf, dtype=np.float64)
+        return analyzer
+
+    def analyze(self, text: str) -> AnalyzedQuery:
+        # Lookups only: the vocabularies never grow after fit
+        terms = Counter()
+        unknown = []
+        words = []
+        for token in text.lower().split():
+            term_id = self.terms.get(token)
+            if term_id is None:
+                unknown.append(token)
+                words.extend(self._split_words(token, intern=False))
+            else:
+                terms[term_id] += 1
+                words.extend(self.term_words[term_id])
+
+        features = Counter()
+        previous = -1
+        for word in words:
+            if word >= 0:
+                column = self.features.get(word)
+                if column is not None:
+                    features[column] += 1
+                if previous >= 0:
+                    column = self.features.get(self._bigram_key(previous, word))
+                    if column is not None:
+                        features[column] += 1
+            previous = word
+
+        term_ids = sorted(terms)
+        cols = sorted(features)
+        values = np.array([features[c] for c in cols], dtype=np.float64) * self.idf[cols]
+        # Sequential sum of squares, like sklearn's row normalization
+        norm = 0.0
+        for value in values.tolist():
+            norm += value * value
+        if norm:
+            values /= math.sqrt(norm)
+
+        return AnalyzedQuery(
+            _readonly(np.array(term_ids, dtype=np.int64)),
+            _readonly(np.array([terms[t] for t in term_ids], dtype=np.float64)),
+            tuple(unknown),
+            _readonly(np.array(cols, dtype=np.int32)),
+            _readonly(values)
+        )
+
+    def analyze_query(self, query: str) -> AnalyzedQuery:
+        # analyze() behind an LRU cache: repeated and popular queries skip
+        # tokenization entirely.
+        if self.cache_size <= 0:
+            return self.analyze(query)
+
+        with self._lock:
+            analyzed = self._cache.get(query)
+            if analyzed is not None:
+                self._cache.move_to_end(query)
+        record_cache("query_analysis", analyzed is not None)
+        if analyzed is not None:
+            return analyzed
+
+        analyzed = self.analyze(query)
+        with self._lock:
+            self._cache[query] = analyzed
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return analyzed
+
+    def tfidf_rows(self, analyzed: List[AnalyzedQuery]) -> csr_matrix:
+        indptr = np.zeros(len(analyzed) + 1, dtype=np.int32)
+        indptr[1:] = np.cumsum([len(a.tfidf_cols) for a in analyzed])
+        if not len(analyzed):
+            return csr_matrix((0, self.n_features))
+        return csr_matrix(
+            (np.concatenate([a.tfidf_values for a in analyzed]),
+             np.concatenate([a.tfidf_cols for a in analyzed]),
+             indptr),
+            shape=(len(analyzed), self.n_features)
+        )
+
+    def transform(self, texts: Sequence[str]) -> csr_matrix:
+        # TF-IDF rows for texts outside the fitted corpus
+        return self.tfidf_rows([self.analyze(text) for text in texts])
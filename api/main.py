@@ -1,15 +1,32 @@
 import sys
 import os
+import gzip
+import json
+import secrets
+import time
+from contextlib import nullcontext
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from fastapi import FastAPI, HTTPException
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Header, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from api.models import RecommendRequest, RecommendResponse, Assessment, HealthResponse
-from retriever import LightweightRetriever
+from fastapi.responses import FileResponse, Response, PlainTextResponse, StreamingResponse, JSONResponse
+from api.models import (
+    RecommendRequest, RecommendResponse, Assessment, HealthResponse,
+    ReloadRequest, IndexStatusResponse, DebugTrace, DebugRecommendResponse,
+    StageTiming, ProfileRequest, ProfileStatusResponse, ReadyResponse,
+    IndexChangesRequest, IndexChangesResponse, Suggestion, SuggestResponse
+)
+from catalog_store import resolve_catalog_file
+from data_processor import normalize_assessment
+from index_manager import IndexManager, IncrementalChangesUnsupported
 from llm_service import LLMService
+from metrics import stage, requests_total, render_metrics, trace_request, annotate
+from profiler import profiler
+from query_cache import NearDuplicateCache
+from warmup import Warmup
 import config
 
 app = FastAPI(
@@ -18,78 +35,409 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# X-Admin-Token is left out of the allowed headers, so pages on other origins
+# can call the public endpoints but never send an admin request.
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=config.CORS_ORIGINS,
+    allow_credentials=False,
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type", "Accept", "X-Debug-Trace"],
 )
 
-retriever = None
+index_manager = None
 llm_service = None
+warmup = Warmup()
+# Final recommendations of near-duplicate queries, per snapshot and request options
+# Keyed on the exact normalized query: near-duplicates can differ in the one
+# word (a skill, a seniority) that changes the recommendations. The intent
+# cache in llm_service.py still matches near-duplicates.
+recommend_cache = NearDuplicateCache("recommend", exact_only=True)
+
+WARMUP_QUERY = "Java developer with collaboration skills"
+
+def _load_index():
+    global index_manager
+    manager = IndexManager()
+    manager.load()
+    manager.start_watching()
+    manager.start_compacting()
+    index_manager = manager
+
+def _init_llm():
+    global llm_service
+    llm_service = LLMService()
+
+def _warm_query():
+    # First search pays for lazily built state (column decoding, analyzer
+    # caches); do it before reporting ready rather than on a user request.
+    index_manager.current().retriever.hybrid_search(WARMUP_QUERY, top_k=config.TOP_K_RETRIEVAL)
+
+warmup.add("index", _load_index)
+warmup.add("llm", _init_llm)
+warmup.add("warm_query", _warm_query)
 
 @app.on_event("startup")
 async def startup_event():
-    global retriever, llm_service
-
     print("Initializing Assessment Recommendation System...")
 
-    retriever = LightweightRetriever()
-    retriever.load_and_fit()
+    # With FAST_START=on the server starts listening right away and /ready
+    # reports when the warm-up has finished; otherwise startup blocks on it.
+    warmup.start(background=config.FAST_START == "on")
 
-    llm_service = LLMService()
+@app.on_event("shutdown")
+async def shutdown_event():
+    if index_manager:
+        index_manager.stop_watching()
+        index_manager.stop_compacting()
+
+def _check_admin_token(token: Optional[str]):
+    # Admin endpoints change what is served, so they stay closed until a
+    # token is configured.
+    if not config.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set ADMIN_TOKEN to enable them")
+    if not secrets.compare_digest((token or "").encode('utf-8'), config.ADMIN_TOKEN.encode('utf-8')):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+def _data_file(path: str) -> str:
+    # Catalogs are only loaded from inside DATA_DIR, after resolving symlinks
+    data_dir = os.path.realpath(config.DATA_DIR)
+    resolved = os.path.realpath(path)
+    if os.path.commonpath([data_dir, resolved]) != data_dir:
+        raise HTTPException(status_code=400, detail=f"Catalog file must be inside {config.DATA_DIR}/")
+    return resolved
+
+def _serving_snapshot():
+    # Requests are served once warm-up has finished, so the first responses
+    # are reranked the same way as every later one.
+    return index_manager.current() if warmup.ready and index_manager else None
+
+def _not_ready_detail() -> str:
+    if warmup.status == "failed":
+        return f"Warm-up failed: {warmup.error}"
+    return "Service is warming up"
+
+def _rerank(snapshot, request: RecommendRequest, candidates, top_k: int):
+    if llm_service:
+        return llm_service.rerank_assessments(
+            query=request.query,
+            assessments=candidates,
+            top_k=top_k,
+            allowed_types=request.test_types,
+            reranker=snapshot.reranker
+        )
+    if snapshot.reranker:
+        candidates = snapshot.reranker.rerank(request.query, candidates)
+    return candidates[:top_k]
+
+def _cache_scope(snapshot, request: RecommendRequest, top_k: int):
+    return (
+        snapshot.version,
+        top_k,
+        tuple(request.test_types) if request.test_types else None,
+        tuple(request.categories) if request.categories else None,
+        request.max_duration
+    )
+
+def _retrieve(snapshot, request: RecommendRequest):
+    allowed = snapshot.retriever.resolve_filters(
+        test_types=request.test_types,
+        categories=request.categories,
+        max_duration=request.max_duration
+    )
+    if allowed is not None and len(allowed) == 0:
+        return []
+
+    return snapshot.retriever.hybrid_search(
+        query=request.query,
+        top_k=config.TOP_K_RETRIEVAL,
+        allowed=allowed
+    )
+
+def _build_response(query: str, assessments) -> RecommendResponse:
+    recommendations = []
+    for asmt in assessments:
+        recommendations.append(Assessment(
+            assessment_name=asmt['name'],
+            assessment_url=asmt['url'],
+            test_type=asmt.get('test_type'),
+            score=asmt.get('retrieval_score', 0.0)
+        ))
+
+    return RecommendResponse(
+        query=query,
+        recommendations=recommendations,
+        total_results=len(recommendations)
+    )
+
+def _response_body(snapshot, query: str, assessments) -> bytes:
+    # Same bytes as _build_response(...).model_dump_json(), assembled from the
+    # snapshot's pre-encoded fragments when it covers every assessment.
+    body = snapshot.fragments.encode_response(query, assessments)
+    if body is None:
+        body = _build_response(query, assessments).model_dump_json().encode('utf-8')
+    return body
+
+def _accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.partition(";")
+        if coding.strip().lower() not in ("gzip", "*"):
+            continue
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                return float(params[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+def _encode_body(body: bytes, accept_encoding: Optional[str]):
+    if config.RESPONSE_GZIP != "on":
+        return body, None
+
+    headers = {'Vary': 'Accept-Encoding'}
+    if len(body) >= config.RESPONSE_GZIP_MIN_BYTES and _accepts_gzip(accept_encoding):
+        body = gzip.compress(body, compresslevel=config.RESPONSE_GZIP_LEVEL)
+        headers['Content-Encoding'] = 'gzip'
+    return body, headers
 
-    print("\nSystem initialized successfully!")
+def _sse_event(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+def _debug_trace(trace, index_version: int) -> DebugTrace:
+    return DebugTrace(
+        index_version=index_version,
+        total_ms=trace.elapsed() * 1000,
+        stages=[
+            StageTiming(stage=name, start_ms=offset * 1000, duration_ms=duration * 1000)
+            for name, offset, duration in trace.stages
+        ],
+        candidates=trace.counts
+    )
+
+def _index_status() -> IndexStatusResponse:
+    snapshot = index_manager.current()
+    info = snapshot.info() if snapshot else {}
+    return IndexStatusResponse(
+        version=index_manager.version,
+        reloading=index_manager.reloading,
+        num_assessments=info.get('num_assessments', 0),
+        fingerprint=snapshot.fingerprint if snapshot else None,
+        last_error=index_manager.last_error,
+        delta_assessments=info.get('delta_assessments', 0),
+        deleted_assessments=info.get('deleted_assessments', 0),
+        compacting=index_manager.compacting
+    )
 
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
+    # Liveness: the process is up and still able to become ready. Use /ready
+    # before sending traffic. A warm-up that failed after all its retries
+    # never recovers, so the process reports unhealthy to get restarted.
+    if warmup.status == "failed":
+        body = HealthResponse(status="unhealthy", message=f"Warm-up failed: {warmup.error}")
+        return JSONResponse(body.model_dump(), status_code=503)
     return HealthResponse(
         status="healthy",
         message="Assessment Recommendation API is running"
     )
 
+@app.get("/ready", response_model=ReadyResponse)
+async def readiness_check():
+    body = ReadyResponse(**warmup.info())
+    return JSONResponse(body.model_dump(), status_code=200 if warmup.ready else 503)
+
 @app.post("/recommend", response_model=RecommendResponse)
-async def recommend_assessments(request: RecommendRequest):
+def recommend_assessments(
+    request: RecommendRequest,
+    x_debug_trace: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None)
+):
     try:
-        if not retriever:
-            raise HTTPException(status_code=500, detail="Retriever not initialized")
+        snapshot = _serving_snapshot()
+        if not snapshot:
+            requests_total.inc(endpoint="recommend", outcome="not_ready")
+            raise HTTPException(status_code=503, detail=_not_ready_detail())
 
-        top_k = min(request.top_k or 10, 10)
+        debug = request.debug or x_debug_trace in ("1", "true", "yes")
 
-        candidates = retriever.hybrid_search(
-            query=request.query,
-            top_k=config.TOP_K_RETRIEVAL
-        )
+        with profiler.profile_request(), \
+                (trace_request() if debug else nullcontext()) as trace, \
+                stage("recommend"):
+            top_k = min(request.top_k or 10, 10)
+            scope = _cache_scope(snapshot, request, top_k)
+            if llm_service:
+                llm_service.reset_intent_status()
 
-        if llm_service:
-            reranked = llm_service.rerank_assessments(
-                query=request.query,
-                assessments=candidates,
-                top_k=top_k
-            )
-        else:
-            reranked = candidates[:top_k]
-
-        recommendations = []
-        for asmt in reranked:
-            recommendations.append(Assessment(
-                assessment_name=asmt['name'],
-                assessment_url=asmt['url'],
-                test_type=asmt.get('test_type'),
-                score=asmt.get('retrieval_score', 0.0)
-            ))
-
-        return RecommendResponse(
-            query=request.query,
-            recommendations=recommendations,
-            total_results=len(recommendations)
-        )
+            with stage("query_cache"):
+                reranked = recommend_cache.get(request.query, scope)
+            annotate('cache_hit', int(reranked is not None))
 
+            if reranked is None:
+                candidates = _retrieve(snapshot, request)
+                reranked = _rerank(snapshot, request, candidates, top_k)
+
+                if not (llm_service and llm_service.intent_degraded()):
+                    recommend_cache.put(request.query, reranked, scope)
+
+            annotate('returned', len(reranked))
+
+            with stage("serialization"):
+                if debug:
+                    response = _build_response(request.query, reranked)
+                else:
+                    body = _response_body(snapshot, request.query, reranked)
+
+        if debug:
+            body = DebugRecommendResponse(
+                **response.model_dump(),
+                debug=_debug_trace(trace, snapshot.version)
+            ).model_dump_json().encode('utf-8')
+
+        body, headers = _encode_body(body, accept_encoding)
+        requests_total.inc(endpoint="recommend", outcome="success")
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    except HTTPException:
+        raise
     except Exception as e:
+        requests_total.inc(endpoint="recommend", outcome="error")
         print(f"Error in recommendation: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _stream_recommendations(request: RecommendRequest, snapshot):
+    top_k = min(request.top_k or 10, 10)
+    try:
+        with stage("recommend_stream"):
+            candidates = _retrieve(snapshot, request)
+
+            # Retrieval order first, so the client can render within milliseconds.
+            yield _sse_event("retrieval", _response_body(snapshot, request.query, candidates[:top_k]).decode('utf-8'))
+
+            reranked = _rerank(snapshot, request, candidates, top_k)
+
+            yield _sse_event("final", _response_body(snapshot, request.query, reranked).decode('utf-8'))
+
+        requests_total.inc(endpoint="recommend_stream", outcome="success")
+
+    except Exception as e:
+        requests_total.inc(endpoint="recommend_stream", outcome="error")
+        print(f"Error in streaming recommendation: {e}")
+        yield _sse_event("error", json.dumps({'detail': str(e)}))
+
+@app.post("/recommend/stream")
+def recommend_stream(request: RecommendRequest):
+    snapshot = _serving_snapshot()
+    if not snapshot:
+        requests_total.inc(endpoint="recommend_stream", outcome="not_ready")
+        raise HTTPException(status_code=503, detail=_not_ready_detail())
+
+    return StreamingResponse(
+        _stream_recommendations(request, snapshot),
+        media_type="text/event-stream",
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.get("/suggest", response_model=SuggestResponse)
+async def suggest(
+    prefix: str = Query(..., max_length=config.SUGGEST_MAX_PREFIX_LENGTH),
+    limit: int = Query(config.SUGGEST_LIMIT, ge=1, le=config.SUGGEST_MAX_LIMIT)
+):
+    # Typeahead for the query box; a lookup takes microseconds, so it runs
+    # on the event loop rather than the thread pool.
+    snapshot = _serving_snapshot()
+    if not snapshot:
+        requests_total.inc(endpoint="suggest", outcome="not_ready")
+        raise HTTPException(status_code=503, detail=_not_ready_detail())
+
+    with stage("suggest"):
+        suggestions = snapshot.suggestions.suggest(prefix, limit)
+
+    requests_total.inc(endpoint="suggest", outcome="success")
+    return SuggestResponse(
+        prefix=prefix,
+        suggestions=[Suggestion(text=text, kind=kind) for text, kind in suggestions]
+    )
+
+@app.get("/admin/profile", response_model=ProfileStatusResponse)
+async def profile_status(x_admin_token: Optional[str] = Header(None)):
+    _check_admin_token(x_admin_token)
+    return ProfileStatusResponse(**profiler.status())
+
+@app.post("/admin/profile", response_model=ProfileStatusResponse)
+async def start_profile(request: ProfileRequest, x_admin_token: Optional[str] = Header(None)):
+    _check_admin_token(x_admin_token)
+    interval = request.interval_ms / 1000 if request.interval_ms else None
+    profiler.arm(request.num_requests, interval)
+    return ProfileStatusResponse(**profiler.status())
+
+@app.delete("/admin/profile", response_model=ProfileStatusResponse)
+async def stop_profile(x_admin_token: Optional[str] = Header(None)):
+    _check_admin_token(x_admin_token)
+    profiler.disarm()
+    return ProfileStatusResponse(**profiler.status())
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/admin/index", response_model=IndexStatusResponse)
+async def index_status(x_admin_token: Optional[str] = Header(None)):
+    _check_admin_token(x_admin_token)
+    if not index_manager:
+        raise HTTPException(status_code=503, detail="Index manager not initialized")
+    return _index_status()
+
+@app.post("/admin/reload", response_model=IndexStatusResponse, status_code=202)
+async def reload_index(request: Optional[ReloadRequest] = None, x_admin_token: Optional[str] = Header(None)):
+    _check_admin_token(x_admin_token)
+    if not index_manager:
+        raise HTTPException(status_code=503, detail="Index manager not initialized")
+
+    catalog_file = _data_file(request.catalog_file) if request and request.catalog_file else None
+    if catalog_file and not os.path.exists(resolve_catalog_file(catalog_file)):
+        raise HTTPException(status_code=404, detail=f"Catalog file not found: {catalog_file}")
+
+    if not index_manager.reload_async(catalog_file):
+        raise HTTPException(status_code=409, detail="A reload is already in progress")
+
+    return _index_status()
+
+@app.post("/admin/index/changes", response_model=IndexChangesResponse)
+def apply_index_changes(request: IndexChangesRequest, x_admin_token: Optional[str] = Header(None)):
+    # Applied in place of a full rebuild, in time proportional to the
+    # changed assessments; a later reload of the catalog file replaces them.
+    _check_admin_token(x_admin_token)
+    if not index_manager:
+        raise HTTPException(status_code=503, detail="Index manager not initialized")
+
+    start = time.perf_counter()
+    upserts = [normalize_assessment(assessment.model_dump()) for assessment in request.upsert]
+    try:
+        snapshot, deleted, not_found = index_manager.apply_changes(upserts, request.delete)
+    except IncrementalChangesUnsupported as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    return IndexChangesResponse(
+        version=snapshot.version,
+        upserted=len(upserts),
+        deleted=deleted,
+        not_found=not_found,
+        apply_ms=(time.perf_counter() - start) * 1000
+    )
+
+@app.post("/admin/index/compact", response_model=IndexStatusResponse, status_code=202)
+async def compact_index(x_admin_token: Optional[str] = Header(None)):
+    _check_admin_token(x_admin_token)
+    if not index_manager:
+        raise HTTPException(status_code=503, detail="Index manager not initialized")
+
+    if not index_manager.compact_async():
+        raise HTTPException(status_code=409, detail="A compaction is already in progress")
+
+    return _index_status()
+
 app.mount("/", StaticFiles(directory="frontend", html=True), name="frontend")
 
 @app.get("/")
@@ -99,7 +447,13 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "health": "/health",
+            "ready": "/ready",
             "recommend": "/recommend (POST)",
+            "recommend_stream": "/recommend/stream (POST, text/event-stream)",
+            "suggest": "/suggest?prefix=...",
+            "reload": "/admin/reload (POST)",
+            "index_changes": "/admin/index/changes (POST)",
+            "metrics": "/metrics",
             "docs": "/docs"
         }
     }
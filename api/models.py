@@ -1,9 +1,16 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional
 
 class RecommendRequest(BaseModel):
     query: str = Field(..., description="Job description or natural language query")
     top_k: Optional[int] = Field(10, description="Number of recommendations to return")
+    debug: bool = Field(False, description="Include a per-stage timing trace in the response")
+    test_types: Optional[List[Literal['K', 'P', 'B', 'C']]] = Field(None, description="Only recommend these test types")
+    categories: Optional[List[str]] = Field(None, description="Only recommend assessments in these categories")
+    max_duration: Optional[int] = Field(
+        None, ge=1,
+        description="Maximum duration in minutes; assessments without a known duration are excluded"
+    )
 
 class Assessment(BaseModel):
     assessment_name: str = Field(..., description="Name of the assessment")
@@ -16,6 +23,80 @@ class RecommendResponse(BaseModel):
     recommendations: List[Assessment] = Field(..., description="List of recommended assessments")
     total_results: int = Field(..., description="Total number of recommendations")
 
+class Suggestion(BaseModel):
+    text: str = Field(..., description="Completed text")
+    kind: Literal['skill', 'assessment', 'term'] = Field(..., description="What the suggestion is")
+
+class SuggestResponse(BaseModel):
+    prefix: str = Field(..., description="Prefix being completed")
+    suggestions: List[Suggestion] = Field(..., description="Completions, best first")
+
+class StageTiming(BaseModel):
+    stage: str = Field(..., description="Pipeline stage name")
+    start_ms: float = Field(..., description="Offset from request start in milliseconds")
+    duration_ms: float = Field(..., description="Stage duration in milliseconds")
+
+class DebugTrace(BaseModel):
+    index_version: int = Field(..., description="Index snapshot version that served the request")
+    total_ms: float = Field(..., description="Total pipeline time in milliseconds")
+    stages: List[StageTiming] = Field(..., description="Stage timings in completion order")
+    candidates: Dict[str, int] = Field(..., description="Candidate counts after each stage")
+
+class DebugRecommendResponse(RecommendResponse):
+    debug: DebugTrace = Field(..., description="Timing breakdown for this request")
+
 class HealthResponse(BaseModel):
     status: str = Field(..., description="Service status")
     message: str = Field(..., description="Status message")
+
+class ReadyResponse(BaseModel):
+    status: Literal["warming", "ready", "failed"] = Field(..., description="Warm-up state")
+    current_step: Optional[str] = Field(None, description="Warm-up step in progress")
+    step_timings_ms: Dict[str, float] = Field(default_factory=dict, description="Duration of each finished warm-up step")
+    ready_after_ms: Optional[float] = Field(None, description="Time from application import to ready")
+    error: Optional[str] = Field(None, description="Warm-up failure, or the last failed attempt while retrying")
+    attempts: int = Field(0, description="Warm-up step attempts so far, retries included")
+
+class ReloadRequest(BaseModel):
+    catalog_file: Optional[str] = Field(None, description="Processed catalog to load; defaults to the current one")
+
+class IndexStatusResponse(BaseModel):
+    version: int = Field(..., description="Version of the index snapshot currently serving requests")
+    reloading: bool = Field(..., description="Whether a background reload is in progress")
+    num_assessments: int = Field(..., description="Number of assessments in the active snapshot")
+    fingerprint: Optional[str] = Field(None, description="Content hash of the active catalog file")
+    last_error: Optional[str] = Field(None, description="Error from the last failed reload, if any")
+    delta_assessments: int = Field(0, description="Assessments upserted since the index was last fitted")
+    deleted_assessments: int = Field(0, description="Deleted or replaced assessments awaiting compaction")
+    compacting: bool = Field(False, description="Whether a background compaction is in progress")
+
+class AssessmentInput(BaseModel):
+    url: str = Field(..., min_length=1, description="Assessment URL; upserts replace the assessment with this URL")
+    name: str = Field(..., min_length=1, description="Name of the assessment")
+    description: str = Field("", description="Assessment description")
+    test_type: Literal['K', 'P', 'B', 'C'] = Field('K', description="Type of test (K/P/B/C)")
+    category: str = Field("", description="Catalog category")
+    duration: str = Field("", description="Duration as listed, e.g. '30 minutes'")
+    skills: List[str] = Field(default_factory=list, description="Skills the assessment measures")
+
+class IndexChangesRequest(BaseModel):
+    upsert: List[AssessmentInput] = Field(default_factory=list, description="Assessments to add or replace")
+    delete: List[str] = Field(default_factory=list, description="URLs of assessments to remove (applied before upserts)")
+
+class IndexChangesResponse(BaseModel):
+    version: int = Field(..., description="Index snapshot version with the changes applied")
+    upserted: int = Field(..., description="Number of assessments added or replaced")
+    deleted: int = Field(..., description="Number of assessments removed")
+    not_found: List[str] = Field(..., description="Deleted URLs that were not in the index")
+    apply_ms: float = Field(..., description="Time taken to apply the changes in milliseconds")
+
+class ProfileRequest(BaseModel):
+    num_requests: int = Field(10, ge=1, description="Number of /recommend requests to sample")
+    interval_ms: Optional[float] = Field(None, gt=0, description="Sampling interval in milliseconds")
+
+class ProfileStatusResponse(BaseModel):
+    armed: bool = Field(..., description="Whether the profiler is waiting for or sampling requests")
+    remaining_requests: int = Field(..., description="Requests still to be profiled")
+    profiled_requests: int = Field(..., description="Requests profiled in the current session")
+    interval_ms: float = Field(..., description="Sampling interval in milliseconds")
+    last_profile: Optional[str] = Field(None, description="Path of the last collapsed-stack profile written")
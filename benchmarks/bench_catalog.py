@@ -0,0 +1,156 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+import numpy as np
+import config
+from benchmarks.common import rss_mb, latency_summary, time_calls, write_results, compare_results
+from benchmarks.synthetic import generate_catalog, generate_queries
+from catalog_store import ColumnarCatalog, binary_path, load_catalog, select_rows, write_binary_catalog
+from retriever import LightweightRetriever
+
+DEFAULT_SCALES = [10_000, 100_000, 1_000_000]
+RESULT_SIZE = 30
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def measure_load(path: str) -> Dict:
+    # Runs in a fresh interpreter so RSS reflects only this load.
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    if path.endswith(".json"):
+        with open(path, 'r', encoding='utf-8') as f:
+            catalog = json.load(f)
+        open_s = time.perf_counter() - start
+        texts = [a['search_text'] for a in catalog]
+    else:
+        catalog = ColumnarCatalog(path)
+        open_s = time.perf_counter() - start
+        texts = catalog.column('search_text')
+    column_s = time.perf_counter() - start
+
+    # Spread-out single-row reads, as when materializing search results
+    sample = range(0, len(catalog), max(1, len(catalog) // 1000))
+    start = time.perf_counter()
+    rows = [catalog[i] for i in sample]
+    row_ms = (time.perf_counter() - start) * 1000 / len(rows)
+
+    # Result lists as the retriever materializes them: first decode, then the
+    # same lists again from the row cache
+    results = result_lists(len(catalog))
+    cold = latency_summary(time_calls(select_rows, [(catalog, r) for r in results], warmup=0))
+    warm = latency_summary(time_calls(select_rows, [(catalog, r) for r in results], warmup=0))
+
+    return {
+        'open_s': open_s,
+        'search_text_s': column_s,
+        'row_ms': row_ms,
+        'results_ms': {'cold': cold['mean_ms'], 'warm': warm['mean_ms']},
+        'rss_delta_mb': rss_mb() - rss_before,
+        'rows': len(texts),
+    }
+
+def result_lists(n_rows: int, count: int = 100) -> List[List[int]]:
+    # Fewer rows in total than the default row cache holds
+    rng = np.random.default_rng(0)
+    return [rng.choice(n_rows, min(RESULT_SIZE, n_rows), replace=False).tolist() for _ in range(count)]
+
+def bench_serving(queries: List[str], rounds: int = 3) -> Dict:
+    # hybrid_search over the shipped catalog, loaded from JSON and from its
+    # binary sibling; only materializing the results differs between the two.
+    # Rounds alternate between the formats so drift affects both alike.
+    json_file = config.PROCESSED_CATALOG_FILE
+    catalogs, retrievers = {}, {}
+    for fmt, path in (('json', json_file), ('binary', binary_path(json_file))):
+        catalogs[fmt] = load_catalog(path)
+        retrievers[fmt] = LightweightRetriever()
+        retrievers[fmt].fit(catalogs[fmt])
+
+    results = result_lists(len(catalogs['json']))
+    samples = {fmt: {'materialize': [], 'hybrid_search': []} for fmt in catalogs}
+    for _ in range(rounds):
+        for fmt, catalog in catalogs.items():
+            samples[fmt]['materialize'] += time_calls(select_rows, [(catalog, r) for r in results], warmup=0)
+            samples[fmt]['hybrid_search'] += time_calls(retrievers[fmt].hybrid_search, [(q, RESULT_SIZE) for q in queries])
+    run = {fmt: {name: latency_summary(values) for name, values in row.items()} for fmt, row in samples.items()}
+
+    print(f"\n[shipped catalog, {len(catalogs['json'])} assessments] serving latency")
+    for fmt, row in run.items():
+        print(f"  {fmt:<6} materialize {RESULT_SIZE} rows {row['materialize']['mean_ms']:.3f} ms  "
+              f"hybrid_search p50 {row['hybrid_search']['p50_ms']:.3f} ms")
+    return run
+
+def run_child(path: str) -> Dict:
+    output = subprocess.check_output(
+        [sys.executable, "-m", "benchmarks.bench_catalog", "--measure", path],
+        cwd=REPO_ROOT, text=True
+    )
+    return json.loads(output.strip().splitlines()[-1])
+
+def bench_scale(scale: int, directory: str) -> Dict:
+    print(f"\n[{scale:,} assessments] generating catalog...")
+    catalog = generate_catalog(scale)
+    json_file = os.path.join(directory, f"catalog-{scale}.json")
+
+    start = time.perf_counter()
+    with open(json_file, 'w', encoding='utf-8') as f:
+        json.dump(catalog, f, indent=2, ensure_ascii=False)
+    json_write_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    write_binary_catalog(catalog, binary_path(json_file))
+    binary_write_s = time.perf_counter() - start
+    del catalog
+
+    run = {
+        'scale': scale,
+        'json': {'write_s': json_write_s, 'file_bytes': os.path.getsize(json_file), **run_child(json_file)},
+        'binary': {
+            'write_s': binary_write_s,
+            'file_bytes': os.path.getsize(binary_path(json_file)),
+            **run_child(binary_path(json_file))
+        },
+    }
+
+    for fmt in ('json', 'binary'):
+        row = run[fmt]
+        print(f"  {fmt:<6} {row['file_bytes'] / 1e6:8.1f} MB  open {row['open_s'] * 1000:9.1f} ms  "
+              f"+search_text {row['search_text_s'] * 1000:9.1f} ms  row {row['row_ms']:.3f} ms  "
+              f"rss +{row['rss_delta_mb']:.0f} MB")
+        print(f"         {RESULT_SIZE}-row results {row['results_ms']['cold']:.3f} ms, "
+              f"repeated {row['results_ms']['warm']:.3f} ms")
+    return run
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON vs binary columnar catalog load time and memory")
+    parser.add_argument("--scales", default=",".join(str(s) for s in DEFAULT_SCALES),
+                        help="Comma-separated catalog sizes")
+    parser.add_argument("--queries", type=int, default=200, help="Queries for the serving comparison")
+    parser.add_argument("--output", help="Results JSON path (default benchmarks/results/catalog-<commit>.json)")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure_load(args.measure)))
+        return
+
+    print("=" * 60)
+    print("Catalog Format Benchmark")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = {'runs': [bench_scale(int(s), directory) for s in args.scales.split(",") if s]}
+    results['serving'] = bench_serving(generate_queries(args.queries))
+
+    write_results("catalog", results, args.output)
+    if args.compare:
+        compare_results(args.compare, results)
+
+    print("\n" + "=" * 60)
+
+if __name__ == "__main__":
+    main()
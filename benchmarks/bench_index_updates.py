@@ -0,0 +1,123 @@
+import argparse
+import gc
+import random
+import time
+from typing import Dict, List, Tuple
+from benchmarks.common import latency_summary, time_calls, write_results, compare_results
+from benchmarks.synthetic import generate_catalog, generate_queries
+from retriever import LightweightRetriever
+import config
+
+DEFAULT_SCALES = [1_000, 10_000, 100_000]
+DEFAULT_BATCHES = [1, 10, 100]
+
+def change_batch(catalog: List[Dict], fresh: List[Dict], size: int, rng: random.Random) -> Tuple[List[Dict], List[str]]:
+    # Roughly a third each of edited, new and deleted assessments
+    upserts, deletes = [], []
+    for i in range(size):
+        kind = i % 3
+        if kind == 0:
+            edited = dict(rng.choice(catalog))
+            edited['search_text'] += " updated"
+            upserts.append(edited)
+        elif kind == 1:
+            upserts.append(fresh.pop())
+        else:
+            deletes.append(rng.choice(catalog)['url'])
+    return upserts, deletes
+
+def top_urls(retriever: LightweightRetriever, queries: List[str], top_k: int) -> List[List[str]]:
+    return [[a['url'] for a in retriever.hybrid_search(q, top_k=top_k)] for q in queries]
+
+def bench_scale(scale: int, queries: List[str], batches: List[int], repeats: int, top_k: int) -> Dict:
+    print(f"\n[{scale:,} assessments] generating catalog...")
+    catalog = generate_catalog(scale)
+    fresh = generate_catalog(max(batches) * repeats * 2 + int(scale * config.INDEX_COMPACT_RATIO), seed=99)
+    for i, assessment in enumerate(fresh):
+        assessment['url'] = assessment['url'].replace("synthetic-", "synthetic-new-")
+    rng = random.Random(0)
+    gc.collect()
+
+    retriever = LightweightRetriever()
+    start = time.perf_counter()
+    retriever.fit(catalog)
+    fit_s = time.perf_counter() - start
+
+    # The first change builds the URL map and document frequencies once
+    start = time.perf_counter()
+    updated = retriever.apply_changes(*change_batch(catalog, fresh, 1, rng))
+    first_apply_ms = (time.perf_counter() - start) * 1000
+
+    run = {'scale': scale, 'fit_s': fit_s, 'first_apply_ms': first_apply_ms, 'apply': {}}
+    for size in batches:
+        samples = []
+        for _ in range(repeats):
+            upserts, deletes = change_batch(catalog, fresh, size, rng)
+            start = time.perf_counter()
+            updated = updated.apply_changes(upserts, deletes)
+            samples.append(time.perf_counter() - start)
+        run['apply'][f"batch_{size}"] = latency_summary(samples)
+
+    # Fill the delta segment up to the compaction threshold, then compare
+    # query latency and results against the compacted index.
+    while not updated.needs_compaction():
+        updated = updated.apply_changes(*change_batch(catalog, fresh, max(batches), rng))
+    start = time.perf_counter()
+    compacted = updated.compact()
+    run['compact_s'] = time.perf_counter() - start
+    run['changed_docs'] = updated.delta.changed()
+
+    single = [(q, top_k) for q in queries]
+    run['query_delta'] = latency_summary(time_calls(updated.hybrid_search, single))
+    run['query_compacted'] = latency_summary(time_calls(compacted.hybrid_search, single))
+    overlap = [
+        len(set(a) & set(b)) / max(len(b), 1)
+        for a, b in zip(top_urls(updated, queries, top_k), top_urls(compacted, queries, top_k))
+    ]
+    run['top_k_overlap'] = sum(overlap) / len(overlap)
+
+    print(f"  fit {fit_s:.2f}s, first change {first_apply_ms:.1f} ms, compaction {run['compact_s']:.2f}s")
+    for name, summary in run['apply'].items():
+        print(f"  apply {name:<10} p50 {summary['p50_ms']:8.2f} ms  p99 {summary['p99_ms']:8.2f} ms")
+    print(f"  hybrid_search with {run['changed_docs']} changed docs p50 {run['query_delta']['p50_ms']:.3f} ms "
+          f"vs compacted {run['query_compacted']['p50_ms']:.3f} ms; top-{top_k} overlap {run['top_k_overlap']:.1%}")
+
+    del retriever, updated, compacted, catalog
+    gc.collect()
+    return run
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental index changes vs a full refit on synthetic catalogs")
+    parser.add_argument("--scales", default=",".join(str(s) for s in DEFAULT_SCALES),
+                        help="Comma-separated catalog sizes")
+    parser.add_argument("--batches", default=",".join(str(b) for b in DEFAULT_BATCHES),
+                        help="Comma-separated change batch sizes")
+    parser.add_argument("--repeats", type=int, default=10, help="Batches applied per batch size")
+    parser.add_argument("--queries", type=int, default=100, help="Number of queries per scale")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--output", help="Results JSON path (default benchmarks/results/index_updates-<commit>.json)")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Incremental Index Update Benchmark")
+    print("=" * 60)
+
+    scales = [int(s) for s in args.scales.split(",") if s]
+    batches = [int(b) for b in args.batches.split(",") if b]
+    queries = generate_queries(args.queries)
+
+    results = {
+        'params': {'batches': batches, 'repeats': args.repeats, 'queries': args.queries,
+                   'top_k': args.top_k, 'compact_ratio': config.INDEX_COMPACT_RATIO},
+        'runs': [bench_scale(scale, queries, batches, args.repeats, args.top_k) for scale in scales],
+    }
+
+    write_results("index_updates", results, args.output)
+    if args.compare:
+        compare_results(args.compare, results)
+
+    print("\n" + "=" * 60)
+
+if __name__ == "__main__":
+    main()
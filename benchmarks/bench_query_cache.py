@@ -0,0 +1,242 @@
+import argparse
+import os
+import random
+import re
+from typing import Dict, List, Tuple
+from benchmarks.common import latency_summary, time_calls, write_results, compare_results
+from benchmarks.synthetic import generate_queries
+from query_cache import NearDuplicateCache, normalize_query
+import config
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_THRESHOLDS = [0.5, 0.6, 0.7, 0.8, 0.9]
+LONG_QUERY_WORDS = 60
+
+FILLER_SENTENCES = [
+    "Please share the best options.",
+    "Thanks in advance.",
+    "The role is based in Bangalore.",
+    "We need this urgently.",
+    "Candidates will be assessed remotely.",
+]
+SKILLS = [
+    "java", "python", "sql", "javascript", "selenium", "excel", "sales", "marketing",
+    "analyst", "developer", "manager", "leadership", "communication", "collaboration",
+]
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+
+def load_labelled_queries() -> List[str]:
+    import pandas as pd
+    path = os.path.join(REPO_ROOT, config.TRAIN_DATA_FILE)
+    queries = []
+    for sheet in ('Train-Set', 'Test-Set'):
+        queries.extend(pd.read_excel(path, sheet_name=sheet)['Query'].drop_duplicates().tolist())
+    return list(dict.fromkeys(queries))
+
+# Rewrites that keep the intent: what recruiters pasting the same job
+# description produce.
+
+def respace(query: str, rng: random.Random) -> str:
+    words = query.split()
+    return "".join(w + rng.choice([" ", "  ", "\n", " \n "]) for w in words).strip() + rng.choice(["", " ", "\n"])
+
+def repunctuate(query: str, rng: random.Random) -> str:
+    text = re.sub(r"[,;:!?.]", "", query) if rng.random() < 0.5 else query.replace(",", " ,")
+    return text.lower() if rng.random() < 0.5 else text.upper()
+
+def drop_sentence(query: str, rng: random.Random) -> str:
+    sentences = _SENTENCE.split(query.strip())
+    if len(sentences) < 3:
+        return None
+    del sentences[rng.randrange(len(sentences))]
+    return " ".join(sentences)
+
+def add_sentence(query: str, rng: random.Random) -> str:
+    return query.rstrip() + " " + rng.choice(FILLER_SENTENCES)
+
+def typo(query: str, rng: random.Random) -> str:
+    words = query.split(" ")
+    candidates = [i for i, w in enumerate(words) if len(w) > 3 and w.isalpha()]
+    if not candidates:
+        return None
+    i = rng.choice(candidates)
+    j = rng.randrange(len(words[i]) - 1)
+    word = words[i]
+    words[i] = word[:j] + word[j + 1] + word[j] + word[j + 2:]
+    return " ".join(words)
+
+PERTURBATIONS = {
+    'whitespace': respace,
+    'punctuation': repunctuate,
+    'drop_sentence': drop_sentence,
+    'add_sentence': add_sentence,
+    'typo': typo,
+}
+
+# Rewrites that change the intent: a hit on one of these is a false hit.
+
+def swap_skill(query: str, rng: random.Random) -> str:
+    present = [s for s in SKILLS if re.search(rf"\b{s}\b", query, re.IGNORECASE)]
+    if not present:
+        return None
+    skill = rng.choice(present)
+    other = rng.choice([s for s in SKILLS if s not in present])
+    return re.sub(rf"\b{skill}\b", other, query, count=1, flags=re.IGNORECASE)
+
+def swap_number(query: str, rng: random.Random) -> str:
+    numbers = re.findall(r"\b\d+\b", query)
+    if not numbers:
+        return None
+    number = rng.choice(numbers)
+    return re.sub(rf"\b{number}\b", str(int(number) * 2 + 5), query, count=1)
+
+def make_variants(queries: List[str], per_query: int, seed: int) -> Tuple[List, List]:
+    rng = random.Random(seed)
+    positives, negatives = [], []
+    for source, query in enumerate(queries):
+        for _ in range(per_query):
+            for name, fn in PERTURBATIONS.items():
+                variant = fn(query, rng)
+                if variant is not None and variant != query:
+                    positives.append((source, name, variant))
+        for fn in (swap_skill, swap_number):
+            variant = fn(query, rng)
+            if variant is not None and normalize_query(variant) != normalize_query(query):
+                negatives.append((source, fn.__name__, variant))
+    return positives, negatives
+
+def is_long(query: str) -> bool:
+    return len(query.split()) > LONG_QUERY_WORDS
+
+def evaluate(queries: List[str], positives: List, negatives: List, threshold: float) -> Dict:
+    cache = NearDuplicateCache("bench", max_entries=len(queries), threshold=threshold)
+    for source, query in enumerate(queries):
+        cache.put(query, source)
+
+    hits = {'short': [0, 0], 'long': [0, 0]}
+    by_kind: Dict[str, List[int]] = {}
+    wrong = 0
+    for source, kind, variant in positives:
+        value, _ = cache.lookup(variant)
+        bucket = 'long' if is_long(queries[source]) else 'short'
+        hits[bucket][1] += 1
+        by_kind.setdefault(kind, [0, 0])[1] += 1
+        if value == source:
+            hits[bucket][0] += 1
+            by_kind[kind][0] += 1
+        elif value is not None:
+            wrong += 1
+
+    false_hits = {'short': [0, 0], 'long': [0, 0]}
+    for source, _, variant in negatives:
+        bucket = 'long' if is_long(queries[source]) else 'short'
+        false_hits[bucket][1] += 1
+        if cache.lookup(variant)[0] is not None:
+            false_hits[bucket][0] += 1
+
+    # Every dataset query against a cache of all the others
+    cross = 0
+    for held_out, query in enumerate(queries):
+        others = NearDuplicateCache("bench", max_entries=len(queries), threshold=threshold)
+        for source, other in enumerate(queries):
+            if source != held_out:
+                others.put(other, source)
+        if others.lookup(query)[0] is not None:
+            cross += 1
+
+    rate = lambda pair: pair[0] / pair[1] if pair[1] else 0.0
+    lookups = len(positives)
+    false = sum(f[0] for f in false_hits.values()) + cross
+    return {
+        'threshold': threshold,
+        'hit_rate': sum(h[0] for h in hits.values()) / lookups if lookups else 0.0,
+        'hit_rate_short': rate(hits['short']),
+        'hit_rate_long': rate(hits['long']),
+        'hit_rate_by_perturbation': {kind: rate(pair) for kind, pair in by_kind.items()},
+        'wrong_entry_hits': wrong,
+        # Share of changed-intent lookups (swapped variants and other dataset
+        # queries) answered from the cache
+        'false_hit_rate': false / (len(negatives) + len(queries)),
+        'false_hits_short': false_hits['short'][0],
+        'false_hits_long': false_hits['long'][0],
+        'negatives_short': false_hits['short'][1],
+        'negatives_long': false_hits['long'][1],
+        'cross_query_hits': cross,
+    }
+
+def exact_hit_rates(queries: List[str], positives: List) -> Dict:
+    raw = set(queries)
+    normalized = {normalize_query(q) for q in queries}
+    return {
+        'exact': sum(1 for _, _, v in positives if v in raw) / len(positives),
+        'normalized_exact': sum(1 for _, _, v in positives if normalize_query(v) in normalized) / len(positives),
+    }
+
+def bench_lookup(queries: List[str], entries: int) -> Dict:
+    # Lookup cost with a full cache of synthetic queries
+    cache = NearDuplicateCache("bench", max_entries=entries)
+    for i, query in enumerate(generate_queries(entries, seed=7)):
+        cache.put(query, i)
+    rng = random.Random(3)
+    variants = [(respace(q, rng),) for q in queries]
+    misses = [(q,) for q in generate_queries(len(queries) * 5, seed=11)]
+    return {
+        'entries': len(cache),
+        'near_duplicate': latency_summary(time_calls(cache.lookup, variants * 5)),
+        'miss': latency_summary(time_calls(cache.lookup, misses)),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Near-duplicate query cache hit and false-hit rates on the labelled dataset")
+    parser.add_argument("--thresholds", default=",".join(str(t) for t in DEFAULT_THRESHOLDS),
+                        help="Comma-separated Jaccard similarity thresholds")
+    parser.add_argument("--variants", type=int, default=5, help="Rounds of perturbations per dataset query")
+    parser.add_argument("--entries", type=int, default=config.QUERY_CACHE_SIZE, help="Cache size for the latency run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Results JSON path (default benchmarks/results/query_cache-<commit>.json)")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Near-Duplicate Query Cache Benchmark")
+    print("=" * 60)
+
+    queries = load_labelled_queries()
+    positives, negatives = make_variants(queries, args.variants, args.seed)
+    print(f"\n{len(queries)} dataset queries, {len(positives)} same-intent variants, "
+          f"{len(negatives)} changed-intent variants")
+
+    exact = exact_hit_rates(queries, positives)
+    print(f"  exact-match cache hit rate {exact['exact']:.1%}, normalized exact {exact['normalized_exact']:.1%}")
+
+    runs = []
+    for threshold in [float(t) for t in args.thresholds.split(",") if t]:
+        run = evaluate(queries, positives, negatives, threshold)
+        runs.append(run)
+        kinds = "  ".join(f"{k} {v:.0%}" for k, v in run['hit_rate_by_perturbation'].items())
+        print(f"\n  threshold {threshold:.2f}: hit rate {run['hit_rate']:.1%} "
+              f"(short {run['hit_rate_short']:.1%}, long {run['hit_rate_long']:.1%}), "
+              f"false-hit rate {run['false_hit_rate']:.1%}")
+        print(f"    {kinds}")
+        print(f"    changed-intent hits: short {run['false_hits_short']}/{run['negatives_short']}, "
+              f"long {run['false_hits_long']}/{run['negatives_long']}; "
+              f"cross-query hits {run['cross_query_hits']}; wrong-entry hits {run['wrong_entry_hits']}")
+
+    lookup = bench_lookup(queries, args.entries)
+    print(f"\n  lookup with {lookup['entries']} entries: near-duplicate p50 "
+          f"{lookup['near_duplicate']['p50_ms'] * 1000:.0f} us, miss p50 {lookup['miss']['p50_ms'] * 1000:.0f} us")
+
+    results = {
+        'params': {'variants': args.variants, 'seed': args.seed, 'queries': len(queries)},
+        'exact': exact,
+        'lookup': lookup,
+        'runs': runs,
+    }
+    write_results("query_cache", results, args.output)
+    if args.compare:
+        compare_results(args.compare, results, key='threshold')
+
+    print("\n" + "=" * 60)
+
+if __name__ == "__main__":
+    main()
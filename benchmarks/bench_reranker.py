@@ -0,0 +1,94 @@
+import argparse
+import time
+from typing import Callable, Dict, List
+import pandas as pd
+from benchmarks.common import latency_summary, time_calls, write_results, compare_results
+from evaluator import Evaluator
+from query_cache import NearDuplicateCache
+from reranker import build_reranker
+from retriever import LightweightRetriever
+import config
+
+def load_labels() -> Dict[str, List[str]]:
+    df = pd.read_excel(config.TRAIN_DATA_FILE, sheet_name='Train-Set')
+    return df.groupby('Query')['Assessment_url'].apply(list).to_dict()
+
+def fake_llm_service(latency_ms: float):
+    # Imported after the provider switch so the service picks the fake model
+    config.LLM_PROVIDER = "fake"
+    config.FAKE_LLM_LATENCY_MS = latency_ms
+    from llm_service import LLMService
+    service = LLMService()
+    # Every timed call should pay for the LLM, as a first-time query would
+    service.intent_cache = NearDuplicateCache("intent", max_entries=0)
+    return service
+
+def bench_path(name: str, stage: Callable, candidates: Dict[str, List[Dict]], labels: Dict[str, List[str]], k: int) -> Dict:
+    scorer = Evaluator(None)
+    recalls = [scorer.calculate_recall_at_k([a['url'] for a in stage(q, candidates[q])], labels[q], k) for q in labels]
+    timing = latency_summary(time_calls(stage, [(q, candidates[q]) for q in labels], warmup=1))
+    row = {'recall_at_k': sum(recalls) / len(recalls), 'latency': timing}
+    print(f"  {name:<24} Recall@{k} {row['recall_at_k']:.4f}   "
+          f"p50 {timing['p50_ms']:8.2f} ms  p99 {timing['p99_ms']:8.2f} ms")
+    return row
+
+def main():
+    parser = argparse.ArgumentParser(description="Local CPU rerankers vs the LLM path: Recall@10 and latency")
+    parser.add_argument("--rerankers", default="hashing",
+                        help="Comma-separated local rerankers (hashing, embedding, cross-encoder)")
+    parser.add_argument("--llm-latency-ms", type=float, default=config.FAKE_LLM_LATENCY_MS,
+                        help="Latency of the fake LLM standing in for the remote provider")
+    parser.add_argument("--k", type=int, default=config.TOP_K_FINAL)
+    parser.add_argument("--output", help="Results JSON path (default benchmarks/results/reranker-<commit>.json)")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Reranker Benchmark")
+    print("=" * 60)
+
+    retriever = LightweightRetriever()
+    retriever.load_and_fit()
+    labels = load_labels()
+    candidates = {q: retriever.hybrid_search(q, top_k=config.TOP_K_RETRIEVAL) for q in labels}
+    llm = fake_llm_service(args.llm_latency_ms)
+    k = args.k
+
+    print(f"\n{len(labels)} labelled queries, {config.TOP_K_RETRIEVAL} candidates each, "
+          f"fake LLM {args.llm_latency_ms:.0f} ms\n")
+
+    paths = {
+        'retrieval': bench_path('retrieval only', lambda q, c: c[:k], candidates, labels, k),
+        'llm': bench_path('llm', lambda q, c: llm.rerank_assessments(q, c, top_k=k), candidates, labels, k),
+    }
+    fit_s = {}
+    for name in [r for r in args.rerankers.split(",") if r]:
+        try:
+            start = time.perf_counter()
+            reranker = build_reranker(retriever.assessments, name)
+            fit_s[name] = time.perf_counter() - start
+        except ImportError as e:
+            print(f"  {name:<24} skipped ({e})")
+            continue
+
+        paths[name] = bench_path(name, lambda q, c: reranker.rerank(q, c)[:k], candidates, labels, k)
+        paths[f"{name}+llm"] = bench_path(
+            f"{name} + llm balancing",
+            lambda q, c: llm.rerank_assessments(q, c, top_k=k, reranker=reranker),
+            candidates, labels, k
+        )
+        print(f"  {'':<24} ({name} encoded the catalog in {fit_s[name] * 1000:.0f} ms)")
+
+    results = {
+        'params': {'k': k, 'candidates': config.TOP_K_RETRIEVAL, 'llm_latency_ms': args.llm_latency_ms},
+        'reranker_fit_s': fit_s,
+        'runs': [{'path': name, **row} for name, row in paths.items()],
+    }
+    write_results("reranker", results, args.output)
+    if args.compare:
+        compare_results(args.compare, results, key='path')
+
+    print("\n" + "=" * 60)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import argparse
+import gc
+import time
+from typing import Dict, List
+from benchmarks.common import rss_mb, latency_summary, time_calls, write_results, compare_results
+from benchmarks.synthetic import generate_catalog, generate_queries
+from retriever import LightweightRetriever
+
+DEFAULT_SCALES = [1_000, 10_000, 100_000, 1_000_000]
+FILTERS = {
+    'types K,P': {'test_types': ['K', 'P']},
+    'type K': {'test_types': ['K']},
+    'type K <=10min': {'test_types': ['K'], 'max_duration': 10},
+}
+
+def index_nbytes(retriever: LightweightRetriever) -> int:
+    total = retriever.doc_len.nbytes
+    for matrix in (retriever.tfidf_matrix, retriever.bm25_weights):
+        total += matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+    return int(total)
+
+def bench_scale(scale: int, queries: List[str], batch_size: int, top_k: int) -> Dict:
+    print(f"\n[{scale:,} assessments] generating catalog...")
+    catalog = generate_catalog(scale)
+    gc.collect()
+
+    retriever = LightweightRetriever()
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    retriever.fit(catalog)
+    build_s = time.perf_counter() - start
+    rss_after = rss_mb()
+
+    single = [(q, top_k) for q in queries]
+    batches = [(queries[i:i + batch_size], top_k) for i in range(0, len(queries), batch_size)]
+
+    run = {
+        'scale': scale,
+        'build_s': build_s,
+        'index_bytes': index_nbytes(retriever),
+        'rss_delta_mb': rss_after - rss_before,
+        'tfidf_features': retriever.analyzer.n_features,
+        'bm25_terms': retriever.analyzer.n_terms,
+        'query': {},
+        'batch': {},
+    }
+
+    # Query analysis on its own, uncached and from the LRU cache. The search
+    # timings below run with the cache off, as every query would be new.
+    analyzer = retriever.analyzer
+    run['analysis'] = {'uncached': latency_summary(time_calls(analyzer.analyze, [(q,) for q in queries]))}
+    run['analysis']['cached'] = latency_summary(time_calls(analyzer.analyze_query, [(q,) for q in queries] * 2))
+    analyzer.cache_size = 0
+
+    for name in ('semantic_search', 'keyword_search', 'hybrid_search'):
+        run['query'][name] = latency_summary(time_calls(getattr(retriever, name), single))
+
+        batch_samples = time_calls(getattr(retriever, f"{name}_batch"), batches, warmup=1)
+        summary = latency_summary(batch_samples)
+        summary['per_query_ms'] = summary['mean_ms'] / batch_size
+        run['batch'][name] = summary
+
+    # Pre-filtered searches, from a broad filter down to a selective one
+    run['filtered'] = {}
+    for label, filters in FILTERS.items():
+        allowed = retriever.resolve_filters(**filters)
+        run['filtered'][label] = {'allowed_docs': int(len(allowed))}
+        for name in ('keyword_search', 'hybrid_search'):
+            samples = time_calls(lambda q, k: getattr(retriever, name)(q, k, allowed=allowed), single)
+            run['filtered'][label][name] = latency_summary(samples)
+
+    print(f"  build {build_s:.2f}s, index {run['index_bytes'] / 1e6:.1f} MB, rss +{run['rss_delta_mb']:.0f} MB")
+    print(f"  query analysis p50 {run['analysis']['uncached']['p50_ms'] * 1000:.1f} us, "
+          f"cached {run['analysis']['cached']['p50_ms'] * 1000:.1f} us")
+    for name in ('semantic_search', 'keyword_search', 'hybrid_search'):
+        q, b = run['query'][name], run['batch'][name]
+        print(f"  {name:<16} p50 {q['p50_ms']:8.3f} ms  p99 {q['p99_ms']:8.3f} ms  "
+              f"batch({batch_size}) p50 {b['p50_ms']:8.2f} ms ({b['per_query_ms']:.3f} ms/query)")
+    for label, row in run['filtered'].items():
+        print(f"  filter {label:<14} {row['allowed_docs']:>8,} docs  keyword p50 {row['keyword_search']['p50_ms']:8.3f} ms  "
+              f"hybrid p50 {row['hybrid_search']['p50_ms']:8.3f} ms")
+
+    del retriever, catalog
+    gc.collect()
+    return run
+
+def main():
+    parser = argparse.ArgumentParser(description="Retriever benchmark on synthetic catalogs")
+    parser.add_argument("--scales", default=",".join(str(s) for s in DEFAULT_SCALES),
+                        help="Comma-separated catalog sizes")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries per scale")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--top-k", type=int, default=30)
+    parser.add_argument("--output", help="Results JSON path (default benchmarks/results/retriever-<commit>.json)")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Retriever Benchmark")
+    print("=" * 60)
+
+    scales = [int(s) for s in args.scales.split(",") if s]
+    queries = generate_queries(args.queries)
+
+    results = {
+        'params': {'queries': args.queries, 'batch_size': args.batch_size, 'top_k': args.top_k},
+        'runs': [bench_scale(scale, queries, args.batch_size, args.top_k) for scale in scales],
+    }
+
+    write_results("retriever", results, args.output)
+    if args.compare:
+        compare_results(args.compare, results)
+
+    print("\n" + "=" * 60)
+
+if __name__ == "__main__":
+    main()
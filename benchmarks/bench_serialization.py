@@ -0,0 +1,89 @@
+import argparse
+import gc
+import gzip
+import random
+import time
+from typing import Dict, List
+from benchmarks.common import latency_summary, time_calls, write_results, compare_results
+from benchmarks.load_test import load_query_pools
+from benchmarks.synthetic import generate_catalog
+from api.main import _build_response
+from fragments import AssessmentFragments
+import config
+
+DEFAULT_SCALES = [10_000, 100_000]
+
+def pydantic_body(query: str, assessments: List[Dict]) -> bytes:
+    return _build_response(query, assessments).model_dump_json().encode('utf-8')
+
+def bench_scale(scale: int, queries: List[str], top_k: int, seed: int = 0) -> Dict:
+    print(f"\n[{scale:,} assessments] generating catalog...")
+    catalog = generate_catalog(scale)
+
+    start = time.perf_counter()
+    fragments = AssessmentFragments.build(catalog)
+    build_s = time.perf_counter() - start
+
+    # Shaped like reranked candidates: catalog copies carrying a fused score
+    rng = random.Random(seed)
+    responses = []
+    for query in queries:
+        picked = [dict(catalog[i], retrieval_score=rng.random()) for i in rng.sample(range(scale), top_k)]
+        responses.append((query, picked))
+
+    mismatches = sum(1 for q, a in responses if fragments.encode_response(q, a) != pydantic_body(q, a))
+    body_bytes = sum(len(pydantic_body(q, a)) for q, a in responses) / len(responses)
+
+    run = {
+        'scale': scale,
+        'build_s': build_s,
+        'body_bytes': body_bytes,
+        'pydantic': latency_summary(time_calls(pydantic_body, responses)),
+        'fragments': latency_summary(time_calls(fragments.encode_response, responses)),
+        'gzip': latency_summary(time_calls(
+            lambda body: gzip.compress(body, compresslevel=config.RESPONSE_GZIP_LEVEL),
+            [(pydantic_body(q, a),) for q, a in responses]
+        )),
+        'mismatches': mismatches,
+    }
+    run['speedup'] = run['pydantic']['mean_ms'] / run['fragments']['mean_ms']
+
+    print(f"  fragments built in {build_s * 1000:.0f} ms, {body_bytes:.0f} B per response")
+    print(f"  pydantic p50 {run['pydantic']['p50_ms'] * 1000:7.1f} us  "
+          f"fragments p50 {run['fragments']['p50_ms'] * 1000:7.1f} us  x{run['speedup']:.1f}  "
+          f"(+gzip p50 {run['gzip']['p50_ms'] * 1000:.1f} us)  mismatches {mismatches}")
+
+    del catalog, fragments, responses
+    gc.collect()
+    return run
+
+def main():
+    parser = argparse.ArgumentParser(description="Pydantic vs pre-encoded fragment serialization of /recommend responses")
+    parser.add_argument("--scales", default=",".join(str(s) for s in DEFAULT_SCALES),
+                        help="Comma-separated catalog sizes")
+    parser.add_argument("--queries", type=int, default=500, help="Number of responses to encode per scale")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--output", help="Results JSON path (default benchmarks/results/serialization-<commit>.json)")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Response Serialization Benchmark")
+    print("=" * 60)
+
+    pools = load_query_pools(args.queries)
+    queries = [q for pool in pools.values() for q in pool][:args.queries]
+
+    results = {
+        'params': {'queries': len(queries), 'top_k': args.top_k},
+        'runs': [bench_scale(int(s), queries, args.top_k) for s in args.scales.split(",") if s],
+    }
+
+    write_results("serialization", results, args.output)
+    if args.compare:
+        compare_results(args.compare, results)
+
+    print("\n" + "=" * 60)
+
+if __name__ == "__main__":
+    main()
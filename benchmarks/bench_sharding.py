@@ -0,0 +1,114 @@
+import argparse
+import gc
+import os
+import threading
+import time
+from typing import Dict, List
+from benchmarks.common import latency_summary, time_calls, write_results, compare_results
+from benchmarks.synthetic import generate_catalog, generate_queries
+from retriever import LightweightRetriever
+from sharded_retriever import ShardedRetriever
+
+DEFAULT_SCALES = [100_000, 1_000_000]
+SEARCHES = ('semantic_search', 'keyword_search', 'hybrid_search')
+
+def bench_retriever(retriever: LightweightRetriever, queries: List[str], top_k: int) -> Dict:
+    args = [(q, top_k) for q in queries]
+    return {name: latency_summary(time_calls(getattr(retriever, name), args)) for name in SEARCHES}
+
+def bench_concurrent(retriever: LightweightRetriever, queries: List[str], top_k: int, threads: int) -> Dict:
+    # hybrid_search throughput with `threads` callers at once, as API worker
+    # threads would issue them
+    def worker(part: List[str]):
+        for query in part:
+            retriever.hybrid_search(query, top_k)
+
+    workers = [threading.Thread(target=worker, args=(queries[i::threads],)) for i in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return {'threads': threads, 'queries_per_s': len(queries) / (time.perf_counter() - start)}
+
+def bench_scale(scale: int, shard_counts: List[int], queries: List[str], top_k: int, threads: int) -> Dict:
+    print(f"\n[{scale:,} assessments] generating catalog...")
+    catalog = generate_catalog(scale)
+
+    start = time.perf_counter()
+    baseline = LightweightRetriever()
+    baseline.fit(catalog)
+    run = {'scale': scale, 'shards': {1: {'build_s': time.perf_counter() - start}}}
+    run['shards'][1].update(bench_retriever(baseline, queries, top_k))
+    run['shards'][1]['concurrent'] = bench_concurrent(baseline, queries, top_k, threads)
+    expected = [baseline.hybrid_search(q, top_k) for q in queries]
+    del baseline
+    gc.collect()
+
+    for n_shards in shard_counts:
+        start = time.perf_counter()
+        sharded = ShardedRetriever(n_shards)
+        sharded.fit(catalog)
+        row = {'build_s': time.perf_counter() - start}
+        row.update(bench_retriever(sharded, queries, top_k))
+        row['concurrent'] = bench_concurrent(sharded, queries, top_k, threads)
+        row['mismatches'] = sum(1 for q, e in zip(queries, expected) if sharded.hybrid_search(q, top_k) != e)
+        sharded.close()
+        run['shards'][n_shards] = row
+
+    base = run['shards'][1]
+    for n_shards, row in run['shards'].items():
+        line = "  ".join(
+            f"{name.split('_')[0]} p50 {row[name]['p50_ms']:7.2f} ms (x{base[name]['p50_ms'] / row[name]['p50_ms']:.2f})"
+            for name in SEARCHES
+        )
+        extra = f"  mismatches {row['mismatches']}" if 'mismatches' in row else ""
+        print(f"  shards={n_shards:<2} build {row['build_s']:6.1f}s  {line}{extra}")
+        print(f"            {threads} threads: hybrid {row['concurrent']['queries_per_s']:7.1f} queries/s")
+
+    del catalog
+    gc.collect()
+    return run
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded scatter-gather vs single-process retrieval")
+    parser.add_argument("--scales", default=",".join(str(s) for s in DEFAULT_SCALES),
+                        help="Comma-separated catalog sizes")
+    parser.add_argument("--shards", default="2,4", help="Comma-separated shard counts to compare with 1")
+    parser.add_argument("--queries", type=int, default=100, help="Number of queries per scale")
+    parser.add_argument("--top-k", type=int, default=30)
+    parser.add_argument("--threads", type=int, default=8, help="Concurrent callers for the throughput run")
+    parser.add_argument("--output", help="Results JSON path (default benchmarks/results/sharding-<commit>.json)")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"Sharding Benchmark ({os.cpu_count()} CPUs)")
+    print("=" * 60)
+
+    queries = generate_queries(args.queries)
+    shard_counts = [int(s) for s in args.shards.split(",") if s]
+
+    results = {
+        'params': {'queries': args.queries, 'top_k': args.top_k, 'shards': shard_counts, 'threads': args.threads},
+        'runs': [
+            bench_scale(int(s), shard_counts, queries, args.top_k, args.threads)
+            for s in args.scales.split(",") if s
+        ],
+    }
+
+    write_results("sharding", results, args.output)
+    if args.compare:
+        compare_results(args.compare, results)
+
+    # Sharded results must be exactly the single-index results
+    mismatched = [
+        (run['scale'], n_shards)
+        for run in results['runs'] for n_shards, row in run['shards'].items() if row.get('mismatches')
+    ]
+    assert not mismatched, f"sharded results differ from a single index at (catalog size, shards) {mismatched}"
+
+    print("\n" + "=" * 60)
+
+if __name__ == "__main__":
+    main()
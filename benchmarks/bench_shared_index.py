@@ -0,0 +1,130 @@
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict
+from benchmarks.common import write_results, compare_results
+from benchmarks.synthetic import generate_catalog, generate_queries
+
+DEFAULT_SCALES = [10_000, 100_000]
+# The dependency-free reranker, so workers have catalog-side reranker state
+RERANKER = "hashing"
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def memory_mb() -> Dict[str, float]:
+    # Anonymous pages are the worker's own heap. The rest of its RSS is
+    # file-backed (code, and the shared index mappings), which every worker
+    # on the host maps from the same page cache.
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return {'rss': fields['Rss'], 'anonymous': fields['Anonymous']}
+
+def measure_worker(catalog_file: str, shared_dir: str) -> Dict:
+    # One worker's startup, in a fresh interpreter: the retriever (attached
+    # or fitted privately), then the per-snapshot structures IndexSnapshot
+    # builds on top of it.
+    from fragments import AssessmentFragments
+    from index_manager import file_fingerprint
+    from reranker import build_reranker
+    from retriever import LightweightRetriever
+    from shared_index import load_shared
+    from suggest import SuggestionIndex
+
+    gc.collect()
+    steps = {'imports': memory_mb()}
+    if shared_dir:
+        retriever = load_shared(catalog_file, file_fingerprint(catalog_file), shared_dir)
+    else:
+        retriever = LightweightRetriever()
+        retriever.load_and_fit(catalog_file)
+    # Serve some queries so the pages they need are resident
+    for query in generate_queries(50):
+        retriever.hybrid_search(query, top_k=10)
+    gc.collect()
+    steps['retriever'] = memory_mb()
+
+    fragments = AssessmentFragments.build(retriever.assessments)
+    gc.collect()
+    steps['fragments'] = memory_mb()
+    suggestions = SuggestionIndex.build(retriever.assessments, retriever.analyzer)
+    gc.collect()
+    steps['suggestions'] = memory_mb()
+    reranker = retriever.shared_reranker or build_reranker(retriever.assessments)
+    gc.collect()
+    steps['reranker'] = memory_mb()
+    del fragments, suggestions, reranker
+
+    names = list(steps)
+    return {
+        name: {
+            'anonymous_mb': steps[name]['anonymous'] - steps[previous]['anonymous'],
+            'file_backed_mb': (steps[name]['rss'] - steps[name]['anonymous'])
+                              - (steps[previous]['rss'] - steps[previous]['anonymous']),
+        }
+        for previous, name in zip(names, names[1:])
+    }
+
+def run_child(catalog_file: str, shared_dir: str = "") -> Dict:
+    output = subprocess.check_output(
+        [sys.executable, "-m", "benchmarks.bench_shared_index", "--measure", catalog_file, "--shared-dir", shared_dir],
+        cwd=REPO_ROOT, text=True, env={**os.environ, 'RERANKER': RERANKER}
+    )
+    return json.loads(output.strip().splitlines()[-1])
+
+def bench_scale(scale: int, directory: str) -> Dict:
+    print(f"\n[{scale:,} assessments] generating catalog...")
+    catalog_file = os.path.join(directory, f"catalog-{scale}.json")
+    with open(catalog_file, 'w', encoding='utf-8') as f:
+        json.dump(generate_catalog(scale), f, ensure_ascii=False)
+    shared_dir = os.path.join(directory, f"shared-{scale}")
+
+    run = {'scale': scale, 'private': run_child(catalog_file)}
+    # The first worker builds and publishes the index; the second is what
+    # every further worker costs.
+    run_child(catalog_file, shared_dir)
+    run['shared'] = run_child(catalog_file, shared_dir)
+
+    for mode in ('private', 'shared'):
+        steps = run[mode]
+        total = sum(step['anonymous_mb'] for step in steps.values())
+        parts = "  ".join(f"{name} {step['anonymous_mb']:6.1f}" for name, step in steps.items())
+        print(f"  {mode:<7} worker heap {total:7.1f} MB  ({parts})  "
+              f"mapped index {steps['retriever']['file_backed_mb']:6.1f} MB")
+    return run
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-worker memory with and without SHARED_INDEX_DIR")
+    parser.add_argument("--scales", default=",".join(str(s) for s in DEFAULT_SCALES),
+                        help="Comma-separated catalog sizes")
+    parser.add_argument("--output", help="Results JSON path (default benchmarks/results/shared_index-<commit>.json)")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    parser.add_argument("--shared-dir", default="", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure_worker(args.measure, args.shared_dir)))
+        return
+
+    print("=" * 60)
+    print("Shared Index Worker Memory Benchmark")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = {'runs': [bench_scale(int(s), directory) for s in args.scales.split(",") if s]}
+
+    write_results("shared_index", results, args.output)
+    if args.compare:
+        compare_results(args.compare, results)
+
+    print("\n" + "=" * 60)
+
+if __name__ == "__main__":
+    main()
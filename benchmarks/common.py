@@ -0,0 +1,106 @@
+import json
+import os
+import platform
+import subprocess
+import time
+from typing import Dict, List, Optional
+import numpy as np
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def latency_summary(samples: List[float]) -> Dict:
+    ms = np.asarray(samples) * 1000
+    return {
+        'n': len(ms),
+        'mean_ms': float(ms.mean()),
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p99_ms': float(np.percentile(ms, 99)),
+    }
+
+def time_calls(fn, args_list: List, warmup: int = 3) -> List[float]:
+    for args in args_list[:warmup]:
+        fn(*args)
+
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def write_results(name: str, results: Dict, output: Optional[str] = None) -> str:
+    payload = {
+        'benchmark': name,
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        **results,
+    }
+
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{name}-{payload['commit']}.json")
+
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2)
+
+    print(f"\nResults written to {output}")
+    return output
+
+def _flatten(prefix: str, value, out: Dict):
+    if isinstance(value, dict):
+        for k, v in value.items():
+            _flatten(f"{prefix}.{k}" if prefix else k, v, out)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        out[prefix] = value
+
+def compare_results(baseline_file: str, current: Dict, key: str = 'scale'):
+    with open(baseline_file, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    print(f"\nComparison against {baseline.get('commit')} ({baseline_file})")
+    print("-" * 60)
+
+    base_rows = {row[key]: row for row in baseline.get('runs', [])}
+    for row in current.get('runs', []):
+        base = base_rows.get(row[key])
+        if base is None:
+            continue
+
+        old, new = {}, {}
+        _flatten('', base, old)
+        _flatten('', row, new)
+        print(f"\n{key}={row[key]}")
+        for metric in sorted(new):
+            if metric == key or metric not in old or not old[metric]:
+                continue
+            if metric.endswith('_per_s'):
+                higher_is_better = True
+            elif metric.endswith(('_ms', '_s', '_mb', '_bytes')):
+                higher_is_better = False
+            else:
+                continue
+            ratio = new[metric] / old[metric]
+            regressed = ratio < 0.90 if higher_is_better else ratio > 1.10
+            flag = "  <-- regression" if regressed else ""
+            print(f"  {metric:<40} {old[metric]:>12.4f} -> {new[metric]:>12.4f}  x{ratio:.2f}{flag}")
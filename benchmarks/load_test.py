@@ -0,0 +1,311 @@
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+import numpy as np
+from benchmarks.common import latency_summary, write_results, compare_results
+from benchmarks.synthetic import generate_queries
+import config
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def load_query_pools(n: int = 200) -> Dict[str, List[str]]:
+    synthetic = generate_queries(n)
+    pools = {
+        'short': [q for i, q in enumerate(synthetic) if i % 4 != 3],
+        'long': [q for i, q in enumerate(synthetic) if i % 4 == 3],
+    }
+
+    try:
+        import pandas as pd
+        df = pd.read_excel(os.path.join(REPO_ROOT, config.TRAIN_DATA_FILE), sheet_name='Train-Set')
+        pools['dataset'] = df['Query'].drop_duplicates().tolist()
+    except Exception as e:
+        print(f"Dataset queries unavailable ({e}); 'dataset' pool disabled")
+
+    return pools
+
+def parse_mix(mix: str, pools: Dict[str, List[str]]) -> List[Tuple[str, float]]:
+    weights = []
+    for part in mix.split(","):
+        name, _, weight = part.partition(":")
+        if name not in pools:
+            raise SystemExit(f"Unknown query pool '{name}' (available: {', '.join(pools)})")
+        weights.append((name, float(weight or 1)))
+    return weights
+
+class Server:
+
+    def __init__(
+        self,
+        port: int,
+        workers: int,
+        llm_latency_ms: float,
+        llm_error_rate: float,
+        llm_test_types: str,
+        query_cache: bool = False
+    ):
+        self.port = port
+        self.url = f"http://127.0.0.1:{port}"
+        env = dict(os.environ)
+        env.update({
+            'LLM_PROVIDER': 'fake',
+            'FAKE_LLM_LATENCY_MS': str(llm_latency_ms),
+            'FAKE_LLM_ERROR_RATE': str(llm_error_rate),
+            'FAKE_LLM_TEST_TYPES': llm_test_types,
+            'WEB_CONCURRENCY': str(workers),
+        })
+        if not query_cache:
+            # The pools repeat queries, so cached answers would hide the cost
+            # of a request
+            env['QUERY_CACHE_SIZE'] = '0'
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "api.main:app",
+             "--host", "127.0.0.1", "--port", str(port),
+             "--workers", str(workers), "--log-level", "warning"],
+            cwd=REPO_ROOT, env=env
+        )
+        self.started_at = time.perf_counter()
+
+    def wait_ready(self, timeout: float = 120) -> Dict:
+        # Polls /health (listening) then /ready (index loaded and warmed up)
+        startup = {}
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Server exited with code {self.process.returncode}")
+            path = "/ready" if 'listening_s' in startup else "/health"
+            try:
+                conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=2)
+                conn.request("GET", path)
+                response = conn.getresponse()
+                body = response.read()
+                conn.close()
+            except OSError:
+                time.sleep(0.05)
+                continue
+
+            if path == "/health" and response.status == 200:
+                startup['listening_s'] = time.perf_counter() - self.started_at
+                continue
+            if path == "/health" and response.status == 503:
+                raise RuntimeError(f"Server warm-up failed: {json.loads(body).get('message')}")
+            if path == "/ready" and response.status == 200:
+                startup['ready_s'] = time.perf_counter() - self.started_at
+                startup['warmup'] = json.loads(body)
+                return startup
+            if path == "/ready" and json.loads(body).get('status') == 'failed':
+                raise RuntimeError(f"Server warm-up failed: {json.loads(body).get('error')}")
+            time.sleep(0.05)
+        raise RuntimeError("Server did not become ready in time")
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+def measure_import_time(module: str = "api.main") -> float:
+    # Fresh interpreter, so nothing is already imported
+    output = subprocess.check_output(
+        [sys.executable, "-c",
+         f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"],
+        cwd=REPO_ROOT, text=True, stderr=subprocess.DEVNULL
+    )
+    return float(output.strip().splitlines()[-1])
+
+def cache_counts(url: str) -> Dict[str, float]:
+    # Lookups of the /recommend and intent caches so far, from /metrics. With
+    # several workers this is the worker that answered the scrape.
+    target = urlparse(url)
+    counts = {}
+    try:
+        conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=5)
+        conn.request("GET", "/metrics")
+        text = conn.getresponse().read().decode('utf-8')
+        conn.close()
+    except (OSError, http.client.HTTPException):
+        return counts
+    for line in text.splitlines():
+        if line.startswith("shl_cache_requests_total{"):
+            labels, value = line.rsplit(" ", 1)
+            counts[labels] = float(value)
+    return counts
+
+def hit_rates(before: Dict[str, float], after: Dict[str, float]) -> Dict[str, float]:
+    rates = {}
+    for cache in ("recommend", "intent"):
+        hits, misses = (
+            after.get(f'shl_cache_requests_total{{cache="{cache}",result="{result}"}}', 0)
+            - before.get(f'shl_cache_requests_total{{cache="{cache}",result="{result}"}}', 0)
+            for result in ("hit", "miss")
+        )
+        if hits + misses:
+            rates[cache] = hits / (hits + misses)
+    return rates
+
+def run_load(
+    url: str,
+    concurrency: int,
+    total_requests: Optional[int],
+    duration: Optional[float],
+    pools: Dict[str, List[str]],
+    mix: List[Tuple[str, float]],
+    top_k: int
+) -> Dict:
+    target = urlparse(url)
+    names = [name for name, _ in mix]
+    weights = [w for _, w in mix]
+
+    lock = threading.Lock()
+    latencies: List[float] = []
+    per_pool: Dict[str, List[float]] = {name: [] for name in names}
+    errors = Counter()
+    issued = [0]
+    deadline = time.perf_counter() + duration if duration else None
+
+    def take_ticket() -> bool:
+        with lock:
+            if total_requests is not None and issued[0] >= total_requests:
+                return False
+            issued[0] += 1
+        return deadline is None or time.perf_counter() < deadline
+
+    def worker(seed: int):
+        rng = random.Random(seed)
+        conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=60)
+        while take_ticket():
+            pool = rng.choices(names, weights=weights)[0]
+            body = json.dumps({'query': rng.choice(pools[pool]), 'top_k': top_k})
+            start = time.perf_counter()
+            try:
+                conn.request("POST", "/recommend", body=body, headers={'Content-Type': 'application/json'})
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException) as e:
+                status = type(e).__name__
+                conn.close()
+                conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=60)
+            elapsed = time.perf_counter() - start
+
+            with lock:
+                if status == 200:
+                    latencies.append(elapsed)
+                    per_pool[pool].append(elapsed)
+                else:
+                    errors[str(status)] += 1
+        conn.close()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+
+    run = {
+        'concurrency': concurrency,
+        'wall_s': wall,
+        'requests': len(latencies) + sum(errors.values()),
+        'successful': len(latencies),
+        'errors': dict(errors),
+        'requests_per_s': len(latencies) / wall if wall else 0.0,
+        'latency': latency_summary(latencies) if latencies else {},
+        'by_pool': {name: latency_summary(s) for name, s in per_pool.items() if s},
+    }
+    if latencies:
+        run['latency']['p90_ms'] = float(np.percentile(np.asarray(latencies) * 1000, 90))
+    return run
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test POST /recommend with a fake LLM provider")
+    parser.add_argument("--url", help="Target an already running server instead of starting one")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated client concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--duration", type=float, help="Seconds per level (overrides --requests)")
+    parser.add_argument("--mix", default="short:3,long:1", help="Query pools and weights, e.g. short:3,long:1,dataset:1")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--llm-latency-ms", type=float, default=config.FAKE_LLM_LATENCY_MS)
+    parser.add_argument("--llm-error-rate", type=float, default=config.FAKE_LLM_ERROR_RATE)
+    parser.add_argument("--llm-test-types", default="", help="Fixed test types for the fake intent, e.g. K,P")
+    parser.add_argument("--query-cache", action="store_true",
+                        help="Keep the query caches on in the started server (hit rates are reported)")
+    parser.add_argument("--output", help="Results JSON path (default benchmarks/results/load-<commit>.json)")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("API Load Test")
+    print("=" * 60)
+
+    pools = load_query_pools()
+    mix = parse_mix(args.mix, pools)
+
+    server = None
+    startup = None
+    url = args.url
+    if not url:
+        startup = {'import_s': measure_import_time()}
+        print(f"\nImporting api.main takes {startup['import_s'] * 1000:.0f} ms")
+
+        print(f"Starting server on port {args.port} ({args.workers} worker(s), "
+              f"fake LLM {args.llm_latency_ms:.0f} ms, error rate {args.llm_error_rate})...")
+        server = Server(args.port, args.workers, args.llm_latency_ms, args.llm_error_rate, args.llm_test_types,
+                        args.query_cache)
+        startup.update(server.wait_ready())
+        url = server.url
+
+        steps = ", ".join(f"{name} {ms:.0f} ms" for name, ms in startup['warmup']['step_timings_ms'].items())
+        print(f"  listening after {startup['listening_s']:.2f}s, ready after {startup['ready_s']:.2f}s ({steps})")
+
+    runs = []
+    try:
+        for concurrency in [int(c) for c in args.concurrency.split(",") if c]:
+            total = None if args.duration else args.requests
+            before = cache_counts(url)
+            run = run_load(url, concurrency, total, args.duration, pools, mix, args.top_k)
+            run['cache_hit_rate'] = hit_rates(before, cache_counts(url))
+            runs.append(run)
+
+            lat = run['latency']
+            print(f"\nconcurrency={concurrency}: {run['requests_per_s']:.1f} req/s, "
+                  f"{run['successful']}/{run['requests']} ok, errors {run['errors'] or 0}")
+            if lat:
+                print(f"  latency p50 {lat['p50_ms']:.1f} ms  p90 {lat['p90_ms']:.1f} ms  p99 {lat['p99_ms']:.1f} ms")
+            if run['cache_hit_rate']:
+                print("  cache hit rate " + ", ".join(f"{name} {rate:.1%}" for name, rate in run['cache_hit_rate'].items()))
+    finally:
+        if server:
+            server.stop()
+
+    results = {
+        'params': {
+            'url': args.url, 'workers': args.workers, 'mix': args.mix, 'top_k': args.top_k,
+            'requests': args.requests, 'duration': args.duration,
+            'llm_latency_ms': args.llm_latency_ms, 'llm_error_rate': args.llm_error_rate,
+            'query_cache': args.query_cache,
+        },
+        'startup': startup,
+        'runs': runs,
+    }
+    write_results("load", results, args.output)
+    if args.compare:
+        compare_results(args.compare, results, key='concurrency')
+
+    print("\n" + "=" * 60)
+
+if __name__ == "__main__":
+    main()
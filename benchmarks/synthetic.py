@@ -0,0 +1,96 @@
+import itertools
+import json
+import random
+from typing import List, Dict
+from data_processor import normalize_assessment
+
+SKILLS = [
+    "Java", "Python", "SQL", "JavaScript", "C#", "C++", "Go", "Rust", "Kotlin", "Swift",
+    "React", "Angular", "Node.js", "Spring", "Django", ".NET", "AWS", "Azure", "Docker",
+    "Kubernetes", "Excel", "Tableau", "Power BI", "Salesforce", "SAP", "Linux", "Networking",
+    "Selenium", "Hadoop", "Spark", "Machine Learning", "Data Science", "Accounting",
+    "Bookkeeping", "Customer Service", "Sales", "Negotiation", "Leadership", "Teamwork",
+    "Communication", "Project Management", "Agile", "Marketing", "SEO", "Copywriting",
+    "Verbal Reasoning", "Numerical Reasoning", "Inductive Reasoning", "Deductive Reasoning",
+    "Mechanical Comprehension", "Attention to Detail", "Typing", "Data Entry",
+]
+ROLES = [
+    "Developer", "Engineer", "Analyst", "Manager", "Administrator", "Consultant",
+    "Representative", "Associate", "Specialist", "Supervisor", "Graduate", "Executive",
+    "Technician", "Architect", "Coordinator", "Assistant", "Director", "Agent",
+]
+LEVELS = ["Entry Level", "Mid Level", "Senior", "Professional", "Advanced", "Foundation"]
+KINDS = ["Test", "Assessment", "Solution", "Simulation", "Questionnaire", "Interview", "Report"]
+CATEGORIES = [
+    "Ability & Aptitude", "Biodata & Situational Judgement", "Competencies", "Development & 360",
+    "Knowledge & Skills", "Personality & Behavior", "Simulations", "Assessment Exercises",
+]
+FILLER = (
+    "measures candidate ability to apply knowledge in realistic workplace scenarios and "
+    "evaluates problem solving speed accuracy judgement under time pressure with adaptive "
+    "questions covering core concepts practical tasks industry standard tools and reporting "
+    "for hiring managers recruiters graduates experienced hires across teams roles functions"
+).split()
+TEST_TYPES = ['K', 'P', 'C', 'B']
+
+def _zipf_weights(size: int) -> List[float]:
+    # Rank-weighted sampling gives the long-tailed term distribution of real text.
+    return list(itertools.accumulate(1.0 / (i + 1) for i in range(size)))
+
+def _zipf_words(rng: random.Random, vocab: List[str], cum_weights: List[float], n: int) -> List[str]:
+    return rng.choices(vocab, cum_weights=cum_weights, k=n)
+
+def _vocab(rng: random.Random, size: int = 5000) -> List[str]:
+    base = FILLER + [s.lower() for s in SKILLS] + [r.lower() for r in ROLES]
+    extra = [
+        ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(4, 10)))
+        for _ in range(max(0, size - len(base)))
+    ]
+    return base + extra
+
+def generate_catalog(n: int, seed: int = 0) -> List[Dict]:
+    rng = random.Random(seed)
+    vocab = _vocab(rng)
+    cum_weights = _zipf_weights(len(vocab))
+    catalog = []
+
+    for i in range(n):
+        skills = rng.sample(SKILLS, rng.randint(1, 4))
+        name = f"{skills[0]} {rng.choice(ROLES)} {rng.choice(KINDS)}"
+        if rng.random() < 0.5:
+            name = f"{rng.choice(LEVELS)} {name}"
+
+        raw = {
+            'url': f"https://www.shl.com/products/product-catalog/view/synthetic-{i}/",
+            'name': f"{name} ({i})",
+            'description': ' '.join(_zipf_words(rng, vocab, cum_weights, rng.randint(20, 70))),
+            'test_type': rng.choice(TEST_TYPES),
+            'category': rng.choice(CATEGORIES),
+            'duration': f"{rng.choice([5, 10, 15, 20, 25, 30, 40, 45, 60, 90])} minutes" if rng.random() < 0.8 else '',
+            'skills': skills,
+        }
+        catalog.append(normalize_assessment(raw))
+
+    return catalog
+
+def generate_queries(n: int, seed: int = 1) -> List[str]:
+    rng = random.Random(seed)
+    vocab = _vocab(random.Random(0))
+    cum_weights = _zipf_weights(len(vocab))
+    queries = []
+
+    for i in range(n):
+        skills = rng.sample(SKILLS, rng.randint(1, 3))
+        role = rng.choice(ROLES)
+        if i % 4 == 3:
+            # Long job-description style query
+            body = ' '.join(_zipf_words(rng, vocab, cum_weights, rng.randint(80, 200)))
+            queries.append(f"We are hiring a {role} with {', '.join(skills)} experience. {body}")
+        else:
+            queries.append(f"{' '.join(skills)} {role.lower()}")
+
+    return queries
+
+def write_catalog(catalog: List[Dict], filename: str):
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(catalog, f, ensure_ascii=False)
@@ -0,0 +1,396 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Sequence
+from typing import Dict, List, Optional
+import numpy as np
+import config
+
+# Binary catalog layout: MAGIC, little-endian uint64 header length, JSON header,
+# then 8-byte aligned column buffers. Every column has one of these kinds:
+#   str       offsets (int64, n+1) into a UTF-8 blob
+#   int       int64 values plus a null mask (None)
+#   str_list  list offsets (int64, n+1) into a nested str column of items
+#   json      per-row JSON fragments stored like a str column
+# A column of rows that lack the key carries an extra "present" mask. Buffer
+# positions in the header are relative to the aligned end of the header.
+MAGIC = b"SHLCAT1\n"
+ALIGN = 8
+EXTENSION = ".cat"
+
+_MISSING = object()
+
+def binary_path(json_path: str) -> str:
+    return os.path.splitext(json_path)[0] + EXTENSION
+
+def file_sha1(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _column_kind(values: List) -> str:
+    present = [v for v in values if v is not _MISSING]
+    if all(isinstance(v, str) for v in present):
+        return 'str'
+    if all(v is None or (isinstance(v, int) and not isinstance(v, bool)) for v in present):
+        return 'int'
+    if all(isinstance(v, list) and all(isinstance(item, str) for item in v) for v in present):
+        return 'str_list'
+    return 'json'
+
+def _encode_strings(values: List[str]) -> Dict[str, np.ndarray]:
+    encoded = [v.encode('utf-8') for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(e) for e in encoded])
+    return {'offsets': offsets, 'data': np.frombuffer(b''.join(encoded), dtype=np.uint8)}
+
+def _encode_column(values: List, kind: str) -> Dict[str, np.ndarray]:
+    filled = [v for v in values if v is not _MISSING]
+    if kind == 'str':
+        buffers = _encode_strings([v if v is not _MISSING else '' for v in values])
+    elif kind == 'int':
+        buffers = {
+            'values': np.array([v if isinstance(v, int) else 0 for v in values], dtype=np.int64),
+            'null': np.array([v is None for v in values], dtype=np.uint8),
+        }
+    elif kind == 'str_list':
+        lists = [v if v is not _MISSING else [] for v in values]
+        list_offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+        list_offsets[1:] = np.cumsum([len(v) for v in lists])
+        items = _encode_strings([item for v in lists for item in v])
+        buffers = {'list_offsets': list_offsets, 'offsets': items['offsets'], 'data': items['data']}
+    else:
+        buffers = _encode_strings([
+            json.dumps(v, ensure_ascii=False) if v is not _MISSING else 'null' for v in values
+        ])
+
+    if len(filled) < len(values):
+        buffers['present'] = np.array([v is not _MISSING for v in values], dtype=np.uint8)
+    return buffers
+
+def write_binary_catalog(assessments: List[Dict], filename: str, source_sha1: Optional[str] = None):
+    names = []
+    for assessment in assessments:
+        for key in assessment:
+            if key not in names:
+                names.append(key)
+
+    columns, blobs = [], []
+    position = 0
+    for name in names:
+        values = [a.get(name, _MISSING) for a in assessments]
+        kind = _column_kind(values)
+        spec = {'name': name, 'kind': kind, 'buffers': {}}
+        for buffer_name, array in _encode_column(values, kind).items():
+            spec['buffers'][buffer_name] = [position, array.dtype.str, len(array)]
+            blobs.append(array)
+            position += -(-array.nbytes // ALIGN) * ALIGN
+        columns.append(spec)
+
+    header = json.dumps({
+        'num_rows': len(assessments),
+        'source_sha1': source_sha1,
+        'columns': columns
+    }, ensure_ascii=False).encode('utf-8')
+    data_start = -(-(len(MAGIC) + 8 + len(header)) // ALIGN) * ALIGN
+
+    tmp = filename + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(header)).tobytes())
+        f.write(header)
+        f.write(b'\0' * (data_start - f.tell()))
+        for array in blobs:
+            raw = array.tobytes()
+            f.write(raw)
+            f.write(b'\0' * (-len(raw) % ALIGN))
+    os.replace(tmp, filename)
+
+class ColumnarCatalog(Sequence):
+    # Read-only, memory-mapped view of a binary catalog. Rows decode to dicts
+    # on access and single columns can be read without touching the others.
+    # Recently decoded rows are kept in an LRU cache, as search results keep
+    # returning the same popular assessments.
+
+    def __init__(self, path: str, cache_size: int = None):
+        self.path = path
+        self.cache_size = config.CATALOG_ROW_CACHE_SIZE if cache_size is None else cache_size
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        # Plain ndarray view: np.memmap wraps every derived array, which
+        # dominates the cost of small row reads.
+        self._map = np.memmap(path, dtype=np.uint8, mode='r').view(np.ndarray)
+        if self._map[:len(MAGIC)].tobytes() != MAGIC:
+            raise ValueError(f"{path} is not a binary catalog")
+
+        header_len = int(self._map[len(MAGIC):len(MAGIC) + 8].view('<u8')[0])
+        header_end = len(MAGIC) + 8 + header_len
+        header = json.loads(self._map[len(MAGIC) + 8:header_end].tobytes())
+        self._data_start = -(-header_end // ALIGN) * ALIGN
+
+        self.num_rows = header['num_rows']
+        self.source_sha1 = header.get('source_sha1')
+        self.columns = {spec['name']: spec for spec in header['columns']}
+        self._buffers: Dict[tuple, np.ndarray] = {}
+
+    def _buffer(self, column: str, name: str) -> Optional[np.ndarray]:
+        key = (column, name)
+        if key not in self._buffers:
+            spec = self.columns[column]['buffers'].get(name)
+            if spec is None:
+                return None
+            offset, dtype, count = spec
+            dtype = np.dtype(dtype)
+            start = self._data_start + offset
+            self._buffers[key] = self._map[start:start + count * dtype.itemsize].view(dtype)
+        return self._buffers[key]
+
+    def __len__(self) -> int:
+        return self.num_rows
+
+    def column_names(self) -> List[str]:
+        return list(self.columns)
+
+    def _strings(self, column: str, start: int, end: int) -> List[str]:
+        offsets = self._buffer(column, 'offsets')[start:end + 1]
+        if not len(offsets) or offsets[0] == offsets[-1]:
+            return [''] * (end - start)
+        data = self._buffer(column, 'data')[offsets[0]:offsets[-1]].tobytes()
+        bounds = (offsets - offsets[0]).tolist()
+        text = data.decode('utf-8')
+        if len(text) == len(data):
+            # ASCII only: byte offsets are character offsets
+            return [text[bounds[i]:bounds[i + 1]] for i in range(end - start)]
+        return [data[bounds[i]:bounds[i + 1]].decode('utf-8') for i in range(end - start)]
+
+    def _values(self, column: str, start: int, end: int) -> List:
+        kind = self.columns[column]['kind']
+        if kind == 'str':
+            return self._strings(column, start, end)
+        if kind == 'int':
+            values = self._buffer(column, 'values')[start:end].tolist()
+            nulls = self._buffer(column, 'null')[start:end]
+            return [None if null else value for value, null in zip(values, nulls)]
+        if kind == 'str_list':
+            list_offsets = self._buffer(column, 'list_offsets')[start:end + 1].tolist()
+            items = self._strings(column, list_offsets[0], list_offsets[-1])
+            base = list_offsets[0]
+            return [items[list_offsets[i] - base:list_offsets[i + 1] - base] for i in range(end - start)]
+        return [json.loads(fragment) for fragment in self._strings(column, start, end)]
+
+    def column(self, name: str, default=None) -> List:
+        if name not in self.columns:
+            return [default] * self.num_rows
+        values = self._values(name, 0, self.num_rows)
+        present = self._buffer(name, 'present')
+        if present is not None:
+            values = [value if flag else default for value, flag in zip(values, present)]
+        return values
+
+    def _strings_at(self, column: str, rows: np.ndarray) -> List[str]:
+        # Scattered rows: one gather of their offsets, then each string is
+        # decoded straight from the mapped bytes.
+        offsets = self._buffer(column, 'offsets')
+        data = memoryview(self._buffer(column, 'data'))
+        return [str(data[start:end], 'utf-8') for start, end in zip(offsets[rows].tolist(), offsets[rows + 1].tolist())]
+
+    def _values_at(self, column: str, rows: np.ndarray) -> List:
+        kind = self.columns[column]['kind']
+        if kind == 'str':
+            return self._strings_at(column, rows)
+        if kind == 'int':
+            values = self._buffer(column, 'values')[rows].tolist()
+            nulls = self._buffer(column, 'null')[rows].tolist()
+            return [None if null else value for value, null in zip(values, nulls)]
+        if kind == 'str_list':
+            list_offsets = self._buffer(column, 'list_offsets')
+            starts, ends = list_offsets[rows].tolist(), list_offsets[rows + 1].tolist()
+            item_rows = [i for start, end in zip(starts, ends) for i in range(start, end)]
+            items = self._strings_at(column, np.array(item_rows, dtype=np.int64))
+            lists, position = [], 0
+            for start, end in zip(starts, ends):
+                lists.append(items[position:position + end - start])
+                position += end - start
+            return lists
+        return [json.loads(fragment) for fragment in self._strings_at(column, rows)]
+
+    def _decode_rows(self, rows: np.ndarray) -> List[Dict]:
+        decoded = [{} for _ in range(len(rows))]
+        for name in self.columns:
+            values = self._values_at(name, rows)
+            present = self._buffer(name, 'present')
+            if present is None:
+                for row, value in zip(decoded, values):
+                    row[name] = value
+            else:
+                for row, value, flag in zip(decoded, values, present[rows].tolist()):
+                    if flag:
+                        row[name] = value
+        return decoded
+
+    def rows(self, indices) -> List[Dict]:
+        # Copies of the given rows, e.g. the assessments of a result list.
+        # Rows missing from the cache are decoded together, one pass per column.
+        indices = [int(i) for i in indices]
+        for idx in indices:
+            if not 0 <= idx < self.num_rows:
+                raise IndexError(idx)
+
+        found = {}
+        if self.cache_size > 0:
+            with self._lock:
+                for idx in indices:
+                    row = self._cache.get(idx)
+                    if row is not None:
+                        self._cache.move_to_end(idx)
+                        found[idx] = row
+
+        missing = [idx for idx in dict.fromkeys(indices) if idx not in found]
+        if missing:
+            found.update(zip(missing, self._decode_rows(np.array(missing, dtype=np.int64))))
+            if self.cache_size > 0:
+                with self._lock:
+                    for idx in missing:
+                        self._cache[idx] = found[idx]
+                    while len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+
+        return [dict(found[idx]) for idx in indices]
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return self.rows(range(*idx.indices(len(self))))
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        return self.rows([idx])[0]
+
+class AppendedCatalog(Sequence):
+    # A catalog followed by extra rows, without copying either (assessments
+    # added to an index since it was fitted, see retriever.DeltaSegment).
+
+    def __init__(self, base, extra: List[Dict]):
+        self.base = base
+        self.extra = extra
+
+    def __len__(self) -> int:
+        return len(self.base) + len(self.extra)
+
+    def column(self, name: str, default=None) -> List:
+        return column_values(self.base, name, default) + [a.get(name, default) for a in self.extra]
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        if idx < len(self.base):
+            return self.base[idx]
+        return self.extra[idx - len(self.base)]
+
+    def rows(self, indices) -> List[Dict]:
+        base_size = len(self.base)
+        decoded = iter(select_rows(self.base, [i for i in indices if i < base_size]))
+        return [next(decoded) if i < base_size else dict(self.extra[i - base_size]) for i in indices]
+
+def column_values(assessments, name: str, default=None) -> List:
+    # One field for every assessment, read column-wise from binary catalogs.
+    if isinstance(assessments, (ColumnarCatalog, AppendedCatalog)):
+        return assessments.column(name, default)
+    return [a.get(name, default) for a in assessments]
+
+def select_rows(assessments, indices) -> List[Dict]:
+    # Copies of the given assessments, decoded together from binary catalogs.
+    if isinstance(assessments, (ColumnarCatalog, AppendedCatalog)):
+        return assessments.rows(indices)
+    return [dict(assessments[i]) for i in indices]
+
+def has_column(assessments, name: str) -> bool:
+    if isinstance(assessments, ColumnarCatalog):
+        return name in assessments.columns
+    if isinstance(assessments, AppendedCatalog):
+        return has_column(assessments.base, name) or has_column(assessments.extra, name)
+    return any(name in a for a in assessments)
+
+def resolve_catalog_file(json_path: str) -> str:
+    # The binary sibling of a JSON catalog is used while it was converted from
+    # the JSON file as it is now (or when only the binary file exists).
+    candidate = binary_path(json_path)
+    if config.CATALOG_FORMAT == 'json' or not os.path.exists(candidate):
+        return json_path
+    if config.CATALOG_FORMAT == 'binary' or not os.path.exists(json_path):
+        return candidate
+
+    try:
+        source_sha1 = ColumnarCatalog(candidate).source_sha1
+    except (OSError, ValueError):
+        return json_path
+    return candidate if source_sha1 == file_sha1(json_path) else json_path
+
+def load_catalog(filename: str):
+    path = resolve_catalog_file(filename) if not filename.endswith(EXTENSION) else filename
+    if path.endswith(EXTENSION):
+        return ColumnarCatalog(path)
+
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_catalog(assessments: List[Dict], filename: str):
+    # Writes the JSON file and/or its binary sibling according to CATALOG_FORMAT.
+    if config.CATALOG_FORMAT in ('json', 'both'):
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(assessments, f, indent=2, ensure_ascii=False)
+
+    if config.CATALOG_FORMAT in ('binary', 'both'):
+        source_sha1 = file_sha1(filename) if config.CATALOG_FORMAT == 'both' else None
+        write_binary_catalog(list(assessments), binary_path(filename), source_sha1)
+
+def convert(source: str, output: str = None) -> str:
+    if source.endswith(EXTENSION):
+        output = output or os.path.splitext(source)[0] + ".json"
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(list(ColumnarCatalog(source)), f, indent=2, ensure_ascii=False)
+    else:
+        output = output or binary_path(source)
+        with open(source, 'r', encoding='utf-8') as f:
+            assessments = json.load(f)
+        write_binary_catalog(assessments, output, file_sha1(source))
+    return output
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert catalogs between JSON and the binary columnar format")
+    parser.add_argument("source", help="A .json catalog (written as .cat) or a .cat catalog (written as .json)")
+    parser.add_argument("--output", help="Destination path (default: source with the other extension)")
+    args = parser.parse_args()
+
+    output = convert(args.source, args.output)
+    print(f"Wrote {output}")
+
+    json_path = args.source if output.endswith(EXTENSION) else output
+    start = time.perf_counter()
+    with open(json_path, 'r', encoding='utf-8') as f:
+        from_json = json.load(f)
+    json_ms = (time.perf_counter() - start) * 1000
+
+    binary_file = output if output.endswith(EXTENSION) else args.source
+    start = time.perf_counter()
+    catalog = ColumnarCatalog(binary_file)
+    catalog.column('search_text')
+    binary_ms = (time.perf_counter() - start) * 1000
+
+    assert list(catalog) == from_json, "round trip mismatch"
+    print(f"  {len(catalog)} assessments, {len(catalog.columns)} columns, round trip ok")
+    print(f"  json.load {json_ms:.2f} ms vs binary open + search_text column {binary_ms:.2f} ms")
+    print(f"  {os.path.getsize(json_path) / 1024:.0f} KB JSON vs {os.path.getsize(binary_file) / 1024:.0f} KB binary")
+
+if __name__ == "__main__":
+    main()
@@ -9,18 +9,89 @@ LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq")
 
 DATA_DIR = "data"
 CATALOG_FILE = os.path.join(DATA_DIR, "assessments_catalog.json")
+PROCESSED_CATALOG_FILE = CATALOG_FILE.replace('.json', '_processed.json')
+# Catalog files are written as "json", "binary" (columnar .cat, see
+# catalog_store.py) or "both"; readers prefer an up-to-date .cat file.
+CATALOG_FORMAT = os.getenv("CATALOG_FORMAT", "both")
+# Decoded rows of a binary catalog kept in memory (LRU); 0 disables
+CATALOG_ROW_CACHE_SIZE = int(os.getenv("CATALOG_ROW_CACHE_SIZE", "4096"))
 EMBEDDINGS_FILE = os.path.join(DATA_DIR, "embeddings.npy")
 FAISS_INDEX_FILE = os.path.join(DATA_DIR, "faiss_index.bin")
 TRAIN_DATA_FILE = "Gen_AI Dataset.xlsx"
+PREDICTIONS_FILE = "predictions.csv"
+PREDICTIONS_CHECKPOINT_FILE = "predictions.checkpoint.jsonl"
 
 EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 EMBEDDING_DIM = 384
+CROSS_ENCODER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
 
 TOP_K_RETRIEVAL = 30
 TOP_K_FINAL = 10
 BM25_WEIGHT = 0.4
 SEMANTIC_WEIGHT = 0.6
 
+# "on" starts serving immediately and loads the index in the background
+# (poll /ready); "off" blocks startup until the index and LLM are ready.
+FAST_START = os.getenv("FAST_START", "on")
+# Retries of a failing warm-up step, the first after WARMUP_RETRY_DELAY seconds
+# and each later one after twice the previous delay
+WARMUP_RETRIES = int(os.getenv("WARMUP_RETRIES", "5"))
+WARMUP_RETRY_DELAY = float(os.getenv("WARMUP_RETRY_DELAY", "1"))
+
+# gzip /recommend responses of at least RESPONSE_GZIP_MIN_BYTES for clients
+# that accept it ("on"/"off"); worth it on slow links, costs CPU on fast ones.
+RESPONSE_GZIP = os.getenv("RESPONSE_GZIP", "off")
+RESPONSE_GZIP_MIN_BYTES = int(os.getenv("RESPONSE_GZIP_MIN_BYTES", "1024"))
+RESPONSE_GZIP_LEVEL = 5
+
+# Local reranker (reranker.py) applied to the retrieval candidates before
+# test-type balancing: "none", "hashing" (dependency-free stand-in),
+# "embedding" (bi-encoder) or "cross-encoder". RERANKER_MODEL overrides the
+# model; RERANKER_WEIGHT < 1 blends the retrieval score back in.
+RERANKER = os.getenv("RERANKER", "none")
+RERANKER_MODEL = os.getenv("RERANKER_MODEL", "")
+RERANKER_WEIGHT = float(os.getenv("RERANKER_WEIGHT", "1.0"))
+RERANKER_BATCH_SIZE = 64
+RERANKER_MAX_PASSAGE_WORDS = 256
+
+# Near-duplicate query cache (query_cache.py) in front of intent extraction
+# and /recommend: entries per cache (0 disables), the word-shingle Jaccard
+# similarity a cached query needs, and MinHash/LSH parameters.
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "2048"))
+QUERY_CACHE_THRESHOLD = float(os.getenv("QUERY_CACHE_THRESHOLD", "0.8"))
+QUERY_CACHE_PERMUTATIONS = 128
+QUERY_CACHE_BANDS = 32
+QUERY_CACHE_SHINGLE_SIZE = 3
+# Analyzed queries (analyzer.py) kept per index, by exact query text; 0 disables
+ANALYZER_CACHE_SIZE = int(os.getenv("ANALYZER_CACHE_SIZE", "4096"))
+
+# /suggest typeahead (suggest.py): completions returned by default and at most,
+# and the longest prefix accepted
+SUGGEST_LIMIT = int(os.getenv("SUGGEST_LIMIT", "8"))
+SUGGEST_MAX_LIMIT = 20
+SUGGEST_MAX_PREFIX_LENGTH = 64
+
+INDEX_WATCH_INTERVAL = float(os.getenv("INDEX_WATCH_INTERVAL", "0"))
+# Incremental index changes (POST /admin/index/changes) accumulate in a delta
+# segment that a background refit folds back in once the changed assessments
+# reach INDEX_COMPACT_RATIO of the index; checked every INDEX_COMPACT_INTERVAL
+# seconds (0 compacts only on POST /admin/index/compact).
+INDEX_COMPACT_RATIO = float(os.getenv("INDEX_COMPACT_RATIO", "0.1"))
+INDEX_COMPACT_INTERVAL = float(os.getenv("INDEX_COMPACT_INTERVAL", "30"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+# Origins allowed to call the API from a browser, comma-separated
+CORS_ORIGINS = [origin.strip() for origin in os.getenv("CORS_ORIGINS", "*").split(",") if origin.strip()]
+SHARED_INDEX_DIR = os.getenv("SHARED_INDEX_DIR", "")
+# Server processes for this app; uvicorn and gunicorn read it as their worker count
+API_WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))
+# >1 splits the catalog across that many retrieval processes (sharded_retriever.py)
+RETRIEVAL_SHARDS = int(os.getenv("RETRIEVAL_SHARDS", "1"))
+# Requests each shard process can have in flight at once
+RETRIEVAL_SHARD_CHANNELS = int(os.getenv("RETRIEVAL_SHARD_CHANNELS", "4"))
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_SAMPLE_INTERVAL = 0.001
+
 SHL_CATALOG_URL = "https://www.shl.com/solutions/products/product-catalog/"
 MIN_ASSESSMENTS = 377
 SCRAPE_DELAY = 1
@@ -30,6 +101,14 @@ GEMINI_MODEL = "gemini-1.5-flash"
 LLM_TEMPERATURE = 0.1
 LLM_MAX_TOKENS = 2048
 
+# LLM_PROVIDER=fake swaps in fake_llm.FakeChatModel for offline load tests
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "300"))
+FAKE_LLM_JITTER_MS = float(os.getenv("FAKE_LLM_JITTER_MS", "50"))
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+FAKE_LLM_TEST_TYPES = [t for t in os.getenv("FAKE_LLM_TEST_TYPES", "").split(",") if t]
+
+PREDICTION_WORKERS = int(os.getenv("PREDICTION_WORKERS", "4"))
+
 TEST_TYPES = {
     'K': 'Knowledge & Skills',
     'P': 'Personality & Behavior',
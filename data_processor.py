@@ -1,13 +1,34 @@
-import json
-from typing import List, Dict
+import re
+from typing import List, Dict, Optional
+import catalog_store
 import config
 
+DURATION_PATTERN = re.compile(
+    r'(\d+(?:\.\d+)?)(?:\s*(?:-|to)\s*(\d+(?:\.\d+)?))?\s*(hours?|hrs?|h\b|minutes?|mins?|m\b)?',
+    re.I
+)
+
 def load_catalog(filename: str = None) -> List[Dict]:
     if filename is None:
         filename = config.CATALOG_FILE
 
-    with open(filename, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return catalog_store.load_catalog(filename)
+
+def parse_duration_minutes(duration: str) -> Optional[int]:
+    if not duration:
+        return None
+
+    match = DURATION_PATTERN.search(str(duration))
+    if not match:
+        return None
+
+    # Ranges like "30-40 minutes" use the upper bound so duration caps stay safe.
+    value = float(match.group(2) or match.group(1))
+    unit = (match.group(3) or 'min').lower()
+    if unit.startswith('h'):
+        value *= 60
+
+    return int(round(value))
 
 def create_rich_text(assessment: Dict) -> str:
     parts = []
@@ -46,6 +67,8 @@ def normalize_assessment(assessment: Dict) -> Dict:
         'search_text': ''
     }
 
+    normalized['duration_minutes'] = parse_duration_minutes(normalized['duration'])
+
     normalized['search_text'] = create_rich_text(normalized)
 
     return normalized
@@ -70,13 +93,12 @@ def save_processed_catalog(assessments: List[Dict], filename: str = None):
     if filename is None:
         filename = config.CATALOG_FILE.replace('.json', '_processed.json')
 
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(assessments, f, indent=2, ensure_ascii=False)
+    catalog_store.save_catalog(assessments, filename)
 
     print(f"Saved processed catalog to {filename}")
 
 def get_search_texts(assessments: List[Dict]) -> List[str]:
-    return [a['search_text'] for a in assessments]
+    return catalog_store.column_values(assessments, 'search_text')
 
 def main():
 
@@ -1,9 +1,7 @@
-import json
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from tqdm import tqdm
 import config
-from data_processor import load_catalog, process_catalog, get_search_texts
+from data_processor import load_catalog, process_catalog, get_search_texts, save_processed_catalog
 
 class EmbeddingGenerator:
 
@@ -11,6 +9,9 @@ class EmbeddingGenerator:
         if model_name is None:
             model_name = config.EMBEDDING_MODEL
 
+        # Imported here: torch and sentence-transformers take seconds to import
+        from sentence_transformers import SentenceTransformer
+
         print(f"Loading embedding model: {model_name}")
         self.model = SentenceTransformer(model_name)
         self.embeddings = None
@@ -72,10 +73,7 @@ def main():
 
     generator.save_embeddings()
 
-    processed_file = config.CATALOG_FILE.replace('.json', '_processed.json')
-    with open(processed_file, 'w', encoding='utf-8') as f:
-        json.dump(assessments, f, indent=2, ensure_ascii=False)
-    print(f"Saved processed assessments to {processed_file}")
+    save_processed_catalog(assessments)
 
     print("\n" + "=" * 60)
     print("Embedding generation complete!")
@@ -3,13 +3,15 @@ import pandas as pd
 from typing import List, Dict, Tuple
 from retriever import LightweightRetriever
 from llm_service import LLMService
+from reranker import build_reranker
 import config
 
 class Evaluator:
 
-    def __init__(self, retriever, llm_service=None):
+    def __init__(self, retriever, llm_service=None, reranker=None):
         self.retriever = retriever
         self.llm_service = llm_service
+        self.reranker = reranker
 
     def calculate_recall_at_k(
         self,
@@ -35,7 +37,9 @@ class Evaluator:
             candidates = self.retriever.hybrid_search(query, top_k=30)
 
             if self.llm_service:
-                reranked = self.llm_service.rerank_assessments(query, candidates, top_k=k)
+                reranked = self.llm_service.rerank_assessments(query, candidates, top_k=k, reranker=self.reranker)
+            elif self.reranker:
+                reranked = self.reranker.rerank(query, candidates)[:k]
             else:
                 reranked = candidates[:k]
 
@@ -88,7 +92,7 @@ def main():
     print("Initializing LLM service...")
     llm_service = LLMService()
 
-    evaluator = Evaluator(retriever, llm_service)
+    evaluator = Evaluator(retriever, llm_service, build_reranker(retriever.assessments))
 
     print("\nLoading training data...")
     queries_labels = evaluator.load_training_data()
@@ -0,0 +1,93 @@
+import random
+import re
+import threading
+import time
+from typing import List, Optional
+import config
+
+TECHNICAL_TERMS = [
+    "java", "python", "sql", "javascript", "c#", "c++", ".net", "react", "angular", "node",
+    "aws", "azure", "docker", "excel", "tableau", "selenium", "spark", "hadoop", "linux",
+]
+SOFT_TERMS = [
+    "collaborat", "communicat", "leadership", "teamwork", "stakeholder", "customer",
+    "sales", "negotiat", "interpersonal", "manage",
+]
+COGNITIVE_TERMS = ["reasoning", "aptitude", "analytical", "problem solving", "numerical", "cognitive"]
+
+class FakeLLMError(RuntimeError):
+    pass
+
+class FakeResponse:
+
+    def __init__(self, content: str):
+        self.content = content
+
+class FakeChatModel:
+
+    def __init__(
+        self,
+        latency_ms: float = None,
+        jitter_ms: float = None,
+        error_rate: float = None,
+        test_types: Optional[List[str]] = None,
+        seed: int = None
+    ):
+        self.latency_ms = config.FAKE_LLM_LATENCY_MS if latency_ms is None else latency_ms
+        self.jitter_ms = config.FAKE_LLM_JITTER_MS if jitter_ms is None else jitter_ms
+        self.error_rate = config.FAKE_LLM_ERROR_RATE if error_rate is None else error_rate
+        self.test_types = test_types if test_types is not None else config.FAKE_LLM_TEST_TYPES
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _simulate_call(self):
+        with self._lock:
+            delay = max(0.0, self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms))
+            fail = self._rng.random() < self.error_rate
+
+        time.sleep(delay / 1000)
+        if fail:
+            raise FakeLLMError("simulated provider error")
+
+    def intent_for(self, prompt: str) -> dict:
+        match = re.search(r"Query:\s*(.*?)\n\s*\nExtract:", prompt, re.S)
+        text = (match.group(1) if match else prompt).lower()
+
+        technical = [t for t in TECHNICAL_TERMS if t in text]
+        soft = [t for t in SOFT_TERMS if t in text]
+
+        if self.test_types:
+            test_types = list(self.test_types)
+        else:
+            test_types = []
+            if technical:
+                test_types.append('K')
+            if soft:
+                test_types.append('P')
+            if any(t in text for t in COGNITIVE_TERMS):
+                test_types.append('C')
+            test_types = test_types or ['K', 'P']
+
+        return {
+            'technical_skills': technical,
+            'soft_skills': soft,
+            'role': '',
+            'test_types_needed': test_types
+        }
+
+    def invoke(self, prompt: str) -> FakeResponse:
+        self._simulate_call()
+        return FakeResponse(str(self.intent_for(prompt)))
+
+    def with_structured_output(self, schema):
+        return FakeStructuredModel(self, schema)
+
+class FakeStructuredModel:
+
+    def __init__(self, model: FakeChatModel, schema):
+        self.model = model
+        self.schema = schema
+
+    def invoke(self, prompt: str):
+        self.model._simulate_call()
+        return self.schema(**self.model.intent_for(prompt))
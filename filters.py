@@ -0,0 +1,105 @@
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from catalog_store import column_values, has_column
+from data_processor import parse_duration_minutes
+
+BITSET_ATTRIBUTES = ('test_type', 'category')
+
+class FilterIndex:
+
+    def __init__(self, n_docs: int):
+        self.n_docs = n_docs
+        # attribute -> value -> packed bitset over doc ids (np.packbits layout)
+        self.bitsets: Dict[str, Dict[str, np.ndarray]] = {attr: {} for attr in BITSET_ATTRIBUTES}
+        # doc ids with a known duration, ordered by duration, for range lookups
+        self.duration_order = np.zeros(0, dtype=np.int64)
+        self.duration_sorted = np.zeros(0, dtype=np.float64)
+
+    @classmethod
+    def build(cls, assessments) -> 'FilterIndex':
+        index = cls(len(assessments))
+        durations = np.full(len(assessments), np.nan)
+        members: Dict[str, Dict[str, List[int]]] = {attr: {} for attr in BITSET_ATTRIBUTES}
+
+        for attr in BITSET_ATTRIBUTES:
+            for doc_id, value in enumerate(column_values(assessments, attr)):
+                members[attr].setdefault(value or '', []).append(doc_id)
+
+        if has_column(assessments, 'duration_minutes'):
+            minutes = column_values(assessments, 'duration_minutes')
+        else:
+            # Catalogs processed before durations were parsed
+            minutes = [parse_duration_minutes(d) for d in column_values(assessments, 'duration', '')]
+        for doc_id, value in enumerate(minutes):
+            if value is not None:
+                durations[doc_id] = value
+
+        for attr, values in members.items():
+            for value, doc_ids in values.items():
+                mask = np.zeros(len(assessments), dtype=bool)
+                mask[doc_ids] = True
+                index.bitsets[attr][value] = np.packbits(mask)
+
+        known = np.flatnonzero(~np.isnan(durations))
+        order = np.argsort(durations[known], kind='stable')
+        index.duration_order = known[order]
+        index.duration_sorted = durations[known][order]
+        return index
+
+    def values(self, attr: str) -> List[str]:
+        return sorted(v for v in self.bitsets[attr] if v)
+
+    def _union(self, attr: str, wanted: List[str]) -> np.ndarray:
+        packed = np.zeros((self.n_docs + 7) // 8, dtype=np.uint8)
+        for value in wanted:
+            bits = self.bitsets[attr].get(value)
+            if bits is not None:
+                packed |= bits
+        return packed
+
+    def resolve(
+        self,
+        test_types: Optional[List[str]] = None,
+        categories: Optional[List[str]] = None,
+        max_duration: Optional[float] = None
+    ) -> Optional[np.ndarray]:
+        # Sorted doc ids passing every filter, or None when nothing is filtered.
+        packed = None
+        for attr, wanted in (('test_type', test_types), ('category', categories)):
+            if wanted:
+                bits = self._union(attr, wanted)
+                packed = bits if packed is None else packed & bits
+
+        if max_duration is not None:
+            end = np.searchsorted(self.duration_sorted, max_duration, side='right')
+            within = np.sort(self.duration_order[:end])
+            if packed is None:
+                return within
+            mask = np.unpackbits(packed, count=self.n_docs).view(bool)
+            return within[mask[within]]
+
+        if packed is None:
+            return None
+        return np.flatnonzero(np.unpackbits(packed, count=self.n_docs))
+
+    def export(self) -> Tuple[Dict[str, np.ndarray], Dict]:
+        arrays = {
+            'filter_duration_order': self.duration_order,
+            'filter_duration_sorted': self.duration_sorted,
+        }
+        meta = {'n_docs': self.n_docs, 'bitsets': {}}
+        for attr, values in self.bitsets.items():
+            meta['bitsets'][attr] = []
+            for i, (value, bits) in enumerate(sorted(values.items())):
+                arrays[f'filter_{attr}_{i}'] = bits
+                meta['bitsets'][attr].append(value)
+        return arrays, meta
+
+    @classmethod
+    def from_export(cls, arrays: Dict[str, np.ndarray], meta: Dict) -> 'FilterIndex':
+        index = cls(meta['n_docs'])
+        for attr, values in meta['bitsets'].items():
+            index.bitsets[attr] = {value: arrays[f'filter_{attr}_{i}'] for i, value in enumerate(values)}
+        index.duration_order = arrays['filter_duration_order']
+        index.duration_sorted = arrays['filter_duration_sorted']
+        return index
@@ -0,0 +1,114 @@
+import re
+from typing import Dict, List, Optional
+import orjson
+from catalog_store import column_values
+
+# Fast serialization of /recommend responses. Every catalog entry's static
+# fields are encoded once, at index load time, as the opening of its JSON
+# object; a response is then the query, those fragments and the per-request
+# scores joined together. The bytes are identical to
+# RecommendResponse.model_dump_json() (pydantic's compact JSON), which the
+# API still uses for anything these fragments cannot encode.
+
+# orjson and pydantic agree on floats except for the exponent sign: pydantic
+# writes 1e+16 where orjson writes 1e16.
+_POSITIVE_EXPONENT = re.compile(rb'e(?=\d)')
+
+def encode_floats(values: List[float]) -> List[bytes]:
+    encoded = orjson.dumps(values)
+    if b'e' in encoded:
+        encoded = _POSITIVE_EXPONENT.sub(b'e+', encoded)
+    return encoded[1:-1].split(b',') if values else []
+
+def _score(value):
+    # Scores as pydantic's Optional[float] field would accept them
+    if value is None or type(value) is float:
+        return value
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise TypeError(value)
+    return float(value)
+
+def _fragment(name, url, test_type) -> Optional[bytes]:
+    if not isinstance(name, str) or not isinstance(url, str) or not isinstance(test_type, (str, type(None))):
+        return None
+    return b''.join((
+        b'{"assessment_name":', orjson.dumps(name),
+        b',"assessment_url":', orjson.dumps(url),
+        b',"test_type":', orjson.dumps(test_type),
+        b',"score":'
+    ))
+
+class AssessmentFragments:
+
+    def __init__(self, fragments: Dict[str, bytes], changed: Optional[Dict[str, Optional[bytes]]] = None):
+        self.fragments = fragments
+        # Fragments of URLs upserted since the build, over `fragments` which is
+        # shared between snapshots; None where an upsert cannot be encoded
+        self.changed = changed or {}
+
+    @classmethod
+    def build(cls, assessments) -> 'AssessmentFragments':
+        names = column_values(assessments, 'name')
+        urls = column_values(assessments, 'url')
+        test_types = column_values(assessments, 'test_type')
+
+        fragments = {}
+        duplicates = set()
+        for name, url, test_type in zip(names, urls, test_types):
+            fragment = _fragment(name, url, test_type)
+            if fragment is None:
+                continue
+            # Responses find fragments by URL; a URL shared by entries with
+            # different fields is left to the slow path.
+            if fragments.get(url, fragment) != fragment:
+                duplicates.add(url)
+            fragments[url] = fragment
+
+        for url in duplicates:
+            del fragments[url]
+        return cls(fragments)
+
+    def updated(self, upserts: List[Dict]) -> 'AssessmentFragments':
+        # Upserted assessments replace the fragment of their URL; deleted
+        # ones are never returned, so their fragments can stay. Only the
+        # changes since the build are copied, never the built fragments.
+        changed = dict(self.changed)
+        for asmt in upserts:
+            changed[asmt.get('url')] = _fragment(asmt.get('name'), asmt.get('url'), asmt.get('test_type'))
+        return AssessmentFragments(self.fragments, changed)
+
+    def get(self, url: str) -> Optional[bytes]:
+        if url in self.changed:
+            return self.changed[url]
+        return self.fragments.get(url)
+
+    def __len__(self) -> int:
+        replaced = sum(url in self.fragments for url in self.changed)
+        return len(self.fragments) - replaced + sum(f is not None for f in self.changed.values())
+
+    def encode_response(self, query: str, assessments: List[Dict]) -> Optional[bytes]:
+        # None when any entry is not covered, so the caller can fall back
+        # to pydantic serialization.
+        get = self.get if self.changed else self.fragments.get
+        fragments = [get(asmt.get('url')) for asmt in assessments]
+        if None in fragments:
+            return None
+
+        scores = [asmt.get('retrieval_score', 0.0) for asmt in assessments]
+        if not all(type(score) is float for score in scores):
+            try:
+                scores = [_score(score) for score in scores]
+            except TypeError:
+                return None
+
+        try:
+            parts = [b'{"query":', orjson.dumps(query), b',"recommendations":[']
+        except orjson.JSONEncodeError:
+            return None
+
+        for fragment, score in zip(fragments, encode_floats(scores)):
+            parts += (fragment, score, b'},')
+        if fragments:
+            parts[-1] = b'}'
+        parts += (b'],"total_results":', str(len(fragments)).encode(), b'}')
+        return b''.join(parts)
@@ -10,6 +10,14 @@ const TEST_TYPE_LABELS = {
 };
 
 
+// Typeahead: /suggest is called once typing pauses, for up to the last few
+// words before the cursor (longest first, until one of them has completions).
+const SUGGEST_DEBOUNCE_MS = 150;
+const SUGGEST_MIN_CHARS = 2;
+const SUGGEST_MAX_WORDS = 3;
+const SUGGEST_LIMIT = 8;
+
+
 const sampleQueries = [
     "I am hiring for Java developers who can also collaborate effectively with my business teams",
     "Looking to hire mid-level professionals who are proficient in Python, SQL and JavaScript",
@@ -17,7 +25,12 @@ const sampleQueries = [
 ];
 
 
-let queryInput, searchBtn, loading, error, errorMessage, results, resultsList, resultCount;
+let queryInput, searchBtn, loading, error, errorMessage, results, resultsList, resultCount, refining, suggestionsList;
+
+let suggestTimer = null;
+let suggestController = null;
+let suggestFragment = null;
+let activeSuggestion = -1;
 
 document.addEventListener('DOMContentLoaded', () => {
 
@@ -29,14 +42,21 @@ document.addEventListener('DOMContentLoaded', () => {
     results = document.getElementById('results');
     resultsList = document.getElementById('resultsList');
     resultCount = document.getElementById('resultCount');
+    refining = document.getElementById('refining');
+    suggestionsList = document.getElementById('suggestions');
 
 
     searchBtn.addEventListener('click', handleSearch);
     queryInput.addEventListener('keydown', (e) => {
+        if (handleSuggestionKey(e)) {
+            return;
+        }
         if (e.key === 'Enter' && e.ctrlKey) {
             handleSearch();
         }
     });
+    queryInput.addEventListener('input', scheduleSuggest);
+    queryInput.addEventListener('blur', hideSuggestions);
 
     const randomSample = sampleQueries[Math.floor(Math.random() * sampleQueries.length)];
     queryInput.value = randomSample;
@@ -52,15 +72,17 @@ async function handleSearch() {
     }
 
 
+    hideSuggestions();
     hideError();
     hideResults();
     showLoading();
 
     try {
-        const response = await fetch(`${API_BASE_URL}/recommend`, {
+        const response = await fetch(`${API_BASE_URL}/recommend/stream`, {
             method: 'POST',
             headers: {
-                'Content-Type': 'application/json'
+                'Content-Type': 'application/json',
+                'Accept': 'text/event-stream'
             },
             body: JSON.stringify({
                 query: query,
@@ -72,29 +94,221 @@ async function handleSearch() {
             throw new Error(`API error: ${response.status}`);
         }
 
-        const data = await response.json();
+        let gotFinal = false;
+
+        await readEventStream(response, (event, data) => {
+            if (event === 'retrieval') {
+                hideLoading();
+                displayResults(data, true);
+            } else if (event === 'final') {
+                gotFinal = true;
+                displayResults(data, false);
+            } else if (event === 'error') {
+                throw new Error(data.detail || 'Recommendation failed');
+            }
+        });
 
-        displayResults(data);
+        if (!gotFinal) {
+            throw new Error('Stream ended before final results');
+        }
 
     } catch (err) {
         console.error('Error:', err);
         showError(`Failed to get recommendations: ${err.message}. Make sure the API is running on ${API_BASE_URL}`);
     } finally {
         hideLoading();
+        hideRefining();
+    }
+}
+
+
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) {
+            break;
+        }
+
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const block = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = 'message';
+            const dataLines = [];
+            block.split('\n').forEach((line) => {
+                if (line.startsWith('event:')) {
+                    event = line.slice(6).trim();
+                } else if (line.startsWith('data:')) {
+                    dataLines.push(line.slice(5).trim());
+                }
+            });
+
+            if (dataLines.length > 0) {
+                onEvent(event, JSON.parse(dataLines.join('\n')));
+            }
+        }
+    }
+}
+
+function scheduleSuggest() {
+    clearTimeout(suggestTimer);
+    suggestTimer = setTimeout(fetchSuggestions, SUGGEST_DEBOUNCE_MS);
+}
+
+function suggestFragments() {
+    // Candidate prefixes ending at the cursor, longest first, as
+    // { start, prefix } with start the offset the prefix begins at
+    const end = queryInput.selectionStart;
+    const text = queryInput.value.slice(0, end);
+    if (end !== queryInput.selectionEnd || !/\S$/.test(text)) {
+        return [];
+    }
+
+    // A fragment stops at line breaks and punctuation between phrases
+    const phraseStart = Math.max(...['\n', ',', ';', '.', '!', '?'].map((c) => text.lastIndexOf(c))) + 1;
+    const starts = [];
+    const wordStart = /\S+/g;
+    let match;
+    while ((match = wordStart.exec(text.slice(phraseStart))) !== null) {
+        starts.push(phraseStart + match.index);
+    }
+
+    return starts.slice(-SUGGEST_MAX_WORDS)
+        .map((start) => ({ start, prefix: text.slice(start) }))
+        .filter((fragment) => fragment.prefix.trim().length >= SUGGEST_MIN_CHARS);
+}
+
+async function fetchSuggestions() {
+    // A newer keystroke supersedes any request still in flight
+    if (suggestController) {
+        suggestController.abort();
+    }
+    const controller = new AbortController();
+    suggestController = controller;
+
+    try {
+        for (const fragment of suggestFragments()) {
+            const params = new URLSearchParams({ prefix: fragment.prefix, limit: SUGGEST_LIMIT });
+            const response = await fetch(`${API_BASE_URL}/suggest?${params}`, { signal: controller.signal });
+            if (!response.ok) {
+                break;
+            }
+
+            const data = await response.json();
+            if (data.suggestions.length > 0) {
+                showSuggestions(fragment, data.suggestions);
+                return;
+            }
+        }
+        hideSuggestions();
+    } catch (err) {
+        if (err.name !== 'AbortError') {
+            hideSuggestions();
+        }
+    }
+}
+
+function showSuggestions(fragment, items) {
+    suggestFragment = fragment;
+    activeSuggestion = -1;
+    suggestionsList.innerHTML = '';
+
+    items.forEach((item) => {
+        const li = document.createElement('li');
+        li.className = 'suggestion';
+        li.setAttribute('role', 'option');
+        li.innerHTML = `
+            <span>${escapeHtml(item.text)}</span>
+            <span class="suggestion-kind">${escapeHtml(item.kind)}</span>
+        `;
+        // mousedown fires before the textarea loses focus and hides the list
+        li.addEventListener('mousedown', (e) => {
+            e.preventDefault();
+            acceptSuggestion(item.text);
+        });
+        suggestionsList.appendChild(li);
+    });
+
+    suggestionsList.classList.remove('hidden');
+}
+
+function hideSuggestions() {
+    clearTimeout(suggestTimer);
+    if (suggestController) {
+        suggestController.abort();
+        suggestController = null;
+    }
+    suggestFragment = null;
+    activeSuggestion = -1;
+    suggestionsList.classList.add('hidden');
+}
+
+function highlightSuggestion(index) {
+    const items = suggestionsList.children;
+    activeSuggestion = (index + items.length) % items.length;
+    Array.from(items).forEach((li, i) => li.classList.toggle('active', i === activeSuggestion));
+}
+
+function handleSuggestionKey(e) {
+    // Arrow keys move through open suggestions, Tab or Enter takes the
+    // highlighted one (Tab alone takes the first) and Escape closes them.
+    if (!suggestFragment || e.ctrlKey) {
+        return false;
+    }
+
+    const items = suggestionsList.children;
+    if (e.key === 'ArrowDown' || e.key === 'ArrowUp') {
+        const from = activeSuggestion < 0 && e.key === 'ArrowUp' ? items.length : activeSuggestion;
+        highlightSuggestion(from + (e.key === 'ArrowDown' ? 1 : -1));
+    } else if (e.key === 'Tab' || (e.key === 'Enter' && activeSuggestion >= 0)) {
+        acceptSuggestion(items[Math.max(activeSuggestion, 0)].firstElementChild.textContent);
+    } else if (e.key === 'Escape') {
+        hideSuggestions();
+    } else {
+        return false;
     }
+
+    e.preventDefault();
+    return true;
 }
 
+function acceptSuggestion(text) {
+    const { start } = suggestFragment;
+    const end = queryInput.selectionStart;
+    const value = queryInput.value;
+    queryInput.value = value.slice(0, start) + text + value.slice(end);
+
+    const cursor = start + text.length;
+    queryInput.setSelectionRange(cursor, cursor);
+    queryInput.focus();
+    hideSuggestions();
+}
 
-function displayResults(data) {
+function displayResults(data, preliminary) {
     const recommendations = data.recommendations || [];
 
     if (recommendations.length === 0) {
-        showError('No recommendations found for this query');
+        if (!preliminary) {
+            showError('No recommendations found for this query');
+        }
         return;
     }
 
     resultCount.textContent = `${recommendations.length} Results`;
 
+    if (preliminary) {
+        showRefining();
+    } else {
+        hideRefining();
+    }
+
     resultsList.innerHTML = '';
 
 
@@ -148,6 +362,16 @@ function hideLoading() {
     searchBtn.disabled = false;
 }
 
+function showRefining() {
+    refining.classList.remove('hidden');
+    resultsList.classList.add('preliminary');
+}
+
+function hideRefining() {
+    refining.classList.add('hidden');
+    resultsList.classList.remove('preliminary');
+}
+
 function showError(message) {
     errorMessage.textContent = message;
     error.classList.remove('hidden');
@@ -1,9 +1,96 @@
+import csv
+import json
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import List, Dict, Set, Iterable, Tuple
 import pandas as pd
 from retriever import LightweightRetriever
 from llm_service import LLMService
+from reranker import build_reranker
 import config
 
-def generate_predictions():
+def load_checkpoint(checkpoint_file: str) -> Set[str]:
+    completed = set()
+    if not os.path.exists(checkpoint_file):
+        return completed
+
+    with open(checkpoint_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                completed.add(json.loads(line)['query'])
+            except (json.JSONDecodeError, KeyError):
+                # A torn last line from a killed run; that query is simply redone.
+                continue
+
+    return completed
+
+def drop_unfinished_rows(output_file: str, completed: Set[str]):
+    # Rows are flushed before the checkpoint line, so a crash in between can
+    # leave rows for a query that will be redone on resume.
+    tmp_file = output_file + '.tmp'
+    with open(output_file, 'r', newline='', encoding='utf-8') as src, \
+            open(tmp_file, 'w', newline='', encoding='utf-8') as dst:
+        reader = csv.DictReader(src)
+        writer = csv.DictWriter(dst, fieldnames=['Query', 'Assessment_url'])
+        writer.writeheader()
+        for row in reader:
+            if row['Query'] in completed:
+                writer.writerow(row)
+
+    os.replace(tmp_file, output_file)
+
+def predict_query(retriever, llm_service, query: str, reranker=None) -> List[Dict]:
+    candidates = retriever.hybrid_search(query, top_k=config.TOP_K_RETRIEVAL)
+
+    if llm_service:
+        reranked = llm_service.rerank_assessments(query, candidates, top_k=config.TOP_K_FINAL, reranker=reranker)
+    elif reranker:
+        reranked = reranker.rerank(query, candidates)[:config.TOP_K_FINAL]
+    else:
+        reranked = candidates[:config.TOP_K_FINAL]
+
+    return [{'Query': query, 'Assessment_url': a['url']} for a in reranked]
+
+def run_bounded(
+    executor: ThreadPoolExecutor,
+    fn,
+    queries: Iterable[str],
+    max_in_flight: int
+) -> Iterable[Tuple[str, List[Dict]]]:
+    pending = {}
+    queries = iter(queries)
+
+    for query in queries:
+        pending[executor.submit(fn, query)] = query
+        if len(pending) >= max_in_flight:
+            break
+
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            query = pending.pop(future)
+            yield query, future.result()
+
+            next_query = next(queries, None)
+            if next_query is not None:
+                pending[executor.submit(fn, next_query)] = next_query
+
+def generate_predictions(
+    output_file: str = None,
+    checkpoint_file: str = None,
+    workers: int = None
+):
+    if output_file is None:
+        output_file = config.PREDICTIONS_FILE
+    if checkpoint_file is None:
+        checkpoint_file = config.PREDICTIONS_CHECKPOINT_FILE
+    if workers is None:
+        workers = config.PREDICTION_WORKERS
+
     print("=" * 60)
     print("Generating Test Set Predictions")
     print("=" * 60)
@@ -14,46 +101,66 @@ def generate_predictions():
 
     print("Initializing LLM service...")
     llm_service = LLMService()
+    reranker = build_reranker(retriever.assessments)
 
     print("\nLoading test data...")
     test_df = pd.read_excel(config.TRAIN_DATA_FILE, sheet_name='Test-Set')
-    test_queries = test_df['Query'].tolist()
+    # Every input row gets its rows in the output; a repeated query is
+    # predicted once and its rows written once per occurrence.
+    occurrences = Counter(test_df['Query'].tolist())
+    test_queries = list(occurrences)
+    del test_df
+
+    print(f"Found {sum(occurrences.values())} test queries ({len(test_queries)} unique)")
+
+    completed = load_checkpoint(checkpoint_file)
+    resuming = bool(completed) and os.path.exists(output_file)
+    if not resuming:
+        completed = set()
+        if os.path.exists(checkpoint_file):
+            os.remove(checkpoint_file)
 
-    print(f"Found {len(test_queries)} test queries")
+    remaining = [q for q in test_queries if q not in completed]
+    if resuming:
+        drop_unfinished_rows(output_file, completed)
+        print(f"Resuming: {len(completed)} queries already done, {len(remaining)} remaining")
 
-    predictions = []
+    total_rows = 0
+    mode = 'a' if resuming else 'w'
 
-    for i, query in enumerate(test_queries, 1):
-        print(f"\n[{i}/{len(test_queries)}] Processing query...")
-        print(f"Query: {query[:100]}...")
+    with open(output_file, mode, newline='', encoding='utf-8') as out, \
+            open(checkpoint_file, 'a', encoding='utf-8') as ckpt, \
+            ThreadPoolExecutor(max_workers=workers) as executor:
 
-        candidates = retriever.hybrid_search(query, top_k=30)
+        writer = csv.DictWriter(out, fieldnames=['Query', 'Assessment_url'])
+        if not resuming:
+            writer.writeheader()
+            out.flush()
 
-        if llm_service:
-            reranked = llm_service.rerank_assessments(query, candidates, top_k=10)
-        else:
-            reranked = candidates[:10]
+        fn = lambda q: predict_query(retriever, llm_service, q, reranker)
 
-        for assessment in reranked:
-            predictions.append({
-                'Query': query,
-                'Assessment_url': assessment['url']
-            })
+        for i, (query, rows) in enumerate(run_bounded(executor, fn, remaining, workers * 2), 1):
+            writer.writerows(rows * occurrences[query])
+            out.flush()
+            os.fsync(out.fileno())
 
-        print(f"  Generated {len(reranked)} recommendations")
+            ckpt.write(json.dumps({'query': query}, ensure_ascii=False) + '\n')
+            ckpt.flush()
 
-    predictions_df = pd.DataFrame(predictions)
+            total_rows += len(rows) * occurrences[query]
+            print(f"\n[{i}/{len(remaining)}] Query: {query[:100]}...")
+            repeats = f" (written for {occurrences[query]} input rows)" if occurrences[query] > 1 else ""
+            print(f"  Generated {len(rows)} recommendations{repeats}")
 
-    output_file = 'predictions.csv'
-    predictions_df.to_csv(output_file, index=False)
+    os.remove(checkpoint_file)
 
     print("\n" + "=" * 60)
     print(f"Predictions saved to {output_file}")
-    print(f"Total rows: {len(predictions_df)}")
+    print(f"Rows written this run: {total_rows}")
     print("=" * 60)
 
     print("\nSample predictions:")
-    print(predictions_df.head(15))
+    print(pd.read_csv(output_file, nrows=15))
 
 if __name__ == "__main__":
     generate_predictions()
@@ -0,0 +1,393 @@
+import copy
+import hashlib
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from catalog_store import binary_path, resolve_catalog_file
+from data_processor import normalize_assessment
+from fragments import AssessmentFragments
+from reranker import build_reranker
+from suggest import SuggestionIndex
+import config
+
+if TYPE_CHECKING:
+    from retriever import LightweightRetriever
+
+class IncrementalChangesUnsupported(RuntimeError):
+    pass
+
+class IndexSnapshot:
+
+    def __init__(self, version: int, retriever: 'LightweightRetriever', source_file: str, fingerprint: str):
+        self.version = version
+        self.retriever = retriever
+        self.source_file = source_file
+        self.fingerprint = fingerprint
+        # Pre-encoded response JSON per assessment, see fragments.py
+        self.fragments = AssessmentFragments.build(retriever.assessments)
+        # Local reranker with this catalog's encoded assessments (None when off)
+        self.reranker = getattr(retriever, 'shared_reranker', None) or build_reranker(retriever.assessments)
+        # Typeahead over skills, assessment names and catalog words
+        self.suggestions = SuggestionIndex.build(retriever.assessments, retriever.analyzer)
+        self.loaded_at = time.time()
+
+    def updated(self, version: int, retriever: 'LightweightRetriever', upserts: List[Dict]) -> 'IndexSnapshot':
+        # Snapshot after incremental changes to this one's retriever; the
+        # fragments, reranker and suggestions are patched for the upserted
+        # assessments rather than rebuilt.
+        snapshot = copy.copy(self)
+        snapshot.version = version
+        snapshot.retriever = retriever
+        snapshot.fragments = self.fragments.updated(upserts)
+        snapshot.reranker = self.reranker.updated(upserts) if self.reranker else None
+        snapshot.suggestions = self.suggestions.updated(retriever)
+        snapshot.loaded_at = time.time()
+        return snapshot
+
+    def info(self) -> dict:
+        delta = self.retriever.delta
+        return {
+            'version': self.version,
+            'source_file': self.source_file,
+            'fingerprint': self.fingerprint,
+            'loaded_at': self.loaded_at,
+            'num_assessments': self.retriever.num_live,
+            'delta_assessments': len(delta.docs) if delta else 0,
+            'deleted_assessments': len(delta.deleted) if delta else 0
+        }
+
+def file_fingerprint(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()[:12]
+
+def catalog_mtime(path: str) -> float:
+    # Latest change to a catalog in either of its formats
+    mtimes = [os.path.getmtime(p) for p in (path, binary_path(path)) if os.path.exists(p)]
+    if not mtimes:
+        raise FileNotFoundError(path)
+    return max(mtimes)
+
+class IndexManager:
+
+    def __init__(self, catalog_file: str = None):
+        if catalog_file is None:
+            catalog_file = config.PROCESSED_CATALOG_FILE
+
+        self.catalog_file = catalog_file
+        self._snapshot: Optional[IndexSnapshot] = None
+        self._next_version = 1
+        self._reload_lock = threading.Lock()
+        self._reload_thread: Optional[threading.Thread] = None
+        self.last_error: Optional[str] = None
+        self._watch_stop = threading.Event()
+        self._watch_thread: Optional[threading.Thread] = None
+        self._watched_mtime: Optional[float] = None
+        # Change batches applied since the active index was last fitted, and
+        # a counter of full loads, so a compaction that raced a reload is dropped
+        self._changes: List[Tuple[List[Dict], List[str]]] = []
+        self._generation = 0
+        self._compact_lock = threading.Lock()
+        self._compact_thread: Optional[threading.Thread] = None
+        self._compact_stop = threading.Event()
+        self._compact_loop_thread: Optional[threading.Thread] = None
+
+    def current(self) -> Optional[IndexSnapshot]:
+        # Callers hold on to the returned snapshot for the whole request, so a
+        # concurrent swap never changes the index underneath them.
+        return self._snapshot
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version if self._snapshot else 0
+
+    @property
+    def reloading(self) -> bool:
+        return self._reload_thread is not None and self._reload_thread.is_alive()
+
+    @property
+    def compacting(self) -> bool:
+        return self._compact_lock.locked()
+
+    def _build(self, catalog_file: str, fingerprint: str) -> 'LightweightRetriever':
+        # Retriever modules are imported on first build: scikit-learn and
+        # scipy dominate the import time of the API otherwise.
+        if config.SHARED_INDEX_DIR:
+            from shared_index import load_shared
+            return load_shared(catalog_file, fingerprint)
+
+        if config.RETRIEVAL_SHARDS > 1:
+            from sharded_retriever import ShardedRetriever
+            retriever = ShardedRetriever(config.RETRIEVAL_SHARDS)
+            retriever.load_and_fit(catalog_file)
+            return retriever
+
+        from retriever import LightweightRetriever
+        retriever = LightweightRetriever()
+        retriever.load_and_fit(catalog_file)
+        return retriever
+
+    def load(self, catalog_file: str = None) -> IndexSnapshot:
+        if catalog_file is None:
+            catalog_file = self.catalog_file
+
+        with self._reload_lock:
+            source_file = resolve_catalog_file(catalog_file)
+            fingerprint = file_fingerprint(source_file)
+            mtime = catalog_mtime(catalog_file)
+            retriever = self._build(catalog_file, fingerprint)
+
+            snapshot = IndexSnapshot(self._next_version, retriever, source_file, fingerprint)
+            self._next_version += 1
+            self._watched_mtime = mtime
+            self.catalog_file = catalog_file
+            # Changes applied through apply_changes are superseded by the file
+            self._changes = []
+            self._generation += 1
+
+            self._snapshot = snapshot
+            self.last_error = None
+
+        print(f"Index snapshot v{snapshot.version} active ({fingerprint})")
+        return snapshot
+
+    def _load_in_background(self, catalog_file: str):
+        try:
+            self.load(catalog_file)
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Index reload failed, keeping v{self.version}: {e}")
+
+    def reload_async(self, catalog_file: str = None) -> bool:
+        if self.reloading:
+            return False
+
+        if catalog_file is None:
+            catalog_file = self.catalog_file
+
+        self._reload_thread = threading.Thread(
+            target=self._load_in_background,
+            args=(catalog_file,),
+            name="index-reload",
+            daemon=True
+        )
+        self._reload_thread.start()
+        return True
+
+    def apply_changes(self, upserts: List[Dict], deletes: List[str]) -> Tuple[IndexSnapshot, int, List[str]]:
+        # Upserts processed assessments and deletes URLs on top of the active
+        # snapshot, in time proportional to the changed assessments. Returns
+        # the new snapshot, the number of assessments deleted and the deleted
+        # URLs that were not in the index.
+        # Changes live in this process only, while other workers keep serving
+        # the catalog file, so they are refused wherever there can be several.
+        if config.SHARED_INDEX_DIR or config.API_WORKERS > 1:
+            raise IncrementalChangesUnsupported(
+                "Incremental changes are not shared between workers; update the catalog file and reload instead"
+            )
+
+        deletes = list(dict.fromkeys(deletes))
+        with self._reload_lock:
+            current = self._snapshot
+            if current is None:
+                raise RuntimeError("No index loaded")
+
+            not_found = [url for url in deletes if current.retriever.doc_id(url) is None]
+            retriever = current.retriever.apply_changes(upserts, deletes)
+            snapshot = current.updated(self._next_version, retriever, upserts)
+            self._next_version += 1
+            self._changes.append((upserts, deletes))
+            self._snapshot = snapshot
+
+        deleted = len(deletes) - len(not_found)
+        print(f"Index snapshot v{snapshot.version} active (+{len(upserts)} upserted, -{deleted} deleted)")
+        return snapshot, deleted, not_found
+
+    def compact(self) -> bool:
+        # Refits the index over the live assessments without blocking
+        # requests or changes; changes applied meanwhile are replayed on top.
+        if not self._compact_lock.acquire(blocking=False):
+            return False
+        try:
+            with self._reload_lock:
+                source = self._snapshot
+                if source is None or source.retriever.delta is None:
+                    return False
+                generation = self._generation
+                applied = len(self._changes)
+
+            start = time.perf_counter()
+            # Numbered when it is swapped in
+            compacted = IndexSnapshot(0, source.retriever.compact(), source.source_file, source.fingerprint)
+
+            with self._reload_lock:
+                if generation != self._generation:
+                    print("Index reloaded during compaction, discarding the compacted index")
+                    return False
+
+                pending = self._changes[applied:]
+                snapshot = compacted
+                for upserts, deletes in pending:
+                    snapshot = snapshot.updated(0, snapshot.retriever.apply_changes(upserts, deletes), upserts)
+                snapshot.version = self._next_version
+                self._next_version += 1
+                self._changes = pending
+                self._snapshot = snapshot
+
+            print(f"Index snapshot v{snapshot.version} active (compacted in "
+                  f"{time.perf_counter() - start:.1f}s, {len(pending)} change batches replayed)")
+            return True
+        finally:
+            self._compact_lock.release()
+
+    def _compact_in_background(self):
+        try:
+            self.compact()
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Index compaction failed, keeping v{self.version}: {e}")
+
+    def compact_async(self) -> bool:
+        if self.compacting or (self._compact_thread is not None and self._compact_thread.is_alive()):
+            return False
+
+        self._compact_thread = threading.Thread(
+            target=self._compact_in_background,
+            name="index-compact",
+            daemon=True
+        )
+        self._compact_thread.start()
+        return True
+
+    def wait_for_compaction(self, timeout: float = None):
+        thread = self._compact_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _compact_loop(self, interval: float):
+        while not self._compact_stop.wait(interval):
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.retriever.needs_compaction():
+                self.compact_async()
+
+    def start_compacting(self, interval: float = None):
+        if interval is None:
+            interval = config.INDEX_COMPACT_INTERVAL
+        if interval <= 0 or self._compact_loop_thread is not None:
+            return
+
+        self._compact_stop.clear()
+        self._compact_loop_thread = threading.Thread(
+            target=self._compact_loop,
+            args=(interval,),
+            name="index-compact-check",
+            daemon=True
+        )
+        self._compact_loop_thread.start()
+
+    def stop_compacting(self):
+        self._compact_stop.set()
+        if self._compact_loop_thread is not None:
+            self._compact_loop_thread.join()
+            self._compact_loop_thread = None
+
+    def wait_for_reload(self, timeout: float = None):
+        thread = self._reload_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _watch_loop(self, interval: float):
+        while not self._watch_stop.wait(interval):
+            try:
+                mtime = catalog_mtime(self.catalog_file)
+            except OSError:
+                continue
+
+            if self._watched_mtime is not None and mtime != self._watched_mtime and not self.reloading:
+                print(f"Catalog file changed, reloading {self.catalog_file}")
+                self._watched_mtime = mtime
+                self.reload_async()
+
+    def start_watching(self, interval: float = None):
+        if interval is None:
+            interval = config.INDEX_WATCH_INTERVAL
+        if interval <= 0 or self._watch_thread is not None:
+            return
+
+        self._watch_stop.clear()
+        self._watch_thread = threading.Thread(
+            target=self._watch_loop,
+            args=(interval,),
+            name="index-watch",
+            daemon=True
+        )
+        self._watch_thread.start()
+
+    def stop_watching(self):
+        self._watch_stop.set()
+        if self._watch_thread is not None:
+            self._watch_thread.join()
+            self._watch_thread = None
+
+def main():
+    print("=" * 60)
+    print("Index Hot Reload Test")
+    print("=" * 60)
+
+    manager = IndexManager()
+    manager.load()
+
+    failures = []
+    served = {}
+    stop = threading.Event()
+
+    def traffic():
+        while not stop.is_set():
+            snapshot = manager.current()
+            try:
+                results = snapshot.retriever.hybrid_search("Java developer with collaboration skills", top_k=10)
+                assert results, "empty result"
+                served[snapshot.version] = served.get(snapshot.version, 0) + 1
+            except Exception as e:
+                failures.append(repr(e))
+
+    workers = [threading.Thread(target=traffic) for _ in range(4)]
+    for w in workers:
+        w.start()
+
+    for _ in range(3):
+        manager.reload_async()
+        manager.wait_for_reload()
+
+    # Incremental changes, then a compaction folding them back in
+    removed = manager.current().retriever.assessments[0]['url']
+    added = normalize_assessment({
+        'url': 'https://example.com/incremental-java-test/',
+        'name': 'Incremental Java Test',
+        'description': 'Java developer collaboration',
+        'test_type': 'K'
+    })
+    snapshot, deleted, _ = manager.apply_changes([added], [removed, removed])
+    assert deleted == 1
+    assert snapshot.retriever.doc_id(removed) is None
+    assert snapshot.retriever.doc_id(added['url']) is not None
+    assert manager.compact()
+
+    stop.set()
+    for w in workers:
+        w.join()
+
+    print(f"\nRequests served per version: {served}")
+    print(f"Failed requests: {len(failures)}")
+    assert not failures, failures[:5]
+    assert manager.version == 6
+    assert manager.current().retriever.delta is None
+    assert manager.current().retriever.doc_id(added['url']) is not None
+
+    print("\n" + "=" * 60)
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
 import os
+import threading
 from typing import List, Dict, Optional
 import config
 import json
+from metrics import timed, llm_requests_total
+from query_cache import NearDuplicateCache
 from pydantic import BaseModel, Field
 
 class QueryIntent(BaseModel):
@@ -15,6 +18,15 @@ class LLMService:
     def __init__(self):
         self.provider = None
         self.model = None
+        # Intents of near-duplicate queries are reused instead of asking the LLM again
+        self.intent_cache = NearDuplicateCache("intent")
+        self._local = threading.local()
+
+        if config.LLM_PROVIDER == "fake":
+            self._init_fake()
+            print(f"✓ Initialized fake LLM ({config.FAKE_LLM_LATENCY_MS:.0f} ms, "
+                  f"error rate {config.FAKE_LLM_ERROR_RATE})")
+            return
 
         if self._init_groq():
             print(f"✓ Initialized Groq LLM: {config.GROQ_MODEL}")
@@ -47,6 +59,14 @@ class LLMService:
             print(f"Could not initialize Groq: {e}")
             return False
 
+    def _init_fake(self) -> bool:
+        from fake_llm import FakeChatModel
+
+        self.model = FakeChatModel()
+        self.structured_model = self.model.with_structured_output(QueryIntent)
+        self.provider = "fake"
+        return True
+
     def _init_gemini(self) -> bool:
         try:
             import google.generativeai as genai
@@ -69,8 +89,9 @@ class LLMService:
             return None
 
         try:
-            if self.provider == "groq":
+            if self.provider in ("groq", "fake"):
                 response = self.model.invoke(prompt)
+                llm_requests_total.inc(provider=self.provider, outcome="success")
                 return response.content
 
             elif self.provider == "gemini":
@@ -78,17 +99,35 @@ class LLMService:
                     prompt,
                     generation_config={'temperature': config.LLM_TEMPERATURE}
                 )
+                llm_requests_total.inc(provider=self.provider, outcome="success")
                 return response.text
 
         except Exception as e:
+            llm_requests_total.inc(provider=self.provider, outcome="error")
             print(f"LLM call failed ({self.provider}): {e}")
             return None
 
+    def intent_degraded(self) -> bool:
+        # Whether the last intent extraction on this thread fell back after an
+        # LLM error, so results built on it should not be cached.
+        return getattr(self._local, 'degraded', False)
+
+    def reset_intent_status(self):
+        # Called at the start of each request: worker threads are reused, and
+        # a request may not extract an intent at all.
+        self._local.degraded = False
+
+    @timed('extract_query_intent')
     def extract_query_intent(self, query: str) -> Dict:
+        self._local.degraded = False
         if not self.model:
             return {'technical_skills': [], 'soft_skills': [], 'role': '', 'test_types_needed': ['K', 'P']}
 
-        if self.provider == "groq" and hasattr(self, 'structured_model'):
+        cached = self.intent_cache.get(query)
+        if cached is not None:
+            return dict(cached)
+
+        if self.provider in ("groq", "fake") and hasattr(self, 'structured_model'):
             prompt = f"""Analyze this job query and extract key information:
 
 Query: {query}
@@ -108,8 +147,13 @@ Test types:
 
             try:
                 result = self.structured_model.invoke(prompt)
-                return result.model_dump()
+                llm_requests_total.inc(provider=self.provider, outcome="success")
+                intent = result.model_dump()
+                self.intent_cache.put(query, intent)
+                return dict(intent)
             except Exception as e:
+                llm_requests_total.inc(provider=self.provider, outcome="error")
+                self._local.degraded = True
                 print(f"Structured extraction failed: {e}")
                 return {'technical_skills': [], 'soft_skills': [], 'role': '', 'test_types_needed': ['K', 'P']}
 
@@ -119,16 +163,26 @@ Test types:
         self,
         query: str,
         assessments: List[Dict],
-        top_k: int = 10
+        top_k: int = 10,
+        allowed_types: Optional[List[str]] = None,
+        reranker=None
     ) -> List[Dict]:
+        if reranker is not None:
+            assessments = reranker.rerank(query, assessments)
+
         if not self.model or not assessments:
-            return self._balance_test_types(assessments, ['K', 'P'], top_k)
+            needed_types = ['K', 'P']
+        else:
+            intent = self.extract_query_intent(query)
+            needed_types = intent.get('test_types_needed', ['K', 'P'])
 
-        intent = self.extract_query_intent(query)
-        needed_types = intent.get('test_types_needed', ['K', 'P'])
+        if allowed_types:
+            # Candidates were already filtered to these types; don't reserve slots for others.
+            needed_types = [t for t in needed_types if t in allowed_types] or list(allowed_types)
 
         return self._balance_test_types(assessments, needed_types, top_k)
 
+    @timed('balance_test_types')
     def _balance_test_types(
         self,
         assessments: List[Dict],
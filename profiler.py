@@ -0,0 +1,127 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Optional
+import config
+
+def _collapse(frame) -> str:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+class SamplingProfiler:
+
+    def __init__(self, output_dir: str = None, interval: float = None):
+        self.output_dir = output_dir or config.PROFILE_DIR
+        self.interval = interval or config.PROFILE_SAMPLE_INTERVAL
+        self._lock = threading.Lock()
+        self._remaining = 0
+        self._samples = Counter()
+        self._active_threads = {}
+        self._sampler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.profiled_requests = 0
+        self.last_profile: Optional[str] = None
+
+    @property
+    def armed(self) -> bool:
+        return self._remaining > 0
+
+    def arm(self, num_requests: int, interval: float = None):
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+
+        with self._lock:
+            self._remaining = num_requests
+            self._samples = Counter()
+            self.profiled_requests = 0
+            if interval:
+                self.interval = interval
+            self._stop.clear()
+            self._sampler = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+            self._sampler.start()
+
+    def disarm(self) -> Optional[str]:
+        with self._lock:
+            self._remaining = 0
+        self._stop.set()
+        return self.dump()
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            if not self._active_threads:
+                continue
+            frames = sys._current_frames()
+            stacks = [_collapse(frames[ident]) for ident in list(self._active_threads) if ident in frames]
+            # dump() swaps _samples under the lock; counting outside it could
+            # land in a Counter that has already been written out.
+            with self._lock:
+                for stack in stacks:
+                    self._samples[stack] += 1
+
+    @contextmanager
+    def profile_request(self):
+        # Cheap no-op unless the profiler has been armed via the admin endpoint.
+        if not self._remaining:
+            yield
+            return
+
+        with self._lock:
+            if self._remaining <= 0:
+                take = False
+            else:
+                self._remaining -= 1
+                take = True
+        if not take:
+            yield
+            return
+
+        ident = threading.get_ident()
+        self._active_threads[ident] = self._active_threads.get(ident, 0) + 1
+        try:
+            yield
+        finally:
+            count = self._active_threads.pop(ident, 1) - 1
+            if count > 0:
+                self._active_threads[ident] = count
+
+            with self._lock:
+                self.profiled_requests += 1
+                finished = self._remaining == 0 and not self._active_threads
+            if finished:
+                self._stop.set()
+                self.dump()
+
+    def dump(self) -> Optional[str]:
+        with self._lock:
+            samples, self._samples = self._samples, Counter()
+        if not samples:
+            return None
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"profile-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.folded")
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+        self.last_profile = path
+        print(f"Wrote collapsed-stack profile ({sum(samples.values())} samples) to {path}")
+        return path
+
+    def status(self) -> dict:
+        return {
+            'armed': self.armed,
+            'remaining_requests': self._remaining,
+            'profiled_requests': self.profiled_requests,
+            'interval_ms': self.interval * 1000,
+            'last_profile': self.last_profile
+        }
+
+profiler = SamplingProfiler()
@@ -0,0 +1,188 @@
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+import numpy as np
+from metrics import record_cache
+import config
+
+# Near-duplicate query cache. Queries are normalized (case, punctuation,
+# whitespace) and cut into overlapping word shingles. A MinHash signature of
+# the shingle set is split into LSH bands, so a lookup only compares against
+# entries sharing at least one band. Those candidates are then checked with
+# the exact Jaccard similarity of their shingle sets, so a hit always means
+# similarity >= threshold; LSH only decides which entries get checked.
+# Numbers must also match exactly: "30 minutes" and "60 minutes" ask for
+# different assessments however similar the rest of the text is.
+# With exact_only, only queries with the same normalized text are hits.
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+_NON_WORD = re.compile(r"[^\w+#]+")
+
+def normalize_query(query: str) -> str:
+    # Keeps '+' and '#' so C++ and C# stay distinct from C
+    return " ".join(_NON_WORD.sub(" ", query.lower()).split())
+
+def shingle_hashes(normalized: str, size: int) -> np.ndarray:
+    words = normalized.split()
+    if len(words) <= size:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+    return np.unique(np.array([zlib.crc32(s.encode('utf-8')) for s in shingles], dtype=np.uint64))
+
+def numeric_tokens(normalized: str) -> Tuple[str, ...]:
+    return tuple(sorted(w for w in normalized.split() if w.isdigit()))
+
+def jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    common = len(np.intersect1d(a, b, assume_unique=True))
+    return common / (len(a) + len(b) - common)
+
+class _Entry:
+    __slots__ = ('value', 'scope', 'normalized', 'numbers', 'shingles', 'band_keys')
+
+    def __init__(self, value, scope, normalized: str, shingles: np.ndarray, band_keys: List[Tuple]):
+        self.value = value
+        self.scope = scope
+        self.normalized = normalized
+        self.numbers = numeric_tokens(normalized)
+        self.shingles = shingles
+        self.band_keys = band_keys
+
+class NearDuplicateCache:
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = None,
+        threshold: float = None,
+        num_perm: int = None,
+        bands: int = None,
+        shingle_size: int = None,
+        seed: int = 1,
+        exact_only: bool = False
+    ):
+        self.name = name
+        self.exact_only = exact_only
+        self.max_entries = max_entries if max_entries is not None else config.QUERY_CACHE_SIZE
+        self.threshold = threshold if threshold is not None else config.QUERY_CACHE_THRESHOLD
+        self.num_perm = num_perm or config.QUERY_CACHE_PERMUTATIONS
+        self.bands = bands or config.QUERY_CACHE_BANDS
+        self.shingle_size = shingle_size or config.QUERY_CACHE_SHINGLE_SIZE
+        if self.num_perm % self.bands:
+            raise ValueError(f"num_perm ({self.num_perm}) must be a multiple of bands ({self.bands})")
+        self.rows = self.num_perm // self.bands
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, int(MERSENNE_PRIME), self.num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, int(MERSENNE_PRIME), self.num_perm, dtype=np.uint64)
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()
+        self._exact: Dict[Tuple[Hashable, str], int] = {}
+        self._buckets: Dict[Tuple, set] = {}
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def signature(self, shingles: np.ndarray) -> np.ndarray:
+        # Universal hashing per permutation; uint64 products wrap like the
+        # reference MinHash implementation.
+        with np.errstate(over='ignore'):
+            hashed = (shingles[:, None] * self._a + self._b) % MERSENNE_PRIME & MAX_HASH
+        return hashed.min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, scope: Hashable, shingles: np.ndarray) -> List[Tuple]:
+        signature = self.signature(shingles)
+        return [
+            (scope, band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    def lookup(self, query: str, scope: Hashable = None) -> Tuple[Optional[Any], float]:
+        # (value, similarity) of the most similar entry at or above the
+        # threshold in the same scope, or (None, 0.0).
+        if self.max_entries <= 0:
+            return None, 0.0
+
+        normalized = normalize_query(query)
+        with self._lock:
+            entry_id = self._exact.get((scope, normalized))
+            if entry_id is not None:
+                self._entries.move_to_end(entry_id)
+                return self._entries[entry_id].value, 1.0
+        if self.exact_only:
+            return None, 0.0
+
+        numbers = numeric_tokens(normalized)
+        shingles = shingle_hashes(normalized, self.shingle_size)
+        band_keys = self._band_keys(scope, shingles)
+
+        with self._lock:
+            candidates = set()
+            for key in band_keys:
+                candidates.update(self._buckets.get(key, ()))
+
+            best_id, best = None, 0.0
+            for entry_id in candidates:
+                entry = self._entries[entry_id]
+                if entry.numbers != numbers:
+                    continue
+                similarity = jaccard(shingles, entry.shingles)
+                if similarity >= self.threshold and (similarity > best or (similarity == best and entry_id > best_id)):
+                    best_id, best = entry_id, similarity
+
+            if best_id is None:
+                return None, 0.0
+            self._entries.move_to_end(best_id)
+            return self._entries[best_id].value, best
+
+    def get(self, query: str, scope: Hashable = None) -> Optional[Any]:
+        value, _ = self.lookup(query, scope)
+        record_cache(self.name, value is not None)
+        return value
+
+    def put(self, query: str, value: Any, scope: Hashable = None):
+        if self.max_entries <= 0 or value is None:
+            return
+
+        normalized = normalize_query(query)
+        if self.exact_only:
+            shingles, band_keys = None, []
+        else:
+            shingles = shingle_hashes(normalized, self.shingle_size)
+            band_keys = self._band_keys(scope, shingles)
+
+        with self._lock:
+            old_id = self._exact.get((scope, normalized))
+            if old_id is not None:
+                self._remove(old_id)
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = _Entry(value, scope, normalized, shingles, band_keys)
+            self._exact[(scope, normalized)] = entry_id
+            for key in band_keys:
+                self._buckets.setdefault(key, set()).add(entry_id)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        del self._exact[(entry.scope, entry.normalized)]
+        for key in entry.band_keys:
+            bucket = self._buckets[key]
+            bucket.discard(entry_id)
+            if not bucket:
+                del self._buckets[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._exact.clear()
+            self._buckets.clear()
@@ -0,0 +1,213 @@
+import copy
+import functools
+from typing import Dict, List, Optional
+import numpy as np
+from catalog_store import column_values
+from metrics import timed, annotate
+import config
+
+# Local CPU reranking of retrieval candidates, applied before test-type
+# balancing as an alternative to (or together with) the remote LLM. Each
+# reranker encodes the catalog side once per index snapshot (fit); a query then
+# costs one encoding of the query and one batched scoring pass over all
+# candidates, which are matched to their cached representation by URL.
+
+def _min_max(scores: np.ndarray) -> np.ndarray:
+    span = scores.max() - scores.min()
+    return (scores - scores.min()) / span if span > 0 else np.zeros_like(scores)
+
+class Reranker:
+    name = "base"
+
+    def __init__(self, weight: float = None):
+        # 1.0 ranks by the reranker alone; lower values blend in the
+        # retrieval score, both min-max normalized over the candidates.
+        self.weight = config.RERANKER_WEIGHT if weight is None else weight
+        self._rows: Dict[str, int] = {}
+        # URLs upserted since fit, whose cached representation is out of date
+        self._stale = frozenset()
+
+    def fit(self, assessments):
+        self._fit_rows(assessments)
+        self._fit_texts(column_values(assessments, 'search_text', ''))
+        return self
+
+    def attach(self, assessments, arrays: Dict[str, np.ndarray]) -> 'Reranker':
+        # Fitted state another process exported (see export) for the same
+        # assessments, e.g. mapped from a shared index, instead of encoding
+        # the catalog again
+        self._fit_rows(assessments)
+        self._attach_arrays(arrays)
+        return self
+
+    def export(self) -> Dict[str, np.ndarray]:
+        # The catalog-side arrays, to share between processes; empty when
+        # the fitted state is not kept in arrays
+        return {}
+
+    def _fit_rows(self, assessments):
+        urls = column_values(assessments, 'url')
+        self._rows = {url: i for i, url in enumerate(urls)}
+        self._stale = frozenset()
+
+    def updated(self, upserts: List[Dict]) -> 'Reranker':
+        # Shares the fitted representations; candidate lists that include an
+        # upserted assessment are encoded on the fly until the next fit.
+        reranker = copy.copy(self)
+        reranker._stale = self._stale | {asmt.get('url') for asmt in upserts}
+        return reranker
+
+    def _fit_texts(self, texts: List[str]):
+        raise NotImplementedError
+
+    def _attach_arrays(self, arrays: Dict[str, np.ndarray]):
+        raise NotImplementedError
+
+    def _candidate_rows(self, candidates: List[Dict]) -> Optional[List[int]]:
+        if self._stale and any(c.get('url') in self._stale for c in candidates):
+            return None
+        rows = [self._rows.get(c.get('url')) for c in candidates]
+        return None if None in rows else rows
+
+    def score(self, query: str, candidates: List[Dict]) -> np.ndarray:
+        raise NotImplementedError
+
+    @timed('local_rerank')
+    def rerank(self, query: str, candidates: List[Dict]) -> List[Dict]:
+        if not candidates:
+            return candidates
+
+        scores = np.asarray(self.score(query, candidates), dtype=np.float64)
+        if self.weight < 1:
+            retrieval = np.array([c.get('retrieval_score', 0.0) for c in candidates], dtype=np.float64)
+            scores = self.weight * _min_max(scores) + (1 - self.weight) * _min_max(retrieval)
+
+        # Stable, so ties keep the retrieval order
+        order = np.argsort(-scores, kind='stable')
+        annotate('reranked', len(candidates))
+        return [candidates[i] for i in order]
+
+class HashingReranker(Reranker):
+    # Dependency-free stand-in: cosine similarity of hashed character
+    # n-grams. Useful to exercise the stage without a model download; it
+    # ranks worse than the hybrid retrieval it reorders.
+    name = "hashing"
+
+    def __init__(self, weight: float = None):
+        super().__init__(weight)
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        self.vectorizer = HashingVectorizer(
+            analyzer='char_wb',
+            ngram_range=(3, 5),
+            n_features=2 ** 18,
+            alternate_sign=False,
+            norm='l2'
+        )
+        self.matrix = None
+
+    def _fit_texts(self, texts: List[str]):
+        self.matrix = self.vectorizer.transform(texts).tocsr()
+
+    def export(self) -> Dict[str, np.ndarray]:
+        return {'data': self.matrix.data, 'indices': self.matrix.indices, 'indptr': self.matrix.indptr}
+
+    def _attach_arrays(self, arrays: Dict[str, np.ndarray]):
+        from scipy.sparse import csr_matrix
+
+        self.matrix = csr_matrix(
+            (arrays['data'], arrays['indices'], arrays['indptr']),
+            shape=(len(arrays['indptr']) - 1, self.vectorizer.n_features),
+            copy=False
+        )
+
+    def score(self, query: str, candidates: List[Dict]) -> np.ndarray:
+        rows = self._candidate_rows(candidates)
+        if rows is not None:
+            docs = self.matrix[rows]
+        else:
+            docs = self.vectorizer.transform([c.get('search_text', '') for c in candidates])
+        return (docs @ self.vectorizer.transform([query]).T).toarray().ravel()
+
+@functools.lru_cache(maxsize=None)
+def _sentence_transformer(model_name: str):
+    # Shared across index snapshots so a reload does not load the model again
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name, device='cpu')
+
+@functools.lru_cache(maxsize=None)
+def _cross_encoder(model_name: str):
+    from sentence_transformers import CrossEncoder
+    return CrossEncoder(model_name, device='cpu')
+
+class EmbeddingReranker(Reranker):
+    # Bi-encoder: catalog embeddings are computed at fit time, so a query is
+    # one forward pass plus a (candidates x dim) dot product.
+    name = "embedding"
+
+    def __init__(self, model_name: str = None, weight: float = None):
+        super().__init__(weight)
+        self.model = _sentence_transformer(model_name or config.RERANKER_MODEL or config.EMBEDDING_MODEL)
+        self.embeddings = None
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(
+            texts,
+            batch_size=config.RERANKER_BATCH_SIZE,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+
+    def _fit_texts(self, texts: List[str]):
+        print(f"Encoding {len(texts)} assessments for reranking...")
+        self.embeddings = self._encode(texts)
+
+    def export(self) -> Dict[str, np.ndarray]:
+        return {'embeddings': self.embeddings}
+
+    def _attach_arrays(self, arrays: Dict[str, np.ndarray]):
+        self.embeddings = arrays['embeddings']
+
+    def score(self, query: str, candidates: List[Dict]) -> np.ndarray:
+        rows = self._candidate_rows(candidates)
+        if rows is not None:
+            docs = self.embeddings[rows]
+        else:
+            docs = self._encode([c.get('search_text', '') for c in candidates])
+        return docs @ self._encode([query])[0]
+
+class CrossEncoderReranker(Reranker):
+    # Scores every (query, assessment) pair jointly in a single batch. The
+    # cached catalog side is the passage text, cut to what the model reads.
+    name = "cross-encoder"
+
+    def __init__(self, model_name: str = None, weight: float = None):
+        super().__init__(weight)
+        self.model = _cross_encoder(model_name or config.RERANKER_MODEL or config.CROSS_ENCODER_MODEL)
+        self.passages: List[str] = []
+
+    def _fit_texts(self, texts: List[str]):
+        self.passages = [" ".join(text.split()[:config.RERANKER_MAX_PASSAGE_WORDS]) for text in texts]
+
+    def score(self, query: str, candidates: List[Dict]) -> np.ndarray:
+        rows = self._candidate_rows(candidates)
+        if rows is not None:
+            passages = [self.passages[row] for row in rows]
+        else:
+            passages = [c.get('search_text', '') for c in candidates]
+        return self.model.predict(
+            [(query, passage) for passage in passages],
+            batch_size=len(passages),
+            show_progress_bar=False
+        )
+
+RERANKERS = {cls.name: cls for cls in (HashingReranker, EmbeddingReranker, CrossEncoderReranker)}
+
+def build_reranker(assessments, name: str = None) -> Optional[Reranker]:
+    name = config.RERANKER if name is None else name
+    if name in ("", "none"):
+        return None
+    if name not in RERANKERS:
+        raise ValueError(f"Unknown reranker '{name}' (available: none, {', '.join(RERANKERS)})")
+    return RERANKERS[name]().fit(assessments)
@@ -1,76 +1,617 @@
-import json
+import copy
 import numpy as np
-from typing import List, Dict, Tuple
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from rank_bm25 import BM25Okapi
+from collections import Counter
+from typing import List, Dict, Optional, Tuple
+from scipy.sparse import csc_matrix, csr_matrix, vstack
+from analyzer import Analyzer, AnalyzedQuery
+from catalog_store import AppendedCatalog, load_catalog, column_values, select_rows
+from filters import FilterIndex
+from metrics import timed, annotate
 import config
 
+BM25_K1 = 1.5
+BM25_B = 0.75
+BM25_EPSILON = 0.25
+
+# Below this fraction of the catalog, filtered TF-IDF scoring slices the
+# allowed rows first instead of scoring everything and masking.
+FILTER_SUBSET_RATIO = 0.25
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    # Highest score first, ties broken by lower index. Every top-k list in the
+    # retriever, sharded merges included, uses this order, so the same query
+    # returns the same documents however the index is split.
+    if top_k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if top_k < len(scores):
+        threshold = scores[np.argpartition(-scores, top_k - 1)[top_k - 1]]
+        above = np.flatnonzero(scores > threshold)
+        # flatnonzero is ascending, so these are the lowest tied indices
+        tied = np.flatnonzero(scores == threshold)[:top_k - len(above)]
+        candidates = np.concatenate([above, tied])
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.lexsort((candidates, -scores[candidates]))][:top_k]
+
+def top_k_sparse(
+    indices: np.ndarray,
+    values: np.ndarray,
+    n_docs: int,
+    top_k: int,
+    allowed: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Same ranking as top_k_indices over the dense score vector, where every
+    # document absent from (indices, values) scores zero; indices must be sorted.
+    # With `allowed` (sorted doc ids), the candidates are those documents and
+    # `indices` must already be among them.
+    universe = len(allowed) if allowed is not None else n_docs
+
+    if len(values) and values.min() < 0:
+        doc_ids = allowed if allowed is not None else np.arange(n_docs)
+        dense = np.zeros(len(doc_ids))
+        dense[np.searchsorted(doc_ids, indices)] = values
+        top = top_k_indices(dense, top_k)
+        return doc_ids[top], dense[top]
+
+    # Positions in `values` follow document order, so ties still go to the
+    # lower document
+    positive = values > 0
+    indices, values = indices[positive], values[positive]
+    order = top_k_indices(values, top_k)
+    top, scores = indices[order], values[order]
+
+    # Short of top_k, the lowest-numbered zero-score documents fill the list
+    need = min(top_k, universe) - len(top)
+    if need > 0:
+        head = allowed[:need + len(indices)] if allowed is not None else np.arange(min(n_docs, need + len(indices)))
+        pad = np.setdiff1d(head, indices)[:need]
+        top = np.concatenate([top, pad])
+        scores = np.concatenate([scores, np.zeros(len(pad))])
+
+    return top, scores
+
+def bm25_idf(df: np.ndarray, n_docs: int) -> np.ndarray:
+    idf = np.log(n_docs - df + 0.5) - np.log(df + 0.5)
+    average_idf = idf.sum() / len(idf) if len(idf) else 0.0
+    idf[idf < 0] = BM25_EPSILON * average_idf
+    return idf
+
+def _doc_term_counts(term_ids: np.ndarray, offsets: np.ndarray, n_terms: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # (doc, term, tf) for every distinct term of every document, doc-major
+    n_docs = len(offsets) - 1
+    docs = np.repeat(np.arange(n_docs, dtype=np.int64), np.diff(offsets))
+    cells, tfs = np.unique(docs * n_terms + term_ids, return_counts=True)
+    rows, cols = np.divmod(cells, n_terms) if n_terms else (cells, cells)
+    return rows, cols, tfs.astype(np.float64)
+
+def bm25_statistics(term_ids: np.ndarray, offsets: np.ndarray, n_terms: int) -> Dict:
+    # Idf and average document length over the whole collection, from the
+    # corpus as analyzed term ids (see Analyzer.fit_transform)
+    n_docs = len(offsets) - 1
+    _, cols, _ = _doc_term_counts(term_ids, offsets, n_terms)
+    return {
+        'idf': bm25_idf(np.bincount(cols, minlength=n_terms).astype(np.float64), n_docs),
+        'avgdl': len(term_ids) / n_docs if n_docs else 0.0
+    }
+
+def _column_top_k(scores, n_docs: int, top_k: int, allowed: Optional[np.ndarray] = None) -> List[List[Tuple[int, float]]]:
+    scores = scores.tocsc()
+    scores.sort_indices()
+    results = []
+    for j in range(scores.shape[1]):
+        start, end = scores.indptr[j], scores.indptr[j + 1]
+        indices, values = scores.indices[start:end], scores.data[start:end]
+        if allowed is not None:
+            keep = np.isin(indices, allowed, assume_unique=True)
+            indices, values = indices[keep], values[keep]
+        top, values = top_k_sparse(indices, values, n_docs, top_k, allowed)
+        results.append([(int(idx), float(score)) for idx, score in zip(top, values)])
+    return results
+
+def _bm25_saturation(tfs: np.ndarray, doc_len: np.ndarray, avgdl: float) -> np.ndarray:
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_len / avgdl) if avgdl else BM25_K1
+    return tfs * (BM25_K1 + 1) / (tfs + norm)
+
+class DeltaSegment:
+    # Changes applied to a fitted retriever since its last fit (see
+    # LightweightRetriever.apply_changes). The fitted arrays are shared and
+    # never modified; instead:
+    #   - upserted assessments get doc ids after the fitted ones, with their
+    #     own BM25 postings and TF-IDF rows from the fitted analyzer (its
+    #     vocabularies and idf stay frozen until the next compaction; tokens
+    #     it does not know get delta term ids after the fitted ones);
+    #   - deleted and replaced assessments are tombstoned and skipped when
+    #     results are collected;
+    #   - BM25 document frequencies and length totals are updated per changed
+    #     document, and the query-side term weights rescale every posting to
+    #     the current idf.
+    # Length normalization keeps the fitted average length, so an assessment
+    # scores the same in either segment; the live average only decides when
+    # to compact. Each batch of changes builds a new segment, so snapshots
+    # holding the previous retriever keep their view of the index.
+
+    def __init__(self, retriever: 'LightweightRetriever'):
+        self.base_size = retriever.bm25_weights.shape[0]
+        self.base_vocab = retriever.analyzer.terms
+        self.base_terms = retriever.analyzer.n_terms
+        self.base_assessments = retriever.assessments
+        self.base_urls = retriever.url_ids()
+        self.avgdl = retriever.avgdl
+
+        df = np.diff(retriever.bm25_weights.indptr).astype(np.float64)
+        base_idf = bm25_idf(df.copy(), self.base_size)
+        # Idf the stored weights were computed with. A term whose fitted idf
+        # was exactly zero has all-zero fitted weights, which stay zero until
+        # the next compaction.
+        self.ref_idf = np.where(base_idf != 0, base_idf, 1.0)
+        self.df = df
+        self.live_docs = self.base_size
+        self.live_len = float(retriever.doc_len.sum())
+        self.scale = np.ones(self.base_terms)
+
+        self.docs: List[Dict] = []
+        self.urls: Dict[str, int] = {}
+        self.deleted = frozenset()
+        self.vocab: Dict[str, int] = {}
+        self.term_postings: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        self.tfidf = csr_matrix((0, retriever.tfidf_matrix.shape[1]))
+        self.filter_index = FilterIndex(0)
+
+    def doc_id(self, url: str) -> Optional[int]:
+        doc_id = self.urls.get(url, self.base_urls.get(url))
+        return None if doc_id is None or doc_id in self.deleted else doc_id
+
+    def assessment(self, doc_id: int) -> Dict:
+        if doc_id < self.base_size:
+            return self.base_assessments[doc_id]
+        return self.docs[doc_id - self.base_size]
+
+    def changed(self) -> int:
+        return len(self.docs) + len(self.deleted)
+
+    def live_avgdl(self) -> float:
+        return self.live_len / self.live_docs if self.live_docs else 0.0
+
+    def apply(self, analyzer: Analyzer, upserts: List[Dict], deletes: List[str]) -> 'DeltaSegment':
+        # Deletes first, then upserts; an upsert replaces the live assessment
+        # with the same URL. Work is proportional to the changed documents,
+        # plus a copy of the per-term arrays.
+        segment = copy.copy(self)
+        segment.docs = list(self.docs)
+        segment.urls = dict(self.urls)
+        segment.vocab = dict(self.vocab)
+        segment.term_postings = dict(self.term_postings)
+        segment.deleted = set(self.deleted)
+        df_change = Counter()
+        added = []
+
+        def term_id(term: str) -> int:
+            if term in self.base_vocab:
+                return self.base_vocab[term]
+            return segment.vocab.setdefault(term, self.base_terms + len(segment.vocab))
+
+        def remove(doc_id: int):
+            tokens = segment.assessment(doc_id).get('search_text', '').lower().split()
+            df_change.update({term_id(term): -1 for term in set(tokens)})
+            segment.live_docs -= 1
+            segment.live_len -= len(tokens)
+            segment.deleted.add(doc_id)
+
+        for url in deletes:
+            doc_id = segment.doc_id(url)
+            if doc_id is not None:
+                remove(doc_id)
+
+        for assessment in upserts:
+            old = segment.doc_id(assessment['url'])
+            if old is not None:
+                remove(old)
+            doc_id = self.base_size + len(segment.docs)
+            segment.docs.append(assessment)
+            segment.urls[assessment['url']] = doc_id
+
+            tokens = assessment.get('search_text', '').lower().split()
+            for term, tf in Counter(tokens).items():
+                term = term_id(term)
+                df_change[term] += 1
+                added.append((term, doc_id, tf, len(tokens)))
+            segment.live_docs += 1
+            segment.live_len += len(tokens)
+
+        n_terms = self.base_terms + len(segment.vocab)
+        grow = n_terms - len(self.df)
+        segment.df = np.concatenate([self.df, np.zeros(grow)])
+        for term, change in df_change.items():
+            segment.df[term] += change
+        segment.ref_idf = np.concatenate([self.ref_idf, np.ones(grow)])
+
+        if added:
+            terms, doc_ids, tfs, lengths = (np.array(column) for column in zip(*added))
+            weights = segment.ref_idf[terms] * _bm25_saturation(
+                tfs.astype(np.float64), lengths.astype(np.float64), self.avgdl
+            )
+            order = np.argsort(terms, kind='stable')
+            bounds = np.flatnonzero(np.diff(terms[order])) + 1
+            for group in np.split(order, bounds):
+                term = int(terms[group[0]])
+                old_docs, old_weights = segment.term_postings.get(term, (np.zeros(0, dtype=np.int64), np.zeros(0)))
+                segment.term_postings[term] = (
+                    np.concatenate([old_docs, doc_ids[group].astype(np.int64)]),
+                    np.concatenate([old_weights, weights[group]])
+                )
+
+        idf = np.zeros(n_terms)
+        present = segment.df > 0
+        idf[present] = bm25_idf(segment.df[present], segment.live_docs)
+        segment.scale = idf / segment.ref_idf
+
+        appended = segment.docs[len(self.docs):]
+        if appended:
+            segment.tfidf = vstack([self.tfidf, analyzer.transform(column_values(appended, 'search_text', ''))]).tocsr()
+            segment.filter_index = FilterIndex.build(segment.docs)
+        segment.deleted = frozenset(segment.deleted)
+        return segment
+
+    def query_terms(self, analyzed: AnalyzedQuery) -> Tuple[np.ndarray, np.ndarray]:
+        # Fitted query terms plus those only known to the delta segment, whose
+        # ids follow the fitted ones
+        counts = Counter(self.vocab[token] for token in analyzed.unknown if token in self.vocab)
+        if not counts:
+            return analyzed.term_ids, analyzed.term_counts
+        extra = sorted(counts)
+        return (
+            np.concatenate([analyzed.term_ids, np.array(extra, dtype=np.int64)]),
+            np.concatenate([analyzed.term_counts, np.array([counts[t] for t in extra], dtype=np.float64)])
+        )
+
+    def postings(self, base_weights, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        if term_id < self.base_terms:
+            start, end = base_weights.indptr[term_id], base_weights.indptr[term_id + 1]
+            docs, weights = base_weights.indices[start:end], base_weights.data[start:end]
+        else:
+            docs, weights = np.zeros(0, dtype=np.int64), np.zeros(0)
+
+        extra = self.term_postings.get(term_id)
+        if extra is None:
+            return docs, weights
+        # Appended doc ids follow the fitted ones, so the list stays sorted
+        return np.concatenate([docs, extra[0]]), np.concatenate([weights, extra[1]])
+
+    def tfidf_scores(self, base_matrix, query_vecs, rows: Optional[np.ndarray] = None):
+        if rows is None:
+            return vstack([base_matrix @ query_vecs.T, self.tfidf @ query_vecs.T])
+        split = np.searchsorted(rows, self.base_size)
+        return vstack([
+            base_matrix[rows[:split]] @ query_vecs.T,
+            self.tfidf[rows[split:] - self.base_size] @ query_vecs.T
+        ])
+
+    def resolve_filters(self, base_allowed: Optional[np.ndarray], *filters) -> Optional[np.ndarray]:
+        allowed = self.filter_index.resolve(*filters)
+        if base_allowed is None or allowed is None:
+            return base_allowed
+        return np.concatenate([base_allowed, allowed + self.base_size])
+
 class LightweightRetriever:
 
     def __init__(self):
         self.assessments = []
-        self.vectorizer = TfidfVectorizer(
-            max_features=1000,
-            ngram_range=(1, 2),
-            stop_words='english'
-        )
+        # Tokenizes once for both legs; BM25 term ids are its term ids
+        self.analyzer = Analyzer(max_features=1000)
         self.tfidf_matrix = None
-        self.bm25 = None
-        self.tokenized_corpus = []
+        self.bm25_weights = None
+        self.doc_len = None
+        self.avgdl = 0.0
+        self.embeddings = None
+        self.filter_index = FilterIndex(0)
+        # Fitted reranker mapped along with a shared index (see shared_index.py)
+        self.shared_reranker = None
+        # Upserts and deletes since the last fit (see apply_changes)
+        self.delta: Optional[DeltaSegment] = None
+        self._url_ids: Optional[Dict[str, int]] = None
 
     def load_and_fit(self, assessments_file: str = None):
 
         if assessments_file is None:
-            assessments_file = config.CATALOG_FILE.replace('.json', '_processed.json')
+            assessments_file = config.PROCESSED_CATALOG_FILE
 
-        with open(assessments_file, 'r', encoding='utf-8') as f:
-            self.assessments = json.load(f)
+        self.assessments = load_catalog(assessments_file)
 
         print(f"Loaded {len(self.assessments)} assessments")
 
-        print("Fitting TF-IDF vectorizer...")
-        search_texts = [a['search_text'] for a in self.assessments]
-        self.tfidf_matrix = self.vectorizer.fit_transform(search_texts)
+        self.fit(self.assessments)
+
+        print("Retriever initialized successfully")
+
+    def fit(self, assessments: List[Dict]):
+        self.assessments = assessments
+        self.delta = None
+        self._url_ids = None
+
+        print("Analyzing catalog...")
+        search_texts = column_values(assessments, 'search_text')
+        self.tfidf_matrix, term_ids, offsets = self.analyzer.fit_transform(search_texts)
 
         print("Initializing BM25 index...")
-        self.tokenized_corpus = [
-            assessment['search_text'].lower().split()
-            for assessment in self.assessments
-        ]
-        self.bm25 = BM25Okapi(self.tokenized_corpus)
+        self._fit_bm25(term_ids, offsets)
 
-        print("Retriever initialized successfully")
+        self.filter_index = FilterIndex.build(assessments)
+
+    def fit_partition(
+        self,
+        assessments: List[Dict],
+        analyzer: Analyzer,
+        tfidf_rows,
+        doc_terms: Tuple[np.ndarray, np.ndarray],
+        bm25_stats: Dict
+    ):
+        # Index a slice of a larger catalog from its rows of the full TF-IDF
+        # matrix, its documents as (term ids, offsets) from the full analysis
+        # and collection-wide BM25 statistics (see bm25_statistics), so every
+        # score matches the unsliced index.
+        self.assessments = assessments
+        self.analyzer = analyzer
+        self.tfidf_matrix = tfidf_rows
+        self._fit_bm25(*doc_terms, bm25_stats)
+
+        self.filter_index = FilterIndex.build(assessments)
+
+    def _fit_bm25(self, term_ids: np.ndarray, offsets: np.ndarray, stats: Optional[Dict] = None):
+        # Same scoring as rank_bm25.BM25Okapi, but the per-(doc, term) BM25
+        # contributions are precomputed into a term-major sparse matrix so a
+        # query only touches the postings of its own terms.
+        n_terms = self.analyzer.n_terms
+        n_docs = len(offsets) - 1
+        doc_len = np.diff(offsets).astype(np.float64)
+        rows, cols, tfs = _doc_term_counts(term_ids, offsets, n_terms)
+
+        if stats is None:
+            idf = bm25_idf(np.bincount(cols, minlength=n_terms).astype(np.float64), n_docs)
+            avgdl = doc_len.sum() / n_docs if n_docs else 0.0
+        else:
+            idf, avgdl = stats['idf'], stats['avgdl']
 
-    def semantic_search(self, query: str, top_k: int = 30) -> List[Tuple[int, float]]:
-        query_vec = self.vectorizer.transform([query])
-        similarities = cosine_similarity(query_vec, self.tfidf_matrix)[0]
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_len[rows] / avgdl) if avgdl else BM25_K1
+        weights = idf[cols] * (tfs * (BM25_K1 + 1) / (tfs + norm))
 
-        top_indices = np.argsort(similarities)[::-1][:top_k]
-        return [(int(idx), float(similarities[idx])) for idx in top_indices]
+        self.bm25_weights = csc_matrix((weights, (rows, cols)), shape=(n_docs, n_terms))
+        self.bm25_weights.sort_indices()
+        self.doc_len = doc_len
+        self.avgdl = avgdl
 
-    def keyword_search(self, query: str, top_k: int = 30) -> List[Tuple[int, float]]:
-        tokenized_query = query.lower().split()
-        scores = self.bm25.get_scores(tokenized_query)
+    @property
+    def n_docs(self) -> int:
+        # Doc ids in use, tombstoned ones included
+        return self.bm25_weights.shape[0] + (len(self.delta.docs) if self.delta else 0)
 
-        top_indices = np.argsort(scores)[::-1][:top_k]
-        return [(int(idx), float(scores[idx])) for idx in top_indices]
+    @property
+    def num_live(self) -> int:
+        return len(self.assessments) - (len(self.delta.deleted) if self.delta else 0)
+
+    def url_ids(self) -> Dict[str, int]:
+        # Doc id per URL in the fitted catalog (the last one if a URL repeats)
+        if self._url_ids is None:
+            self._url_ids = {url: i for i, url in enumerate(column_values(self.assessments, 'url'))}
+        return self._url_ids
+
+    def doc_id(self, url: str) -> Optional[int]:
+        if self.delta is not None:
+            return self.delta.doc_id(url)
+        return self.url_ids().get(url)
+
+    def apply_changes(self, upserts: List[Dict] = (), deletes: List[str] = ()) -> 'LightweightRetriever':
+        # A new retriever with processed assessments upserted (by URL) and
+        # URLs deleted, sharing this one's fitted index; see DeltaSegment.
+        # This retriever is left untouched for requests still using it.
+        retriever = copy.copy(self)
+        delta = self.delta or DeltaSegment(self)
+        retriever.delta = delta.apply(self.analyzer, list(upserts), list(deletes))
+        retriever.assessments = AppendedCatalog(delta.base_assessments, retriever.delta.docs)
+        return retriever
+
+    def needs_compaction(self, ratio: float = None) -> bool:
+        # Compaction pays off once the changed documents, or the drift of the
+        # live average length from the fitted one, reach `ratio` of the index.
+        if self.delta is None:
+            return False
+        if ratio is None:
+            ratio = config.INDEX_COMPACT_RATIO
+        drift = abs(self.delta.live_avgdl() / self.avgdl - 1) if self.avgdl else 0.0
+        return self.delta.changed() >= ratio * max(self.delta.base_size, 1) or drift >= ratio
+
+    def compact(self) -> 'LightweightRetriever':
+        # Full refit over the live assessments, folding the delta segment
+        # and tombstones back into a single fitted index.
+        deleted = self.delta.deleted if self.delta else frozenset()
+        live = [self.assessments[i] for i in range(len(self.assessments)) if i not in deleted]
+        retriever = LightweightRetriever()
+        retriever.fit(live)
+        return retriever
+
+    def _drop_deleted(self, results: List[Tuple[int, float]], top_k: int) -> List[Tuple[int, float]]:
+        if self.delta is None:
+            return results
+        return [(idx, score) for idx, score in results if idx not in self.delta.deleted][:top_k]
+
+    def _with_deleted(self, top_k: int) -> int:
+        # Enough results to still have top_k once tombstoned ones are dropped
+        return top_k + len(self.delta.deleted) if self.delta else top_k
+
+    def resolve_filters(
+        self,
+        test_types: Optional[List[str]] = None,
+        categories: Optional[List[str]] = None,
+        max_duration: Optional[float] = None
+    ) -> Optional[np.ndarray]:
+        allowed = self.filter_index.resolve(test_types, categories, max_duration)
+        if self.delta is not None:
+            return self.delta.resolve_filters(allowed, test_types, categories, max_duration)
+        return allowed
+
+    @timed('semantic_search')
+    def semantic_search(self, query: str, top_k: int = 30, allowed: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        return self._semantic_top_k([query], top_k, allowed)[0]
+
+    @timed('semantic_search_batch')
+    def semantic_search_batch(
+        self,
+        queries: List[str],
+        top_k: int = 30,
+        allowed: Optional[np.ndarray] = None
+    ) -> List[List[Tuple[int, float]]]:
+        return self._semantic_top_k(queries, top_k, allowed)
+
+    def _semantic_top_k(self, queries: List[str], top_k: int, allowed: Optional[np.ndarray]) -> List[List[Tuple[int, float]]]:
+        # TF-IDF rows are L2-normalised, so the dot product is the cosine.
+        query_vecs = self.analyzer.tfidf_rows([self.analyzer.analyze_query(query) for query in queries])
+        n_docs = self.n_docs
+        k = self._with_deleted(top_k)
+
+        if allowed is not None and len(allowed) < FILTER_SUBSET_RATIO * n_docs:
+            subset = _column_top_k(self._tfidf_scores(query_vecs, allowed), len(allowed), k)
+            ranked = [[(int(allowed[pos]), score) for pos, score in results] for results in subset]
+        else:
+            ranked = _column_top_k(self._tfidf_scores(query_vecs), n_docs, k, allowed)
+        return [self._drop_deleted(results, top_k) for results in ranked]
+
+    def _tfidf_scores(self, query_vecs, rows: Optional[np.ndarray] = None):
+        # (documents x queries) cosine scores, over `rows` only when given
+        if self.delta is not None:
+            return self.delta.tfidf_scores(self.tfidf_matrix, query_vecs, rows)
+        matrix = self.tfidf_matrix if rows is None else self.tfidf_matrix[rows]
+        return matrix @ query_vecs.T
+
+    def _query_terms(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        # Query term ids with their multiplicities
+        analyzed = self.analyzer.analyze_query(query)
+        term_ids, multiplicity = analyzed.term_ids, analyzed.term_counts
+        if self.delta is not None:
+            term_ids, multiplicity = self.delta.query_terms(analyzed)
+            # Stored weights use the idf of the last fit; scale to the current one
+            multiplicity = multiplicity * self.delta.scale[term_ids]
+        return term_ids, multiplicity
+
+    def _postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        if self.delta is not None:
+            return self.delta.postings(self.bm25_weights, term_id)
+        start, end = self.bm25_weights.indptr[term_id], self.bm25_weights.indptr[term_id + 1]
+        return self.bm25_weights.indices[start:end], self.bm25_weights.data[start:end]
+
+    def _bm25_accumulate(
+        self,
+        term_ids: np.ndarray,
+        counts: np.ndarray,
+        allowed: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        # Scores the postings of every query term; bincount adds each
+        # document's contributions in term order. With `allowed` (sorted doc
+        # ids), a term with many more postings than allowed documents is
+        # intersected with them before scoring; otherwise its disallowed
+        # postings cost less to score than to drop, and the allowed scores are
+        # read out of the accumulated vector.
+        docs, contributions = [], []
+        for term_id, count in zip(term_ids, counts):
+            postings, weights = self._postings(term_id)
+            if allowed is not None and len(allowed) * np.log2(len(postings) + 1) < len(postings):
+                found = np.searchsorted(postings, allowed).clip(max=len(postings) - 1)
+                found = found[postings[found] == allowed]
+                postings, weights = postings[found], weights[found]
+            docs.append(postings)
+            contributions.append(count * weights)
+
+        if not docs:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        scores = np.bincount(np.concatenate(docs), weights=np.concatenate(contributions), minlength=self.n_docs)
+        doc_ids = np.flatnonzero(scores) if allowed is None else allowed[np.flatnonzero(scores[allowed])]
+        return doc_ids, scores[doc_ids]
+
+    def bm25_scores(self, query: str) -> np.ndarray:
+        doc_ids, values = self._bm25_accumulate(*self._query_terms(query))
+        scores = np.zeros(self.n_docs)
+        scores[doc_ids] = values
+        return scores
+
+    @timed('keyword_search')
+    def keyword_search(self, query: str, top_k: int = 30, allowed: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        k = self._with_deleted(top_k)
+        doc_ids, scores = self._bm25_accumulate(*self._query_terms(query), allowed)
+        top, values = top_k_sparse(doc_ids, scores, self.n_docs, k, allowed)
+        return self._drop_deleted([(int(idx), float(score)) for idx, score in zip(top, values)], top_k)
+
+    @timed('keyword_search_batch')
+    def keyword_search_batch(
+        self,
+        queries: List[str],
+        top_k: int = 30,
+        allowed: Optional[np.ndarray] = None
+    ) -> List[List[Tuple[int, float]]]:
+        # BM25 cost is dominated by the postings each query touches, so there
+        # is nothing to share across a batch beyond the call overhead.
+        return [self.keyword_search(query, top_k, allowed) for query in queries]
 
     def hybrid_search(
         self,
         query: str,
         top_k: int = 30,
         bm25_weight: float = None,
-        semantic_weight: float = None
+        semantic_weight: float = None,
+        allowed: Optional[np.ndarray] = None
     ) -> List[Dict]:
         if bm25_weight is None:
             bm25_weight = config.BM25_WEIGHT
         if semantic_weight is None:
             semantic_weight = config.SEMANTIC_WEIGHT
 
-        semantic_results = self.semantic_search(query, top_k=top_k * 2)
-        keyword_results = self.keyword_search(query, top_k=top_k * 2)
+        if allowed is not None:
+            annotate('filtered_docs', len(allowed))
+
+        semantic_results = self.semantic_search(query, top_k=top_k * 2, allowed=allowed)
+        keyword_results = self.keyword_search(query, top_k=top_k * 2, allowed=allowed)
+        fused = self.fuse_results(semantic_results, keyword_results, top_k, bm25_weight, semantic_weight)
+
+        annotate('semantic_candidates', len(semantic_results))
+        annotate('keyword_candidates', len(keyword_results))
+        annotate('fused_candidates', len(fused))
+
+        return self._materialize(fused)
+
+    def hybrid_search_batch(
+        self,
+        queries: List[str],
+        top_k: int = 30,
+        bm25_weight: float = None,
+        semantic_weight: float = None,
+        allowed: Optional[np.ndarray] = None
+    ) -> List[List[Dict]]:
+        if bm25_weight is None:
+            bm25_weight = config.BM25_WEIGHT
+        if semantic_weight is None:
+            semantic_weight = config.SEMANTIC_WEIGHT
+
+        semantic_batch = self.semantic_search_batch(queries, top_k=top_k * 2, allowed=allowed)
+        keyword_batch = self.keyword_search_batch(queries, top_k=top_k * 2, allowed=allowed)
+
+        return [
+            self._materialize(self.fuse_results(semantic, keyword, top_k, bm25_weight, semantic_weight))
+            for semantic, keyword in zip(semantic_batch, keyword_batch)
+        ]
+
+    def _materialize(self, fused: List[Tuple[int, float]]) -> List[Dict]:
+        results = select_rows(self.assessments, [idx for idx, _ in fused])
+        for assessment, (_, score) in zip(results, fused):
+            assessment['retrieval_score'] = float(score)
+
+        return results
 
+    @timed('fusion')
+    def fuse_results(
+        self,
+        semantic_results: List[Tuple[int, float]],
+        keyword_results: List[Tuple[int, float]],
+        top_k: int,
+        bm25_weight: float,
+        semantic_weight: float
+    ) -> List[Tuple[int, float]]:
         combined_scores = {}
 
         for idx, score in semantic_results:
@@ -86,15 +627,8 @@ class LightweightRetriever:
             else:
                 combined_scores[idx] = bm25_weight * normalized_score
 
-        sorted_indices = sorted(combined_scores.items(), key=lambda x: x[1], reverse=True)[:top_k]
-
-        results = []
-        for idx, score in sorted_indices:
-            assessment = self.assessments[idx].copy()
-            assessment['retrieval_score'] = float(score)
-            results.append(assessment)
-
-        return results
+        # Ties go to the lower document, as in top_k_indices
+        return sorted(combined_scores.items(), key=lambda x: (-x[1], x[0]))[:top_k]
 
     def get_assessment_by_url(self, url: str) -> Dict:
         for assessment in self.assessments:
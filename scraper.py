@@ -1,10 +1,10 @@
-import json
 import time
 import re
 from typing import List, Dict, Optional, Set
 from bs4 import BeautifulSoup
 import requests
 from tqdm import tqdm
+import catalog_store
 import config
 
 def extract_assessment_details(soup: BeautifulSoup, url: str) -> Optional[Dict]:
@@ -230,8 +230,7 @@ def save_catalog(assessments: List[Dict], filename: str = None):
     import os
     os.makedirs(os.path.dirname(filename), exist_ok=True)
 
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(assessments, f, indent=2, ensure_ascii=False)
+    catalog_store.save_catalog(assessments, filename)
 
     print(f"\nSaved to {filename}")
 
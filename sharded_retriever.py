@@ -0,0 +1,267 @@
+import multiprocessing
+import queue
+import threading
+import weakref
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from catalog_store import column_values
+from filters import FilterIndex
+from index_manager import IncrementalChangesUnsupported
+from metrics import timed
+from analyzer import Analyzer
+from retriever import LightweightRetriever, bm25_statistics
+import config
+
+def merge_top_k(partials: List[List[Tuple[int, float]]], top_k: int) -> List[Tuple[int, float]]:
+    # Shard lists are already ranked; the merge uses the single index's order
+    # (highest score, then lower document index; see top_k_indices), so the
+    # merged list is exactly the one an unsharded index would return.
+    merged = [pair for partial in partials for pair in partial]
+    merged.sort(key=lambda pair: (-pair[1], pair[0]))
+    return merged[:top_k]
+
+def _serve_channel(conn, retriever: LightweightRetriever, offset: int):
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+
+        op, queries, top_k, allowed = message
+        try:
+            if op == 'semantic':
+                results = retriever.semantic_search_batch(queries, top_k, allowed)
+            else:
+                results = retriever.keyword_search_batch(queries, top_k, allowed)
+            results = [[(idx + offset, score) for idx, score in ranked] for ranked in results]
+            conn.send(('ok', results))
+        except Exception as e:
+            conn.send(('error', repr(e)))
+
+    conn.close()
+
+def _serve_shard(conns, assessments: List[Dict], analyzer: Analyzer, tfidf_rows, doc_terms, bm25_stats: Dict, offset: int):
+    # One thread per channel, so requests in flight on different channels are
+    # searched concurrently (numpy releases the GIL in the heavy loops).
+    retriever = LightweightRetriever()
+    retriever.fit_partition(assessments, analyzer, tfidf_rows, doc_terms, bm25_stats)
+
+    threads = [
+        threading.Thread(target=_serve_channel, args=(conn, retriever, offset), daemon=True)
+        for conn in conns[1:]
+    ]
+    for thread in threads:
+        thread.start()
+    conns[0].send('ready')
+    _serve_channel(conns[0], retriever, offset)
+    for thread in threads:
+        thread.join()
+
+class Shard:
+
+    def __init__(
+        self,
+        context,
+        assessments: List[Dict],
+        analyzer: Analyzer,
+        tfidf_rows,
+        doc_terms: Tuple[np.ndarray, np.ndarray],
+        bm25_stats: Dict,
+        offset: int,
+        channels: int = 1
+    ):
+        self.offset = offset
+        self.size = len(assessments)
+        # A pool of pipes to the shard process; each request in flight holds
+        # one of them until its reply has arrived.
+        pipes = [context.Pipe() for _ in range(max(1, channels))]
+        self.conns = [conn for conn, _ in pipes]
+        self.channels: queue.Queue = queue.Queue()
+        for conn in self.conns:
+            self.channels.put(conn)
+        self.process = context.Process(
+            target=_serve_shard,
+            args=([child for _, child in pipes], assessments, analyzer, tfidf_rows, doc_terms, bm25_stats, offset),
+            name=f"retrieval-shard-{offset}",
+            daemon=True
+        )
+        self.process.start()
+        for _, child in pipes:
+            child.close()
+
+    def local_allowed(self, allowed: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        if allowed is None:
+            return None
+        start, end = np.searchsorted(allowed, [self.offset, self.offset + self.size])
+        return allowed[start:end] - self.offset
+
+def _stop_shards(shards: List[Shard]):
+    for shard in shards:
+        for conn in shard.conns:
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+    for shard in shards:
+        shard.process.join(timeout=5)
+        if shard.process.is_alive():
+            shard.process.terminate()
+        for conn in shard.conns:
+            conn.close()
+
+# Scatter-gather retrieval over contiguous catalog shards, each indexed and
+# searched in its own process. TF-IDF and BM25 statistics are computed over the
+# whole catalog, so shard scores equal unsharded scores and the merged keyword
+# list carries the global BM25 maximum into fusion.
+class ShardedRetriever(LightweightRetriever):
+
+    def __init__(self, n_shards: int = None, channels: int = None):
+        super().__init__()
+        self.n_shards = n_shards or config.RETRIEVAL_SHARDS
+        self.channels = channels or config.RETRIEVAL_SHARD_CHANNELS
+        self.shards: List[Shard] = []
+        self._finalizer = None
+
+    def fit(self, assessments: List[Dict]):
+        self.close()
+        self.assessments = assessments
+
+        print("Analyzing catalog...")
+        search_texts = column_values(assessments, 'search_text')
+        tfidf_matrix, term_ids, offsets = self.analyzer.fit_transform(search_texts)
+
+        print("Computing BM25 collection statistics...")
+        bm25_stats = bm25_statistics(term_ids, offsets, self.analyzer.n_terms)
+        self.avgdl = bm25_stats['avgdl']
+
+        self.filter_index = FilterIndex.build(assessments)
+
+        n_shards = max(1, min(self.n_shards, len(assessments)))
+        print(f"Starting {n_shards} retrieval shards...")
+        context = multiprocessing.get_context('spawn')
+        bounds = np.linspace(0, len(assessments), n_shards + 1).astype(int)
+        self.shards = [
+            Shard(
+                context,
+                [{'search_text': text} for text in search_texts[start:end]],
+                self.analyzer,
+                tfidf_matrix[start:end],
+                (term_ids[offsets[start]:offsets[end]], offsets[start:end + 1] - offsets[start]),
+                bm25_stats,
+                int(start),
+                self.channels
+            )
+            for start, end in zip(bounds[:-1], bounds[1:])
+        ]
+        self._finalizer = weakref.finalize(self, _stop_shards, self.shards)
+
+        # Each shard reports back once it has indexed its part
+        for shard in self.shards:
+            shard.conns[0].recv()
+
+    def apply_changes(self, upserts: List[Dict] = (), deletes: List[str] = ()) -> 'LightweightRetriever':
+        raise IncrementalChangesUnsupported("Sharded indexes do not take incremental changes; reload the catalog instead")
+
+    def close(self):
+        if self._finalizer is not None:
+            self._finalizer()
+            self._finalizer = None
+            self.shards = []
+
+    def _scatter(
+        self,
+        op: str,
+        queries: List[str],
+        top_k: int,
+        allowed: Optional[np.ndarray]
+    ) -> List[List[List[Tuple[int, float]]]]:
+        targets = []
+        for shard in self.shards:
+            local = shard.local_allowed(allowed)
+            if local is None or len(local):
+                targets.append((shard, local))
+
+        # A free channel of every shard is taken in shard order, so concurrent
+        # scatters cannot deadlock. Each request is sent as soon as its
+        # channel is free and the shards work on their parts in parallel.
+        taken = []
+        try:
+            for shard, local in targets:
+                conn = shard.channels.get()
+                taken.append((shard, conn))
+                conn.send((op, queries, top_k, local))
+            replies = [conn.recv() for _, conn in taken]
+        finally:
+            for shard, conn in taken:
+                shard.channels.put(conn)
+
+        for status, payload in replies:
+            if status != 'ok':
+                raise RuntimeError(f"Retrieval shard failed: {payload}")
+        return [results for _, results in replies]
+
+    def _semantic_top_k(self, queries: List[str], top_k: int, allowed: Optional[np.ndarray]) -> List[List[Tuple[int, float]]]:
+        replies = self._scatter('semantic', queries, top_k, allowed)
+        return [merge_top_k([results[j] for results in replies], top_k) for j in range(len(queries))]
+
+    def _keyword_top_k(self, queries: List[str], top_k: int, allowed: Optional[np.ndarray]) -> List[List[Tuple[int, float]]]:
+        replies = self._scatter('keyword', queries, top_k, allowed)
+        return [merge_top_k([results[j] for results in replies], top_k) for j in range(len(queries))]
+
+    @timed('keyword_search')
+    def keyword_search(self, query: str, top_k: int = 30, allowed: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        return self._keyword_top_k([query], top_k, allowed)[0]
+
+    @timed('keyword_search_batch')
+    def keyword_search_batch(
+        self,
+        queries: List[str],
+        top_k: int = 30,
+        allowed: Optional[np.ndarray] = None
+    ) -> List[List[Tuple[int, float]]]:
+        return self._keyword_top_k(queries, top_k, allowed)
+
+def main():
+    print("=" * 60)
+    print("Sharded Retriever Test")
+    print("=" * 60)
+
+    local = LightweightRetriever()
+    local.load_and_fit()
+
+    sharded = ShardedRetriever(n_shards=3)
+    sharded.load_and_fit()
+
+    queries = ["Java developer with collaboration skills", "Python SQL analyst", "Sales professional"]
+    expected = {}
+    for query in queries:
+        expected[query] = sharded.hybrid_search(query, top_k=10)
+        matches = local.hybrid_search(query, top_k=10) == expected[query]
+        print(f"  {query!r}: {'match' if matches else 'MISMATCH'}")
+        assert matches
+
+    # Concurrent callers share the shards' channels; every reply must still
+    # reach the request that asked for it.
+    failures = []
+
+    def traffic(offset: int):
+        for i in range(20):
+            query = queries[(offset + i) % len(queries)]
+            if sharded.hybrid_search(query, top_k=10) != expected[query]:
+                failures.append(query)
+
+    workers = [threading.Thread(target=traffic, args=(i,)) for i in range(8)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    print(f"  8 concurrent callers: {len(failures)} mismatches")
+    assert not failures
+
+    sharded.close()
+    print("\n" + "=" * 60)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import fcntl
+import json
+import os
+import shutil
+import tempfile
+from collections.abc import Sequence
+from contextlib import contextmanager
+import numpy as np
+from scipy.sparse import csr_matrix, csc_matrix
+from analyzer import Analyzer
+from filters import FilterIndex
+from reranker import RERANKERS, build_reranker
+from retriever import LightweightRetriever
+import config
+
+META_FILE = "meta.json"
+LOCK_FILE = ".build.lock"
+ATTACH_LOCK_FILE = ".attach.lock"
+
+class MappedCatalog(Sequence):
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+
+        start, end = int(self.offsets[idx]), int(self.offsets[idx + 1])
+        return json.loads(self.blob[start:end].tobytes())
+
+def _save(directory: str, name: str, array: np.ndarray):
+    np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(array))
+
+def _load(directory: str, name: str) -> np.ndarray:
+    return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r')
+
+def publish_index(retriever: LightweightRetriever, directory: str, fingerprint: str):
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".staging-", dir=parent)
+
+    tfidf = retriever.tfidf_matrix.tocsr()
+    _save(staging, "tfidf_data", tfidf.data)
+    _save(staging, "tfidf_indices", tfidf.indices)
+    _save(staging, "tfidf_indptr", tfidf.indptr)
+
+    bm25 = retriever.bm25_weights.tocsc()
+    _save(staging, "bm25_data", bm25.data)
+    _save(staging, "bm25_indices", bm25.indices)
+    _save(staging, "bm25_indptr", bm25.indptr)
+    _save(staging, "doc_len", retriever.doc_len)
+
+    rows = [json.dumps(a, ensure_ascii=False).encode('utf-8') for a in retriever.assessments]
+    offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(r) for r in rows])
+    _save(staging, "catalog_offsets", offsets)
+    _save(staging, "catalog_blob", np.frombuffer(b''.join(rows), dtype=np.uint8))
+
+    filter_arrays, filter_meta = retriever.filter_index.export()
+    for name, array in filter_arrays.items():
+        _save(staging, name, array)
+
+    # The configured reranker's catalog encoding, so workers do not each
+    # encode the catalog and hold a private copy
+    reranker = build_reranker(retriever.assessments)
+    reranker_arrays = reranker.export() if reranker else {}
+    for name, array in reranker_arrays.items():
+        _save(staging, f"reranker_{name}", array)
+
+    meta = {
+        'fingerprint': fingerprint,
+        'num_docs': len(rows),
+        'tfidf_shape': list(tfidf.shape),
+        'tfidf_vocabulary': {name: i for i, name in enumerate(retriever.analyzer.feature_names())},
+        'tfidf_idf': retriever.analyzer.idf.tolist(),
+        'bm25_terms': list(retriever.analyzer.terms),
+        'avgdl': retriever.avgdl,
+        'filters': filter_meta,
+        'reranker': {
+            'name': reranker.name,
+            'model': config.RERANKER_MODEL,
+            'arrays': list(reranker_arrays)
+        } if reranker_arrays else None
+    }
+    with open(os.path.join(staging, META_FILE), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    os.rename(staging, directory)
+
+def attach_index(directory: str) -> LightweightRetriever:
+    with open(os.path.join(directory, META_FILE), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+
+    retriever = LightweightRetriever()
+    n_docs = meta['num_docs']
+
+    # Same layout as TfidfVectorizer.vocabulary_, so indexes published
+    # before the shared analyzer still attach
+    vocabulary = meta['tfidf_vocabulary']
+    retriever.analyzer = Analyzer.from_vocabulary(
+        meta['bm25_terms'],
+        sorted(vocabulary, key=vocabulary.get),
+        np.asarray(meta['tfidf_idf'])
+    )
+    retriever.tfidf_matrix = csr_matrix(
+        (_load(directory, "tfidf_data"), _load(directory, "tfidf_indices"), _load(directory, "tfidf_indptr")),
+        shape=tuple(meta['tfidf_shape']),
+        copy=False
+    )
+
+    retriever.bm25_weights = csc_matrix(
+        (_load(directory, "bm25_data"), _load(directory, "bm25_indices"), _load(directory, "bm25_indptr")),
+        shape=(n_docs, len(meta['bm25_terms'])),
+        copy=False
+    )
+    retriever.doc_len = _load(directory, "doc_len")
+    retriever.avgdl = meta['avgdl']
+
+    filter_meta = meta['filters']
+    filter_names = ['filter_duration_order', 'filter_duration_sorted'] + [
+        f'filter_{attr}_{i}' for attr, values in filter_meta['bitsets'].items() for i in range(len(values))
+    ]
+    retriever.filter_index = FilterIndex.from_export(
+        {name: _load(directory, name) for name in filter_names},
+        filter_meta
+    )
+
+    retriever.assessments = MappedCatalog(_load(directory, "catalog_blob"), _load(directory, "catalog_offsets"))
+
+    # Indexes published under another reranker setting leave it to the
+    # snapshot to fit its own
+    published = meta.get('reranker')
+    if published and published['name'] == config.RERANKER and published['model'] == config.RERANKER_MODEL:
+        retriever.shared_reranker = RERANKERS[published['name']]().attach(
+            retriever.assessments,
+            {name: _load(directory, f"reranker_{name}") for name in published['arrays']}
+        )
+
+    if os.path.exists(config.EMBEDDINGS_FILE):
+        # np.load with mmap_mode shares the page cache across processes already.
+        retriever.embeddings = np.load(config.EMBEDDINGS_FILE, mmap_mode='r')
+
+    return retriever
+
+@contextmanager
+def _flock(shared_dir: str, name: str, operation: int):
+    with open(os.path.join(shared_dir, name), 'w') as lock:
+        fcntl.flock(lock, operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def _remove_stale(shared_dir: str, keep: str):
+    # Workers attaching a snapshot hold the attach lock shared, so this waits
+    # until none is halfway through opening files. Workers already serving an
+    # older snapshot keep their mappings alive after the files are removed.
+    with _flock(shared_dir, ATTACH_LOCK_FILE, fcntl.LOCK_EX):
+        for name in os.listdir(shared_dir):
+            path = os.path.join(shared_dir, name)
+            if name != keep and os.path.isdir(path) and not name.startswith('.'):
+                shutil.rmtree(path, ignore_errors=True)
+
+def load_shared(catalog_file: str, fingerprint: str, shared_dir: str = None) -> LightweightRetriever:
+    if shared_dir is None:
+        shared_dir = config.SHARED_INDEX_DIR
+
+    os.makedirs(shared_dir, exist_ok=True)
+    directory = os.path.join(shared_dir, fingerprint)
+
+    while True:
+        with _flock(shared_dir, ATTACH_LOCK_FILE, fcntl.LOCK_SH):
+            if os.path.exists(os.path.join(directory, META_FILE)):
+                print(f"Attaching shared index {fingerprint} from {shared_dir}")
+                return attach_index(directory)
+
+        # Not published yet, or removed by a worker publishing another catalog
+        # since; attaching is retried once it has been (re)built.
+        with _flock(shared_dir, LOCK_FILE, fcntl.LOCK_EX):
+            if not os.path.exists(os.path.join(directory, META_FILE)):
+                print(f"Building shared index {fingerprint} in {shared_dir}")
+                retriever = LightweightRetriever()
+                retriever.load_and_fit(catalog_file)
+                publish_index(retriever, directory, fingerprint)
+                _remove_stale(shared_dir, fingerprint)
+
+def main():
+    print("=" * 60)
+    print("Shared Index Test")
+    print("=" * 60)
+
+    from index_manager import file_fingerprint
+
+    catalog_file = config.PROCESSED_CATALOG_FILE
+    fingerprint = file_fingerprint(catalog_file)
+
+    local = LightweightRetriever()
+    local.load_and_fit(catalog_file)
+
+    with tempfile.TemporaryDirectory() as shared_dir:
+        shared = load_shared(catalog_file, fingerprint, shared_dir)
+
+        for query in ["Java developer with collaboration skills", "Python SQL analyst", "Sales professional"]:
+            expected = [(a['url'], round(a['retrieval_score'], 9)) for a in local.hybrid_search(query, top_k=10)]
+            actual = [(a['url'], round(a['retrieval_score'], 9)) for a in shared.hybrid_search(query, top_k=10)]
+            print(f"  {query!r}: {'match' if expected == actual else 'MISMATCH'}")
+            assert expected == actual
+
+    print("\n" + "=" * 60)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import bisect
+from typing import Dict, List, Tuple
+import numpy as np
+from catalog_store import column_values
+from query_cache import normalize_query
+
+# Typeahead over skills, assessment names and the catalog's most frequent
+# words (the TF-IDF unigram vocabulary), built with each index snapshot. Every
+# word start of a suggestion's normalized text is a key, so "java" completes
+# "Core Java (Advanced Level)" as well as "Java 8". Keys are kept in one
+# sorted list next to an array of precomputed ranks: a lookup is two binary
+# searches for the range of keys starting with the prefix, then a partial
+# sort of that range by rank. Ranks order matches at the start of a
+# suggestion first, then skills, assessment names and words, then the number
+# of assessments behind the suggestion. One- and two-character prefixes match
+# large ranges, so their best keys are ranked once at build time.
+
+SKILL, ASSESSMENT, TERM = 0, 1, 2
+KIND_NAMES = ("skill", "assessment", "term")
+
+# Keys (and therefore prefixes) are cut to this many characters
+MAX_KEY_LENGTH = 48
+SHORT_PREFIX_LENGTH = 2
+SHORT_PREFIX_TOP = 64
+
+_KEY_END = '\U0010ffff'
+
+class _PrefixIndex:
+
+    def __init__(self, entries: List[Tuple[str, str, int, int, List[int]]]):
+        # entries: (normalized text, text, kind, weight, doc ids)
+        self.norms = [entry[0] for entry in entries]
+        self.texts = [entry[1] for entry in entries]
+        self.kinds = np.array([entry[2] for entry in entries], dtype=np.int8)
+        self.weights = np.array([entry[3] for entry in entries], dtype=np.int64)
+        # Doc ids behind each assessment name, to hide deleted assessments
+        self.doc_ptr = np.concatenate([[0], np.cumsum([len(entry[4]) for entry in entries])]).astype(np.int64)
+        self.doc_ids = np.array([doc for entry in entries for doc in entry[4]], dtype=np.int64)
+
+        keys, owners, mid_word = [], [], []
+        for i, norm in enumerate(self.norms):
+            words = norm.split()
+            for start in range(len(words)):
+                keys.append(" ".join(words[start:])[:MAX_KEY_LENGTH])
+                owners.append(i)
+                mid_word.append(start > 0)
+
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self.keys = [keys[i] for i in order]
+        self.owners = np.array(owners, dtype=np.int64)[order]
+        self.mid_word = np.array(mid_word, dtype=bool)[order]
+        # Rank of every key, lowest first, in sort_key order so that results
+        # from several indexes merge consistently
+        alphabetical = np.empty(len(entries), dtype=np.int64)
+        alphabetical[sorted(range(len(entries)), key=self.norms.__getitem__)] = np.arange(len(entries))
+        by_rank = np.lexsort((alphabetical[self.owners], -self.weights[self.owners], self.kinds[self.owners], self.mid_word))
+        self.ranks = np.empty(len(keys), dtype=np.int64)
+        self.ranks[by_rank] = np.arange(len(keys))
+
+        self.short: Dict[str, np.ndarray] = {}
+        for length in range(1, SHORT_PREFIX_LENGTH + 1):
+            for prefix in {key[:length] for key in self.keys}:
+                self.short[prefix] = self._ranked_range(prefix, SHORT_PREFIX_TOP)[0]
+
+    def _ranked_range(self, prefix: str, want: int) -> Tuple[np.ndarray, bool]:
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + _KEY_END, lo)
+        ranks = self.ranks[lo:hi]
+        if hi - lo > want:
+            top = np.argpartition(ranks, want)[:want]
+            return lo + top[np.argsort(ranks[top])], True
+        return lo + np.argsort(ranks), False
+
+    def matches(self, prefix: str, want: int) -> Tuple[np.ndarray, bool]:
+        # Key positions of the `want` best matches, best first, and whether
+        # there are more
+        cached = self.short.get(prefix)
+        if cached is not None and want <= SHORT_PREFIX_TOP:
+            return cached[:want], len(cached) > want
+        return self._ranked_range(prefix, want)
+
+    def sort_key(self, pos: int) -> Tuple:
+        # A key's rank as a value comparable across indexes
+        entry = self.owners[pos]
+        return bool(self.mid_word[pos]), int(self.kinds[entry]), -int(self.weights[entry]), self.norms[entry]
+
+    def live(self, entry: int, deleted) -> bool:
+        if not deleted or self.kinds[entry] != ASSESSMENT:
+            return True
+        return any(doc not in deleted for doc in self.doc_ids[self.doc_ptr[entry]:self.doc_ptr[entry + 1]].tolist())
+
+def _entries(rows, terms: List[Tuple[str, int]] = ()) -> List[Tuple]:
+    # Skills (weighted by the assessments listing them), assessment names
+    # (with their doc ids) and terms from (doc id, name, skills) rows, one
+    # per normalized text; the first spelling seen is the one suggested.
+    names: Dict[str, Tuple[str, List[int]]] = {}
+    skills: Dict[str, List] = {}
+    normalized: Dict[str, str] = {}
+    for doc_id, name, skill_list in rows:
+        norm = normalize_query(name) if isinstance(name, str) else ''
+        if norm:
+            names.setdefault(norm, (name, []))[1].append(doc_id)
+        for skill in dict.fromkeys(skill_list or []):
+            if not isinstance(skill, str):
+                continue
+            if skill not in normalized:
+                normalized[skill] = normalize_query(skill)
+            norm = normalized[skill]
+            if norm:
+                skills.setdefault(norm, [skill, 0])[1] += 1
+
+    entries = [(norm, skill, SKILL, count, []) for norm, (skill, count) in skills.items()]
+    entries += [(norm, name, ASSESSMENT, len(doc_ids), doc_ids) for norm, (name, doc_ids) in names.items()]
+    # Words that are also skills are suggested once, as skills
+    entries += [(term, term, TERM, df, []) for term, df in terms if term not in skills]
+    return entries
+
+class SuggestionIndex:
+
+    def __init__(self, base: _PrefixIndex, segments: Tuple = (), covered: int = 0, deleted=frozenset()):
+        self.base = base
+        # Assessments upserted since the index was fitted, as (rows, index)
+        # segments from oldest to newest; `covered` of the delta's documents
+        # are indexed. Deleted or replaced doc ids are hidden at lookup (see
+        # LightweightRetriever.apply_changes).
+        self.segments = segments
+        self.covered = covered
+        self.deleted = deleted
+
+    @classmethod
+    def build(cls, assessments, analyzer=None) -> 'SuggestionIndex':
+        terms = []
+        if analyzer is not None and analyzer.n_features:
+            # Documents per feature, recovered from the smoothed idf
+            n_docs = len(assessments)
+            df = np.rint((n_docs + 1) / np.exp(analyzer.idf - 1) - 1).astype(np.int64)
+            terms = [(name, count) for name, count in zip(analyzer.feature_names(), df.tolist()) if " " not in name]
+        rows = zip(
+            range(len(assessments)),
+            column_values(assessments, 'name', ''),
+            column_values(assessments, 'skills', [])
+        )
+        return cls(_PrefixIndex(_entries(rows, terms)))
+
+    def updated(self, retriever) -> 'SuggestionIndex':
+        # Suggestions for a retriever with incremental changes applied on top
+        # of the one this index was built from. Each change batch gets its own
+        # segment, merged into older segments no larger than it, so there are
+        # O(log n) segments and an upsert is re-indexed O(log n) times until
+        # the next compaction. Skill and word counts keep their fitted values.
+        delta = retriever.delta
+        if delta is None:
+            return self
+        rows = [
+            (doc_id, asmt.get('name', ''), asmt.get('skills', []))
+            for doc_id, asmt in enumerate(delta.docs[self.covered:], delta.base_size + self.covered)
+        ]
+        segments = list(self.segments)
+        while segments and len(segments[-1][0]) <= len(rows):
+            rows = segments.pop()[0] + rows
+        rows = [row for row in rows if row[0] not in delta.deleted]
+        if rows:
+            segments.append((rows, _PrefixIndex(_entries(rows))))
+        return SuggestionIndex(self.base, tuple(segments), len(delta.docs), delta.deleted)
+
+    def _ranked(self, index: _PrefixIndex, prefix: str, limit: int) -> List[Tuple]:
+        # Up to `limit` live entries of one index, best first, as
+        # (sort key, kind, normalized text, text)
+        want = limit * 2
+        while True:
+            positions, more = index.matches(prefix, want)
+            results, seen = [], set()
+            for pos, entry in zip(positions.tolist(), index.owners[positions].tolist()):
+                # An entry matching at several word starts appears once
+                if entry in seen or not index.live(entry, self.deleted):
+                    continue
+                seen.add(entry)
+                results.append((pos, entry))
+                if len(results) == limit:
+                    break
+            if len(results) == limit or not more:
+                return [
+                    (index.sort_key(pos), int(index.kinds[entry]), index.norms[entry], index.texts[entry])
+                    for pos, entry in results
+                ]
+            want *= 4
+
+    def suggest(self, prefix: str, limit: int = 8) -> List[Tuple[str, str]]:
+        # Up to `limit` (text, kind) completions of `prefix`, best first
+        prefix = normalize_query(prefix)[:MAX_KEY_LENGTH]
+        if not prefix or limit <= 0:
+            return []
+
+        ranked = self._ranked(self.base, prefix, limit)
+        if self.segments:
+            for _, index in self.segments:
+                ranked += self._ranked(index, prefix, limit)
+            ranked.sort(key=lambda r: r[0])
+
+        suggestions, seen = [], set()
+        for _, kind, norm, text in ranked:
+            if (kind, norm) in seen:
+                continue
+            seen.add((kind, norm))
+            suggestions.append((text, KIND_NAMES[kind]))
+            if len(suggestions) == limit:
+                break
+        return suggestions
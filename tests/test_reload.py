@@ -0,0 +1,103 @@
+import json
+import threading
+import time
+import pytest
+from fastapi.testclient import TestClient
+import config
+
+QUERIES = [
+    "Java developer with collaboration skills",
+    "Python, SQL and JavaScript for mid-level engineers",
+    "New graduates for a sales role",
+    "Customer service representative with good communication",
+]
+RELOADED_SUFFIX = " [reloaded]"
+ADMIN_TOKEN = "test-token"
+
+@pytest.fixture
+def catalogs(tmp_path, monkeypatch):
+    # The original catalog, and a copy whose names and URLs tell every
+    # response served from it apart
+    with open(config.PROCESSED_CATALOG_FILE, encoding='utf-8') as f:
+        original = json.load(f)
+    reloaded = [
+        dict(asmt, name=asmt['name'] + RELOADED_SUFFIX, url=asmt['url'] + "reloaded/")
+        for asmt in original
+    ]
+
+    paths = []
+    for name, assessments in (("original.json", original), ("reloaded.json", reloaded)):
+        path = tmp_path / name
+        path.write_text(json.dumps(assessments), encoding='utf-8')
+        paths.append(str(path))
+
+    monkeypatch.setattr(config, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(config, "PROCESSED_CATALOG_FILE", paths[0])
+    monkeypatch.setattr(config, "CATALOG_FORMAT", "json")
+    monkeypatch.setattr(config, "FAST_START", "off")
+    monkeypatch.setattr(config, "ADMIN_TOKEN", ADMIN_TOKEN)
+    monkeypatch.setattr(config, "LLM_PROVIDER", "fake")
+    monkeypatch.setattr(config, "FAKE_LLM_LATENCY_MS", 1.0)
+    monkeypatch.setattr(config, "FAKE_LLM_JITTER_MS", 0.0)
+    monkeypatch.setattr(config, "FAKE_LLM_ERROR_RATE", 0.0)
+    monkeypatch.setattr(config, "INDEX_COMPACT_INTERVAL", 0)
+    return paths
+
+def test_recommend_during_reload(catalogs):
+    from api.main import app
+
+    headers = {'X-Admin-Token': ADMIN_TOKEN}
+    errors, served = [], []
+    stop = threading.Event()
+
+    with TestClient(app) as client:
+        start_version = client.get("/admin/index", headers=headers).json()['version']
+
+        def traffic(worker: int):
+            versions = []
+            i = worker
+            while not stop.is_set():
+                response = client.post("/recommend", json={'query': QUERIES[i % len(QUERIES)], 'debug': True})
+                i += 1
+                if response.status_code != 200:
+                    errors.append((response.status_code, response.text))
+                    continue
+                body = response.json()
+                names = [r['assessment_name'] for r in body['recommendations']]
+                versions.append(body['debug']['index_version'])
+                served.append((versions[-1], names))
+            if versions != sorted(versions):
+                errors.append(("version went backwards", versions))
+
+        workers = [threading.Thread(target=traffic, args=(i,)) for i in range(4)]
+        for w in workers:
+            w.start()
+
+        while len(served) < 8:
+            time.sleep(0.01)
+        response = client.post("/admin/reload", json={'catalog_file': catalogs[1]}, headers=headers)
+        assert response.status_code == 202
+
+        deadline = time.time() + 60
+        while True:
+            status = client.get("/admin/index", headers=headers).json()
+            if status['version'] > start_version and not status['reloading']:
+                break
+            assert time.time() < deadline, "reload did not finish"
+            time.sleep(0.05)
+        reloaded_at = len(served)
+        while len(served) < reloaded_at + 8:
+            time.sleep(0.01)
+
+        stop.set()
+        for w in workers:
+            w.join()
+
+    assert not errors, errors[:5]
+    assert status['version'] == start_version + 1
+    assert {version for version, _ in served} == {start_version, start_version + 1}
+    for version, names in served:
+        assert names
+        # Every result list comes from the catalog of the version that served it
+        expect_reloaded = version > start_version
+        assert all(name.endswith(RELOADED_SUFFIX) == expect_reloaded for name in names), (version, names)
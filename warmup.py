@@ -0,0 +1,92 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+import config
+
+class Warmup:
+    # Runs the startup steps (index load, LLM client setup, a first query) in
+    # order, by default on a background thread so the server can accept
+    # connections and answer /health while the index is still being built.
+    # A failing step is retried with exponential backoff; once the retries
+    # are used up the warm-up has failed and /health reports it.
+
+    def __init__(self, retries: int = None, retry_delay: float = None):
+        self.retries = retries if retries is not None else config.WARMUP_RETRIES
+        self.retry_delay = retry_delay if retry_delay is not None else config.WARMUP_RETRY_DELAY
+        self.attempts = 0
+        self.last_error: Optional[str] = None
+        self.steps: List[Tuple[str, Callable[[], None]]] = []
+        self.timings: Dict[str, float] = {}
+        self.current_step: Optional[str] = None
+        self.error: Optional[str] = None
+        self.created_at = time.perf_counter()
+        self.ready_after: Optional[float] = None
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, name: str, fn: Callable[[], None]):
+        self.steps.append((name, fn))
+
+    def _run_step(self, name: str, fn: Callable[[], None]):
+        delay = self.retry_delay
+        for attempt in range(self.retries + 1):
+            self.attempts += 1
+            start = time.perf_counter()
+            try:
+                fn()
+                self.timings[name] = time.perf_counter() - start
+                return
+            except Exception as e:
+                self.last_error = f"{name}: {e}"
+                if attempt == self.retries:
+                    raise
+                print(f"Warm-up step {name} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                delay *= 2
+
+    def _run(self):
+        try:
+            for name, fn in self.steps:
+                self.current_step = name
+                self._run_step(name, fn)
+            self.current_step = None
+            self.ready_after = time.perf_counter() - self.created_at
+            print(f"Warm-up complete in {self.ready_after:.2f}s")
+        except Exception as e:
+            self.error = f"{self.current_step}: {e}"
+            print(f"Warm-up failed during {self.error}")
+        finally:
+            self._done.set()
+
+    def start(self, background: bool = True):
+        if background:
+            self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+            self._thread.start()
+        else:
+            self._run()
+            if self.error:
+                raise RuntimeError(f"Warm-up failed during {self.error}")
+
+    def wait(self, timeout: float = None) -> bool:
+        self._done.wait(timeout)
+        return self.ready
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set() and self.error is None
+
+    @property
+    def status(self) -> str:
+        if not self._done.is_set():
+            return "warming"
+        return "failed" if self.error else "ready"
+
+    def info(self) -> dict:
+        return {
+            'status': self.status,
+            'current_step': self.current_step,
+            'step_timings_ms': {name: seconds * 1000 for name, seconds in self.timings.items()},
+            'ready_after_ms': self.ready_after * 1000 if self.ready_after is not None else None,
+            'error': (self.error or self.last_error) if self.status != "ready" else None,
+            'attempts': self.attempts
+        }